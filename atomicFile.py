@@ -0,0 +1,38 @@
+import contextlib
+import os
+
+
+# Every file the lamp keeps between runs (checkpoints, the schedule, stats, the play archive) is replaced the same
+# way: written next to the target, flushed to disk and swapped in, so a crash or a power cut at any point leaves
+# either the old file or the new one, never half of each, and a reader never sees a half-written file.
+@contextlib.contextmanager
+def atomicWrite(path, mode='w'):
+    """
+    Open a file to replace another one atomically.
+
+    Parameters:
+    - path (str): The file to replace. Its folder is created if needed.
+    - mode (str): 'w' for text, 'wb' for bytes.
+
+    Returns:
+    file: An open temporary file. It is swapped in for path when the with block ends, and deleted instead if the
+    block raises.
+
+    Note:
+    The temporary file is fsynced before the swap. Without that, a power cut shortly after os.replace can leave the
+    new name pointing at an empty file on some filesystems.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temporaryPath = path + '.tmp'
+    try:
+        with open(temporaryPath, mode) as temporaryFile:
+            yield temporaryFile
+            temporaryFile.flush()
+            os.fsync(temporaryFile.fileno())
+        os.replace(temporaryPath, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporaryPath)
+        raise
@@ -0,0 +1,291 @@
+import collections
+import threading
+
+import time
+
+import miniaudio
+import numpy as np
+
+import metrics
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+# Songs that are played before the game and for every opponent goal, so they are worth decoding up front
+HORNS = ('./audioFiles/losing_horn.mp3', './audioFiles/SabreDance.mp3', './audioFiles/default.mp3')
+
+
+def decodeFile(path, sampleRate=SAMPLE_RATE, channels=CHANNELS, maxSeconds=None):
+    """
+    Decode an audio file (MP3, FLAC, WAV or Vorbis) into 16 bit PCM.
+
+    Parameters:
+    - path (str): The file to decode.
+    - sampleRate (int): Sample rate to resample to.
+    - channels (int): Number of channels to mix to.
+    - maxSeconds (float): Only keep this many seconds from the start of the file. None keeps it all.
+
+    Returns:
+    numpy.ndarray: int16 array of shape (frames, channels).
+    """
+    decoded = miniaudio.decode_file(path, output_format=miniaudio.SampleFormat.SIGNED16, nchannels=channels,
+                                    sample_rate=sampleRate)
+    samples = np.frombuffer(decoded.samples, dtype=np.int16).reshape(-1, channels)
+    if maxSeconds is not None:
+        # Copy the part that's kept so the rest of the decoded song can be freed
+        samples = samples[:int(maxSeconds * sampleRate)].copy()
+    return samples
+
+
+# Decoded songs, kept in memory so a goal can start playing straight away instead of decoding an MP3 first. A 20
+# second stereo clip is about 3.5 MB of PCM, so the cache is capped and drops the song that was used longest ago.
+class ClipCache:
+    """
+    Least recently used cache of decoded clips.
+
+    Parameters:
+    - maxBytes (int): Most PCM bytes to keep in memory. At least one clip is always kept.
+    - clipLength (float): Seconds of each file to decode. None decodes whole files.
+    - decoder (callable): Function taking (path, sampleRate, channels, maxSeconds) and returning an int16 array.
+    - sampleRate (int): Sample rate clips are decoded at.
+    - channels (int): Channel count clips are decoded at.
+    """
+
+    def __init__(self, maxBytes=64 * 1024 * 1024, clipLength=20, decoder=decodeFile, sampleRate=SAMPLE_RATE,
+                 channels=CHANNELS):
+        self.maxBytes = maxBytes
+        self.clipLength = clipLength
+        self.decoder = decoder
+        self.sampleRate = sampleRate
+        self.channels = channels
+        self.clips = collections.OrderedDict()
+        self.numBytes = 0
+        self.lock = threading.Lock()
+
+    def __contains__(self, path):
+        return path in self.clips
+
+    def __len__(self):
+        return len(self.clips)
+
+    def get(self, path):
+        """
+        Returns the decoded clip for a file, decoding it first if it isn't cached.
+        """
+        with self.lock:
+            clip = self.clips.get(path)
+            if clip is not None:
+                self.clips.move_to_end(path)
+                return clip
+
+        # Decode outside the lock so a slow file doesn't hold up clips that are already cached
+        clip = self.decoder(path, self.sampleRate, self.channels, self.clipLength)
+        with self.lock:
+            if path not in self.clips:
+                self.clips[path] = clip
+                self.numBytes += clip.nbytes
+                self._evict()
+            return self.clips.get(path, clip)
+
+    def preload(self, paths):
+        """
+        Decode a list of files ahead of time. Files that fail to decode are reported and skipped.
+
+        Note:
+        Only as many files as fit in maxBytes stay cached, so the most important ones should come last.
+        """
+        for path in paths:
+            try:
+                self.get(path)
+            except Exception as error:
+                print(f'Could not decode {path}: {error}')
+
+    def _evict(self):
+        while self.numBytes > self.maxBytes and len(self.clips) > 1:
+            _, clip = self.clips.popitem(last=False)
+            self.numBytes -= clip.nbytes
+
+
+# One clip being played by the mixer
+class Voice:
+    """
+    Playback state of a single clip.
+
+    Attributes:
+    - clip (numpy.ndarray): The int16 samples being played.
+    - position (int): The next frame to be mixed.
+    - gain (float): Current volume, 0 to 1.
+    - fadeStep (float): Change in gain per frame. Negative while fading out.
+    - endFrame (int): Frame at which the voice stops, so a clip can be cut short.
+    - fadeAt (int): Frame at which a fade out to endFrame starts, or None to play to endFrame at full volume.
+    - done (threading.Event): Set once the voice has finished.
+    - queuedAt (float): time.perf_counter() when play() was called, to measure how long the clip took to start.
+    """
+
+    __slots__ = ('clip', 'position', 'gain', 'fadeStep', 'endFrame', 'fadeAt', 'done', 'queuedAt')
+
+    def __init__(self, clip, endFrame=None, fadeAt=None):
+        self.clip = clip
+        self.position = 0
+        self.gain = 1.0
+        self.fadeStep = 0.0
+        self.endFrame = len(clip) if endFrame is None else min(endFrame, len(clip))
+        self.fadeAt = fadeAt
+        self.done = threading.Event()
+        self.queuedAt = time.perf_counter()
+
+    @property
+    def finished(self):
+        return self.done.is_set()
+
+
+# Plays decoded clips without blocking anyone. The sound card pulls small blocks from mix() on its own thread, so
+# starting a clip is just adding it to a list and the first samples go out within one buffer (tens of milliseconds).
+class AudioEngine:
+    """
+    Non-blocking software mixer on top of a miniaudio playback device.
+
+    Parameters:
+    - device (str): 'default' for the system's sound output, or 'null' to play into miniaudio's null device, which
+      consumes audio in real time without any sound hardware, e.g. for headless testing.
+    - clipLength (float): Seconds after which a clip is faded out.
+    - fadeSeconds (float): Length of fade outs when a clip is stopped or reaches clipLength.
+    - bufferMilliseconds (int): Size of the device buffer. Smaller is lower latency but more likely to crackle.
+    - cache (ClipCache): Where decoded clips are kept. A new one is made if none is given.
+
+    Note:
+    Several clips can play at once and are summed. mix() can also be called directly to pull samples without any
+    device, which is how tests can check the output.
+    """
+
+    def __init__(self, device='default', clipLength=20, fadeSeconds=1.0, bufferMilliseconds=50, cache=None):
+        self.deviceName = device
+        self.clipLength = clipLength
+        self.fadeSeconds = fadeSeconds
+        self.bufferMilliseconds = bufferMilliseconds
+        self.cache = cache if cache is not None else ClipCache(clipLength=clipLength)
+        self.sampleRate = self.cache.sampleRate
+        self.channels = self.cache.channels
+        self.voices = []
+        self.lock = threading.Lock()
+        self.device = None
+        self.framesMixed = 0
+
+    def start(self):
+        """
+        Open the playback device and start pulling audio from the mixer.
+        """
+        if self.device is not None:
+            return
+        backends = [miniaudio.Backend.NULL] if self.deviceName == 'null' else None
+        try:
+            self.device = self._openDevice(backends)
+        except miniaudio.MiniaudioError as error:
+            # No sound card, e.g. on a server. Keep going silently rather than crashing the lamp.
+            print(f'Could not open the sound output ({error}), playing to the null device instead.')
+            self.device = self._openDevice([miniaudio.Backend.NULL])
+        stream = self._stream()
+        next(stream)
+        self.device.start(stream)
+
+    def _openDevice(self, backends):
+        return miniaudio.PlaybackDevice(output_format=miniaudio.SampleFormat.SIGNED16, nchannels=self.channels,
+                                        sample_rate=self.sampleRate, buffersize_msec=self.bufferMilliseconds,
+                                        backends=backends, app_name='Sabres Goal Lamp')
+
+    def close(self):
+        if self.device is not None:
+            self.device.close()
+            self.device = None
+
+    def preload(self, paths):
+        self.cache.preload(paths)
+
+    def play(self, path, clipLength=None):
+        """
+        Start playing a file right away, on top of anything already playing.
+
+        Parameters:
+        - path (str): The file to play. It is decoded first if it isn't cached yet.
+        - clipLength (float): Seconds to play before fading out. Defaults to the engine's clipLength.
+
+        Returns:
+        Voice: Handle that can be passed to stop(). voice.done is set once it has finished.
+        """
+        queuedAt = time.perf_counter()
+        clipLength = self.clipLength if clipLength is None else clipLength
+        clip = self.cache.get(path)
+        endFrame = len(clip) if clipLength is None else min(len(clip), int(clipLength * self.sampleRate))
+        # A clip that is cut short fades out over its last fadeSeconds instead of stopping dead
+        fadeAt = None
+        if endFrame < len(clip):
+            fadeAt = max(0, endFrame - int(self.fadeSeconds * self.sampleRate))
+        voice = Voice(clip, endFrame, fadeAt)
+        voice.queuedAt = queuedAt
+        if voice.endFrame <= 0:
+            voice.done.set()
+            return voice
+        with self.lock:
+            self.voices.append(voice)
+        return voice
+
+    def stop(self, voice=None, fadeSeconds=None):
+        """
+        Fade out one voice, or every voice if none is given.
+
+        Parameters:
+        - voice (Voice): The voice to stop.
+        - fadeSeconds (float): Fade length. 0 stops immediately. Defaults to the engine's fadeSeconds.
+        """
+        fadeSeconds = self.fadeSeconds if fadeSeconds is None else fadeSeconds
+        with self.lock:
+            voices = list(self.voices) if voice is None else [voice]
+            for target in voices:
+                if target.finished:
+                    continue
+                fadeFrames = int(fadeSeconds * self.sampleRate)
+                if fadeFrames <= 0:
+                    target.endFrame = target.position
+                else:
+                    target.endFrame = min(target.endFrame, target.position + fadeFrames)
+                    target.fadeStep = -target.gain / fadeFrames
+
+    def mix(self, frames):
+        """
+        Mix the next block of audio from every playing voice.
+
+        Parameters:
+        - frames (int): Number of frames to produce.
+
+        Returns:
+        numpy.ndarray: int16 array of shape (frames, channels).
+        """
+        block = np.zeros((frames, self.channels), dtype=np.float32)
+        with self.lock:
+            for voice in self.voices:
+                if voice.fadeAt is not None and voice.position >= voice.fadeAt and not voice.fadeStep:
+                    voice.fadeStep = -voice.gain / max(1, voice.endFrame - voice.position)
+                count = min(frames, voice.endFrame - voice.position)
+                if count > 0:
+                    if voice.position == 0:
+                        metrics.observe('lamp_audio_start_seconds', time.perf_counter() - voice.queuedAt)
+                    samples = voice.clip[voice.position:voice.position + count].astype(np.float32)
+                    if voice.fadeStep:
+                        gains = voice.gain + voice.fadeStep * np.arange(1, count + 1, dtype=np.float32)
+                        np.clip(gains, 0.0, 1.0, out=gains)
+                        samples *= gains[:, None]
+                        voice.gain = float(gains[-1])
+                    elif voice.gain != 1.0:
+                        samples *= voice.gain
+                    block[:count] += samples
+                    voice.position += count
+                if voice.position >= voice.endFrame or voice.gain <= 0.0:
+                    voice.done.set()
+            self.voices = [voice for voice in self.voices if not voice.finished]
+        self.framesMixed += frames
+        return np.clip(block, -32768, 32767).astype(np.int16)
+
+    def _stream(self):
+        # miniaudio sends the number of frames it wants and expects them back as bytes
+        frames = yield b''
+        while True:
+            frames = yield self.mix(frames).tobytes()
@@ -0,0 +1,175 @@
+"""
+Goal-detection latency benchmark.
+
+Replays a recorded (or synthetic) game through a local stand-in for the NHL API and runs the real polling path
+(FetchClient -> GameFeed -> duringGameUpdate) against it. Reports how long after a goal first appears in the feed
+the lamp reacts, how many requests and bytes a game costs, and the CPU time and peak RSS of the polling process.
+
+Usage:
+    python benchmarks/goalLatency.py [--recording game.json] [--speed 300] [--json report.json] [--max-p95 12]
+
+Runs fully offline. Without --recording a deterministic synthetic game is generated.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from replayServer import ReplayServerProcess, loadRecording  # noqa: E402
+from runStats import peakRSSMB, percentile  # noqa: E402
+from syntheticGame import generateGame  # noqa: E402
+
+
+def goalAppearances(recording):
+    """
+    Map each goal's eventId to the index of the first snapshot it appears in and the team that scored.
+    """
+    appearances = {}
+    for index, snapshot in enumerate(recording['snapshots']):
+        for play in snapshot['playByPlay'].get('plays', []):
+            if play['typeDescKey'] == 'goal' and play['eventId'] not in appearances:
+                appearances[play['eventId']] = (index, play['details']['eventOwnerTeamId'])
+    return appearances
+
+
+def runBenchmark(recording, speed, pollInterval=None):
+    """
+    Replay one game and measure the polling path.
+
+    Parameters:
+    - recording (dict): The game to replay.
+    - speed (float): Game seconds per wall-clock second.
+    - pollInterval (float): Fixed game seconds between polls. If None, the lamp's adaptive PollScheduler is used.
+
+    Returns:
+    dict: The benchmark report.
+    """
+    # sabresGoalCheck opens its audio mapping relative to the repository root
+    os.chdir(REPO_ROOT)
+    import metrics
+    import sabresGoalCheck
+    from fetchClient import FetchClient
+    from gameFeed import GameFeed
+    from goalTracker import PENDING
+    from rosterIndex import RosterIndex
+
+    teamId = sabresGoalCheck.SABRES_TEAM_ID
+    appearances = goalAppearances(recording)
+
+    with ReplayServerProcess(recording, speed) as server:
+        client = FetchClient()
+        cpuStart = time.process_time()
+        wallStart = time.time()
+
+        schedule = client.getJSON(server.url + f'v1/schedule/{recording["schedule"]["gameWeek"][0]["date"]}')
+        game = next(game for day in schedule['gameWeek'] for game in day['games']
+                    if teamId in (game['homeTeam']['id'], game['awayTeam']['id']))
+        sabresHomeOrAway, opHomeOrAway = (('homeTeam', 'awayTeam') if game['homeTeam']['id'] == teamId
+                                          else ('awayTeam', 'homeTeam'))
+        opponentId = game[opHomeOrAway]['id']
+
+        feed = GameFeed(server.url + f'v1/gamecenter/{game["id"]}/play-by-play', client)
+        # The lamp's own delay estimate runs off the feed's game clock, which moves speed times faster here
+        feed.clock = metrics.FeedClock(speed)
+        rosters = RosterIndex(feed.poll().response['rosterSpots'])
+        detected = {}
+        polls = 0
+        isOver = False
+        with contextlib.redirect_stdout(io.StringIO()):
+            while not isOver:
+                result = sabresGoalCheck.duringGameUpdate(sabresHomeOrAway, opHomeOrAway, feed, rosters)
+                now = time.time()
+                polls += 1
+                isOver = result[4]
+                # The song or horn triggers here for every goal the tracker has just found
+                for transition in feed.lastUpdate.goalTransitions:
+                    if transition.state == PENDING and transition.teamId in (teamId, opponentId):
+                        detected.setdefault(transition.eventId, now)
+                if not isOver:
+                    if pollInterval is None:
+                        time.sleep(sabresGoalCheck.pollScheduler.nextInterval(feed.response) / speed)
+                    else:
+                        time.sleep(pollInterval / speed)
+
+        cpuSeconds = time.process_time() - cpuStart
+        wallSeconds = time.time() - wallStart
+        serverStats = client.session.get(server.url + '__stats').json()
+
+    latencies = []
+    for eventId, (index, _) in appearances.items():
+        if eventId in detected:
+            latencies.append(max(0.0, (detected[eventId] - server.activationTime(index)) * speed))
+
+    delays = metrics.REGISTRY.histograms.get('lamp_goal_detection_delay_seconds')
+    estimates = [delay * speed for delay in delays.recent] if delays is not None else []
+
+
+    return {
+        'speed': speed,
+        'pollInterval': pollInterval if pollInterval is not None else 'adaptive',
+        'goals': len(appearances),
+        'goalsDetected': len(latencies),
+        'goalsMissed': len(appearances) - len(latencies),
+        'latencyP50': percentile(latencies, 0.50),
+        'latencyP90': percentile(latencies, 0.90),
+        'latencyP95': percentile(latencies, 0.95),
+        'latencyMax': max(latencies) if latencies else None,
+        'estimatedLatencyP50': percentile(estimates, 0.50),
+        'estimatedLatencyMax': max(estimates) if estimates else None,
+        'polls': polls,
+        # The stats request itself isn't part of the game
+        'requests': serverStats['requests'] - 1,
+        'notModified': serverStats['notModified'],
+        'bytesTransferred': serverStats['bytesSent'],
+        'cpuSeconds': round(cpuSeconds, 3),
+        'wallSeconds': round(wallSeconds, 3),
+        'maxRSSMB': round(peakRSSMB(), 1),
+    }
+
+
+def printReport(report):
+    if report['pollInterval'] == 'adaptive':
+        print(f"Replayed at {report['speed']}x with adaptive polling")
+    else:
+        print(f"Replayed at {report['speed']}x, polling every {report['pollInterval']} game seconds")
+    print(f"Goals: {report['goals']}  detected: {report['goalsDetected']}  missed: {report['goalsMissed']}")
+    if report['goalsDetected']:
+        print(f"Detection latency (game seconds): p50 {report['latencyP50']:.2f}  p90 {report['latencyP90']:.2f}  "
+              f"p95 {report['latencyP95']:.2f}  max {report['latencyMax']:.2f}")
+    if report['estimatedLatencyP50'] is not None:
+        print(f"Lamp's own estimate (game seconds): p50 {report['estimatedLatencyP50']:.2f}  "
+              f"max {report['estimatedLatencyMax']:.2f}")
+    print(f"Polls: {report['polls']}  requests: {report['requests']}  304s: {report['notModified']}  "
+          f"bytes: {report['bytesTransferred']}")
+    print(f"CPU: {report['cpuSeconds']} s  wall: {report['wallSeconds']} s  peak RSS: {report['maxRSSMB']} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recording', help='Recording written by recordGame.py. A synthetic game is used if omitted.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic game.')
+    parser.add_argument('--speed', type=float, default=300, help='Game seconds per wall-clock second.')
+    parser.add_argument('--poll-interval', type=float, default=None,
+                        help='Fixed game seconds between polls. The adaptive scheduler is used if omitted.')
+    parser.add_argument('--json', help='Also write the report to this file.')
+    parser.add_argument('--max-p95', type=float, default=None,
+                        help='Exit with status 1 if the p95 detection latency (game seconds) is above this.')
+    options = parser.parse_args()
+
+    recording = loadRecording(options.recording) if options.recording else generateGame(options.seed)
+    report = runBenchmark(recording, options.speed, options.poll_interval)
+    printReport(report)
+
+    if options.json:
+        with open(options.json, 'w') as reportFile:
+            json.dump(report, reportFile, indent=2)
+
+    if options.max_p95 is not None and (report['goalsMissed'] or report['latencyP95'] > options.max_p95):
+        sys.exit(1)
@@ -0,0 +1,52 @@
+"""
+Record a live game from the NHL API so it can be replayed by the benchmarks.
+
+Usage:
+    python benchmarks/recordGame.py GAME_ID output.json [--interval 5]
+
+A snapshot of the play-by-play feed is stored every time it changes, until the game is final.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetchClient import FetchClient  # noqa: E402
+
+BASE_API_URL = 'https://api-web.nhle.com/'
+
+
+def recordGame(gameId, outputPath, interval=5):
+    client = FetchClient()
+    playByPlayURL = BASE_API_URL + f'v1/gamecenter/{gameId}/play-by-play'
+
+    first = client.getJSON(playByPlayURL)
+    puckDrop = datetime.datetime.fromisoformat(first['startTimeUTC'].replace('Z', '+00:00'))
+    schedule = client.getJSON(BASE_API_URL + f'v1/schedule/{first["gameDate"]}')
+
+    recording = {'gameId': gameId, 'schedule': schedule, 'snapshots': []}
+    while True:
+        result = client.get(playByPlayURL)
+        if not result.notModified and not result.stale:
+            t = (datetime.datetime.now(datetime.timezone.utc) - puckDrop).total_seconds()
+            recording['snapshots'].append({'t': round(t, 3), 'playByPlay': result.data})
+            print(f'{len(recording["snapshots"])} snapshots, {len(result.data.get("plays", []))} plays')
+            # Write as we go so a crash doesn't lose the whole game
+            with open(outputPath, 'w') as outputFile:
+                json.dump(recording, outputFile)
+        if result.data['gameState'] in ('FINAL', 'OFF'):
+            break
+        time.sleep(interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('gameId', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--interval', type=float, default=5)
+    options = parser.parse_args()
+    recordGame(options.gameId, options.output, options.interval)
@@ -0,0 +1,243 @@
+import bisect
+import gzip
+import json
+import multiprocessing
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PLAY_BY_PLAY_PATH = re.compile(r'^/v1/gamecenter/(\d+)/play-by-play$')
+SCHEDULE_PATH = re.compile(r'^/v1/schedule/(\d{4}-\d{2}-\d{2})$')
+SCORE_PATH = re.compile(r'^/v1/score/(\d{4}-\d{2}-\d{2})$')
+
+
+def loadRecording(path):
+    """
+    Load a recording written by recordGame.py.
+    """
+    with open(path, 'r') as recordingFile:
+        return json.load(recordingFile)
+
+
+def scoreEntry(playByPlay):
+    """
+    Returns the v1/score entry of a game, built from a play-by-play response.
+    """
+    teams = {homeOrAway: {key: playByPlay[homeOrAway][key] for key in ('id', 'abbrev', 'name', 'score')
+                          if key in playByPlay[homeOrAway]} for homeOrAway in ('awayTeam', 'homeTeam')}
+    periodDescriptor = playByPlay.get('periodDescriptor', {})
+    return dict(teams, id=playByPlay['id'], gameState=playByPlay['gameState'], startTimeUTC=playByPlay['startTimeUTC'],
+                period=periodDescriptor.get('number'), periodDescriptor=periodDescriptor,
+                clock=playByPlay.get('clock', {}))
+
+
+# Local stand-in for api-web.nhle.com. It serves the schedule and the play-by-play snapshots of a recorded game,
+# moving through the snapshots as time passes. With speed=60 a full game replays in under two minutes. More games can
+# be played alongside it, for a whole night of the league on the scoreboard endpoint.
+class ReplayServer:
+    """
+    HTTP server that replays a recording.
+
+    Parameters:
+    - recording (dict): A recording with 'gameId', 'schedule' and 'snapshots', see syntheticGame.generateGame.
+    - speed (float): How many seconds of game time pass per wall-clock second.
+    - host (str): Interface to listen on.
+    - port (int): Port to listen on, 0 picks a free one.
+    - league (list): More recordings to play at the same time. They are in the schedule and on v1/score/{date} too.
+
+    Note:
+    Snapshot t values are seconds relative to puck drop and the replay starts at the first snapshot of every game.
+    v1/score/{date} lists every game scheduled on that date with its current score, period and clock. Responses carry
+    an ETag per snapshot and are gzip encoded when the client asks for it, so conditional requests and bytes on the
+    wire behave like the real API. GET /__stats returns the request counters and the wall-clock time at which each
+    snapshot became visible.
+    """
+
+    def __init__(self, recording, speed=1.0, host='127.0.0.1', port=0, league=()):
+        self.recording = recording
+        self.speed = speed
+        self.snapshots = recording['snapshots']
+        self.times = [snapshot['t'] for snapshot in self.snapshots]
+        self.startedAt = None
+        self.lock = threading.Lock()
+        # Encode every snapshot up front so the server's own work doesn't show up as detection latency
+        self.games = {}  # gameId -> (snapshot times, encoded snapshots, score entries)
+        for game in [recording] + list(league):
+            snapshots = game['snapshots']
+            self.games[game['gameId']] = ([snapshot['t'] for snapshot in snapshots],
+                                          [gzip.compress(json.dumps(snapshot['playByPlay']).encode())
+                                           for snapshot in snapshots],
+                                          [scoreEntry(snapshot['playByPlay']) for snapshot in snapshots])
+        self.encoded = self.games[recording['gameId']][1]
+        self.schedule = json.loads(json.dumps(recording['schedule']))
+        days = {day['date']: day for day in self.schedule['gameWeek']}
+        for game in league:
+            for day in game['schedule']['gameWeek']:
+                if day['date'] in days:
+                    days[day['date']]['games'].extend(day['games'])
+        self.stats = {'requests': 0, 'notModified': 0, 'bytesSent': 0, 'playByPlay': 0, 'score': 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handlerClass())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self):
+        self.startedAt = time.time()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def gameTime(self):
+        """
+        Returns the number of game seconds since puck drop that the replay has reached.
+        """
+        return self.times[0] + (time.time() - self.startedAt) * self.speed
+
+    def snapshotIndex(self, gameId=None):
+        times = self.times if gameId is None else self.games[gameId][0]
+        gameTime = times[0] + (time.time() - self.startedAt) * self.speed
+        return max(0, bisect.bisect_right(times, gameTime) - 1)
+
+    def activationTime(self, index):
+        """
+        Returns the wall-clock time at which a snapshot was or will be first served.
+        """
+        return self.startedAt + (self.times[index] - self.times[0]) / self.speed
+
+    def finished(self):
+        return self.snapshotIndex() == len(self.snapshots) - 1
+
+    def _handlerClass(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes, so without this Nagle plus delayed ACKs add ~40 ms
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with server.lock:
+                    server.stats['requests'] += 1
+
+                if self.path == '/__stats':
+                    self._send(json.dumps(dict(server.stats, startedAt=server.startedAt, speed=server.speed)).encode())
+                    return
+
+                match = PLAY_BY_PLAY_PATH.match(self.path)
+                if match and int(match.group(1)) in server.games:
+                    gameId = int(match.group(1))
+                    with server.lock:
+                        server.stats['playByPlay'] += 1
+                    index = server.snapshotIndex(gameId)
+                    etag = f'"{index}"'
+                    if not self._notModified(etag):
+                        self._send(None, server.games[gameId][1][index], etag)
+                    return
+
+                if SCHEDULE_PATH.match(self.path):
+                    raw = json.dumps(server.schedule).encode()
+                    self._send(raw, gzip.compress(raw))
+                    return
+
+                match = SCORE_PATH.match(self.path)
+                if match:
+                    with server.lock:
+                        server.stats['score'] += 1
+                    day = next((day for day in server.schedule['gameWeek'] if day['date'] == match.group(1)),
+                               {'games': []})
+                    indices = [(game['id'], server.snapshotIndex(game['id'])) for game in day['games']
+                               if game['id'] in server.games]
+                    etag = '"' + '-'.join(str(index) for _, index in indices) + '"'
+                    if not self._notModified(etag):
+                        raw = json.dumps({'currentDate': match.group(1),
+                                          'games': [server.games[gameId][2][index] for gameId, index in indices]})
+                        self._send(raw.encode(), gzip.compress(raw.encode()), etag)
+                    return
+
+                self.send_error(404)
+
+            def _notModified(self, etag):
+                if self.headers.get('If-None-Match') != etag:
+                    return False
+                with server.lock:
+                    server.stats['notModified'] += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return True
+
+            def _send(self, raw, compressed=None, etag=None):
+                useGzip = compressed is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+                if useGzip:
+                    body = compressed
+                else:
+                    body = raw if raw is not None else gzip.decompress(compressed)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if useGzip:
+                    self.send_header('Content-Encoding', 'gzip')
+                if etag:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+                with server.lock:
+                    server.stats['bytesSent'] += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def _serve(recording, speed, ready, done, league):
+    server = ReplayServer(recording, speed, league=league).start()
+    ready.put((server.url, server.startedAt))
+    done.wait()
+    server.stop()
+
+
+# Runs the replay server in its own process so the CPU it burns isn't counted against the code being measured
+class ReplayServerProcess:
+    """
+    ReplayServer running in a child process.
+
+    Parameters:
+    - recording (dict): The recording to serve.
+    - speed (float): How many seconds of game time pass per wall-clock second.
+    - league (list): More recordings to play at the same time, see ReplayServer.
+    """
+
+    def __init__(self, recording, speed=1.0, league=()):
+        self.recording = recording
+        self.speed = speed
+        self.league = list(league)
+        self.times = [snapshot['t'] for snapshot in recording['snapshots']]
+        self.url = None
+        self.startedAt = None
+        self._done = multiprocessing.Event()
+        self._process = None
+
+    def __enter__(self):
+        ready = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_serve, daemon=True,
+                                                args=(self.recording, self.speed, ready, self._done, self.league))
+        self._process.start()
+        self.url, self.startedAt = ready.get(timeout=30)
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._process.join(timeout=10)
+
+    def activationTime(self, index):
+        return self.startedAt + (self.times[index] - self.times[0]) / self.speed
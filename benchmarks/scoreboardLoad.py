@@ -0,0 +1,146 @@
+"""
+Scoreboard mode benchmark.
+
+Replays a night of the league (several synthetic games at once) through the local stand-in for the NHL API and runs
+the lamp's scoreboard mode (followScoreboard) against it. Reports how many requests the night cost compared with
+polling every game's play-by-play, how late goals reached the event bus, and the CPU time and peak RSS of the lamp.
+
+Usage:
+    python benchmarks/scoreboardLoad.py [--games 12] [--speed 300] [--json report.json]
+
+Runs fully offline.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from goalLatency import goalAppearances  # noqa: E402
+from replayServer import ReplayServerProcess  # noqa: E402
+from runStats import peakRSSMB, percentile  # noqa: E402
+from syntheticGame import generateGame  # noqa: E402
+
+
+def leagueNight(games, seed=0, date='2024-01-13'):
+    """
+    Returns made up games that all start at the same time on one date, each from its own seed.
+    """
+    return [generateGame(seed + number, 2023020500 + number, f'{date}T00:00:00Z') for number in range(games)]
+
+
+def runBenchmark(recordings, speed):
+    """
+    Replay every game at once and follow them with the scoreboard.
+
+    Parameters:
+    - recordings (list): The games to replay, all on the same date.
+    - speed (float): Game seconds per wall-clock second.
+
+    Returns:
+    dict: The benchmark report.
+    """
+    # sabresGoalCheck opens its audio mapping relative to the repository root
+    os.chdir(REPO_ROOT)
+    import lampConfig
+    import sabresGoalCheck
+    from eventBus import EventBus
+    from gameSimulator import SimulatedClock
+
+    date = recordings[0]['schedule']['gameWeek'][0]['date']
+    workFolder = tempfile.mkdtemp(prefix='lampScoreboard')
+    with ReplayServerProcess(recordings[0], speed, recordings[1:]) as server:
+        overrides = {
+            'mode': 'scoreboard',
+            'api': {'baseUrl': server.url},
+            'cache': {'schedule': f'{workFolder}/schedule.json', 'checkpoints': f'{workFolder}/checkpoints',
+                      'stats': f'{workFolder}/stats.json'},
+            'archive': {'enabled': False},
+        }
+        # The lamp's waits are sped up to match the replay
+        sabresGoalCheck.configure(lampConfig.loadConfig(overrides=overrides),
+                                  lampClock=SimulatedClock(datetime.datetime.now(datetime.timezone.utc), speed))
+        bus = sabresGoalCheck.eventBus = EventBus(historySize=100000)
+
+        cpuStart = time.process_time()
+        wallStart = time.time()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                followed = asyncio.run(sabresGoalCheck.followScoreboard(date))
+        finally:
+            shutil.rmtree(workFolder, ignore_errors=True)
+        cpuSeconds = time.process_time() - cpuStart
+        wallSeconds = time.time() - wallStart
+        serverStats = sabresGoalCheck.fetchClient.session.get(server.url + '__stats').json()
+        startedAt = server.startedAt
+
+    latencies = []
+    goals = 0
+    detected = {(event['gameId'], event['eventId']): event['time'] for event in bus.history if event['type'] == 'goal'}
+    for recording in recordings:
+        times = [snapshot['t'] for snapshot in recording['snapshots']]
+        for eventId, (index, _) in goalAppearances(recording).items():
+            goals += 1
+            seenAt = detected.get((recording['gameId'], eventId))
+            if seenAt is not None:
+                activatedAt = startedAt + (times[index] - times[0]) / speed
+                latencies.append(max(0.0, (seenAt - activatedAt) * speed))
+
+
+    return {
+        'games': len(recordings),
+        'gamesFollowed': len(followed),
+        'speed': speed,
+        'goals': goals,
+        'goalsDetected': len(latencies),
+        'latencyP50': percentile(latencies, 0.50),
+        'latencyP95': percentile(latencies, 0.95),
+        'latencyMax': max(latencies) if latencies else None,
+        'scoreboardPolls': serverStats['score'],
+        'playByPlayRequests': serverStats['playByPlay'],
+        # What polling every game's play-by-play as often as the scoreboard would have cost
+        'perGameRequests': serverStats['score'] * len(recordings),
+        'notModified': serverStats['notModified'],
+        'bytesTransferred': serverStats['bytesSent'],
+        'cpuSeconds': round(cpuSeconds, 3),
+        'wallSeconds': round(wallSeconds, 3),
+        'maxRSSMB': round(peakRSSMB(), 1),
+    }
+
+
+def printReport(report):
+    print(f"Replayed {report['games']} games at {report['speed']}x, {report['gamesFollowed']} followed")
+    print(f"Goals: {report['goals']}  on the event bus: {report['goalsDetected']}")
+    if report['goalsDetected']:
+        print(f"Detection latency (game seconds): p50 {report['latencyP50']:.2f}  p95 {report['latencyP95']:.2f}  "
+              f"max {report['latencyMax']:.2f}")
+    print(f"Scoreboard polls: {report['scoreboardPolls']}  play-by-play requests: {report['playByPlayRequests']}  "
+          f"(polling every game: {report['perGameRequests']})")
+    print(f"304s: {report['notModified']}  bytes: {report['bytesTransferred']}")
+    print(f"CPU: {report['cpuSeconds']} s  wall: {report['wallSeconds']} s  peak RSS: {report['maxRSSMB']} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=12, help='How many games are on at once.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first synthetic game.')
+    parser.add_argument('--speed', type=float, default=300, help='Game seconds per wall-clock second.')
+    parser.add_argument('--json', help='Also write the report to this file.')
+    options = parser.parse_args()
+
+    report = runBenchmark(leagueNight(options.games, options.seed), options.speed)
+    printReport(report)
+
+    if options.json:
+        with open(options.json, 'w') as reportFile:
+            json.dump(report, reportFile, indent=2)
@@ -0,0 +1,119 @@
+"""
+Startup-time benchmark.
+
+Starts a fresh Python process several times and measures how long importing the lamp takes, how much memory the
+process uses afterwards, and which heavy modules got loaded. The headless lamp should never pull in the GUI or
+plotting stack, so loading any of them counts as a failure.
+
+Usage:
+    python benchmarks/startupTime.py [--runs 5] [--gui] [--json report.json] [--max-seconds 1.0]
+
+Runs fully offline.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from runStats import peakRSSMB  # noqa: E402
+
+# Modules only the GUI needs. The headless lamp must start without any of them.
+HEAVY_MODULES = ('flet', 'matplotlib', 'hockey_rink', 'pandas', 'PIL', 'pyarrow')
+
+# Run in the child process. It imports what the chosen mode needs and reports back as JSON.
+PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import sabresGoalCheck
+if {gui}:
+    import flet
+    import rinkRenderer
+seconds = time.perf_counter() - start
+maxRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'importSeconds': seconds, 'maxRSS': maxRSS,
+                  'heavyModules': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def measureOnce(gui=False):
+    """
+    Start one Python process and import the lamp in it.
+
+    Parameters:
+    - gui (bool): Also import the GUI stack, as `-g True` would.
+
+    Returns:
+    dict: importSeconds, processSeconds (including interpreter start up), maxRSSMB and heavyModules.
+    """
+    code = PROBE.format(gui=gui, heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    processSeconds = time.perf_counter() - start
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return {'importSeconds': probe['importSeconds'], 'processSeconds': processSeconds,
+            'maxRSSMB': peakRSSMB(probe['maxRSS']),
+            'heavyModules': probe['heavyModules']}
+
+
+def runBenchmark(runs=5, gui=False):
+    """
+    Measure start up several times and summarise.
+
+    Parameters:
+    - runs (int): Number of fresh processes to start. The first one also warms the disk cache.
+    - gui (bool): Measure the GUI start up instead of the headless one.
+
+    Returns:
+    dict: The benchmark report.
+    """
+    samples = [measureOnce(gui) for _ in range(runs)]
+    importTimes = [sample['importSeconds'] for sample in samples]
+    processTimes = [sample['processSeconds'] for sample in samples]
+    return {
+        'mode': 'gui' if gui else 'headless',
+        'runs': runs,
+        'importMedian': round(statistics.median(importTimes), 3),
+        'importMin': round(min(importTimes), 3),
+        'processMedian': round(statistics.median(processTimes), 3),
+        'maxRSSMB': round(max(sample['maxRSSMB'] for sample in samples), 1),
+        'heavyModules': sorted(set(name for sample in samples for name in sample['heavyModules'])),
+    }
+
+
+def printReport(report):
+    label = 'GUI' if report['mode'] == 'gui' else 'Headless'
+    print(f"{label} start up over {report['runs']} runs")
+    print(f"Import: median {report['importMedian']} s  min {report['importMin']} s  "
+          f"whole process: median {report['processMedian']} s")
+    print(f"Peak RSS: {report['maxRSSMB']} MB")
+    print(f"Heavy modules loaded: {', '.join(report['heavyModules']) or 'none'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh processes to start.')
+    parser.add_argument('--gui', action='store_true', help='Measure the GUI start up instead of the headless one.')
+    parser.add_argument('--json', help='Also write the report to this file.')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='Exit with status 1 if the median import time is above this.')
+    options = parser.parse_args()
+
+    report = runBenchmark(options.runs, options.gui)
+    printReport(report)
+
+    if options.json:
+        with open(options.json, 'w') as reportFile:
+            json.dump(report, reportFile, indent=2)
+
+    failed = options.max_seconds is not None and report['importMedian'] > options.max_seconds
+    # Headless start up must never drag in the GUI stack
+    if not options.gui and report['heavyModules']:
+        failed = True
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,338 @@
+import asyncio
+import collections
+import itertools
+import json
+import sys
+import time
+import urllib.parse
+
+import metrics
+from goalTracker import CONFIRMED, OVERTURNED, PENDING
+
+# Play types that are passed on to subscribers, and the name they are published under
+PUBLISHED_PLAYS = {'goal': 'goal', 'shot-on-goal': 'shot', 'period-start': 'period-start', 'period-end': 'period-end'}
+
+# Event type published for each state a goal can move to, see goalTracker
+GOAL_EVENTS = {PENDING: 'goal', CONFIRMED: 'goal-confirmed', OVERTURNED: 'goal-overturned'}
+
+# Seconds between keep-alive comments on an idle stream, so dead subscribers are noticed and proxies don't time out
+HEARTBEAT_INTERVAL = 15
+
+
+def normalizePlay(gameId, play, response, eventType=None):
+    """
+    Turn a play-by-play entry into the flat event sent to subscribers.
+
+    Parameters:
+    - gameId (int): The game the play belongs to.
+    - play (dict): The play from the play-by-play response.
+    - response (dict): The response the play came from, for the score.
+    - eventType (str): Name to publish under. Defaults to the name in PUBLISHED_PLAYS.
+
+    Returns:
+    dict: The event, with keys type, gameId, eventId, teamId, period, timeRemaining, x, y, playerId, homeScore and
+    awayScore.
+    """
+    details = play.get('details', {})
+    return {
+        'type': eventType or PUBLISHED_PLAYS[play['typeDescKey']],
+        'gameId': gameId,
+        'eventId': play['eventId'],
+        'teamId': details.get('eventOwnerTeamId'),
+        'period': play.get('periodDescriptor', {}).get('number', play.get('period')),
+        'timeRemaining': play.get('timeRemaining'),
+        'x': details.get('xCoord'),
+        'y': details.get('yCoord'),
+        'playerId': details.get('scoringPlayerId', details.get('shootingPlayerId')),
+        'homeScore': response.get('homeTeam', {}).get('score', 0),
+        'awayScore': response.get('awayTeam', {}).get('score', 0),
+    }
+
+
+# Fan-out of normalized game events to any number of local subscribers. The lamp polls the NHL once, and every light,
+# display and extra lamp in the building listens here instead of polling on its own, so the upstream request rate
+# doesn't grow with the number of devices.
+class EventBus:
+    """
+    In-process publish/subscribe bus with a short replay history.
+
+    Parameters:
+    - historySize (int): How many recent events are kept for subscribers that reconnect.
+    - queueSize (int): Most events waiting for one subscriber. A subscriber that falls this far behind is dropped,
+      and can reconnect and resume from the history.
+
+    Note:
+    Every event gets an increasing 'id'. A subscriber that passes the last id it saw gets everything it missed that
+    is still in the history, so a brief disconnect doesn't lose a goal. If it missed more than that (the events fell
+    out of the history, there are more of them than fit in its queue, or the lamp was restarted since) it is sent a
+    'reset' event first, with the latest score of every game, followed by the newest events that fit.
+    """
+
+    def __init__(self, historySize=500, queueSize=256):
+        self.history = collections.deque(maxlen=historySize)
+        self.queueSize = queueSize
+        self.subscribers = set()
+        self.finishedGames = set()
+        self.scores = {}  # gameId -> (homeScore, awayScore) of its latest event
+        self.lastId = 0
+        self._ids = itertools.count(1)
+
+    def publish(self, event):
+        """
+        Send an event to every subscriber. Never blocks.
+        """
+        event = dict(event, id=next(self._ids), time=time.time())
+        self.lastId = event['id']
+        self.history.append(event)
+        if 'homeScore' in event:
+            self.scores[event['gameId']] = (event['homeScore'], event['awayScore'])
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up. Closing it lets the subscriber reconnect and catch up from the history.
+                self.close(queue)
+        return event
+
+    def publishUpdate(self, gameId, update):
+        """
+        Publish the events in one poll of a game's feed.
+
+        Parameters:
+        - gameId (int): The game that was polled.
+        - update (FeedUpdate): The result of the poll.
+
+        Returns:
+        list: The events that were published.
+        """
+        published = []
+        response = update.response
+        for play in update.newPlays:
+            # Goals are published from the goal tracker below, once per state
+            if play['typeDescKey'] in PUBLISHED_PLAYS and play['typeDescKey'] != 'goal':
+                published.append(self.publish(normalizePlay(gameId, play, response)))
+        for transition in update.goalTransitions:
+            if transition.play is not None:
+                event = normalizePlay(gameId, transition.play, response, GOAL_EVENTS[transition.state])
+            else:
+                event = {'type': GOAL_EVENTS[transition.state], 'gameId': gameId, 'eventId': transition.eventId,
+                         'teamId': transition.teamId, 'homeScore': response.get('homeTeam', {}).get('score', 0),
+                         'awayScore': response.get('awayTeam', {}).get('score', 0)}
+            published.append(self.publish(event))
+
+        if response.get('gameState') in ('FINAL', 'OFF') and gameId not in self.finishedGames:
+            self.finishedGames.add(gameId)
+            published.append(self.publish({
+                'type': 'final',
+                'gameId': gameId,
+                'homeScore': response.get('homeTeam', {}).get('score', 0),
+                'awayScore': response.get('awayTeam', {}).get('score', 0),
+            }))
+        return published
+
+    def subscribe(self, lastEventId=None):
+        """
+        Start receiving events.
+
+        Parameters:
+        - lastEventId (int): The id of the last event already seen. Anything newer in the history is delivered first.
+
+        Returns:
+        asyncio.Queue: Events in order. A None in the queue means the subscription was dropped. A 'reset' event means
+        some of what was missed can't be sent: whatever the subscriber knew should be replaced by the scores in it.
+        """
+        queue = asyncio.Queue(self.queueSize)
+        if lastEventId is not None:
+            missed = [event for event in self.history if event['id'] > lastEventId]
+            firstKept = self.history[0]['id'] if self.history else self.lastId + 1
+            # Leave room in the queue for the first new event, or the subscriber is dropped as soon as it joins
+            room = max(1, self.queueSize - 1)
+            if lastEventId + 1 < firstKept or lastEventId > self.lastId or len(missed) > room:
+                missed = missed[len(missed) - room + 1:] if room > 1 else []
+                queue.put_nowait(self._resetEvent(missed[0]['id'] - 1 if missed else self.lastId))
+            for event in missed:
+                queue.put_nowait(event)
+        self.subscribers.add(queue)
+        return queue
+
+    def _resetEvent(self, eventId):
+        # Not published: it only goes to the one subscriber that fell behind. Its id is the last event it stands in
+        # for, so a subscriber that reconnects with it picks up with the events that followed.
+        return {
+            'type': 'reset',
+            'id': eventId,
+            'time': time.time(),
+            'games': [{'gameId': gameId, 'homeScore': homeScore, 'awayScore': awayScore,
+                       'final': gameId in self.finishedGames}
+                      for gameId, (homeScore, awayScore) in self.scores.items()],
+        }
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def close(self, queue=None):
+        """
+        End one subscription, or all of them. The subscriber gets a None once it has read what is already queued.
+        """
+        queues = list(self.subscribers) if queue is None else [queue]
+        for queue in queues:
+            self.subscribers.discard(queue)
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+
+# Serves the bus as Server-Sent Events over plain HTTP, on TCP and/or a Unix socket. SSE needs nothing but an HTTP
+# client on the other end (curl, a browser's EventSource, or readEvents below), and it runs on the lamp's own event
+# loop, so publishing and sending are the same few microseconds of work.
+class EventBusServer:
+    """
+    Minimal HTTP server streaming an EventBus.
+
+    Parameters:
+    - bus (EventBus): The bus to serve.
+    - host (str): Interface to listen on. None disables TCP.
+    - port (int): TCP port, 0 picks a free one.
+    - unixPath (str): Path of a Unix socket to listen on as well, or None.
+
+    Note:
+    GET /events streams events. Pass the last id seen as a Last-Event-ID header or ?since= to resume.
+    GET /recent returns the history as a JSON list.
+    GET /metrics returns the lamp's metrics in the Prometheus text format, and GET /stats the same as JSON.
+    """
+
+    def __init__(self, bus, host='127.0.0.1', port=8765, unixPath=None):
+        self.bus = bus
+        self.host = host
+        self.port = port
+        self.unixPath = unixPath
+        self.servers = []
+
+    async def start(self):
+        if self.host is not None:
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]
+            self.servers.append(server)
+        if self.unixPath is not None:
+            self.servers.append(await asyncio.start_unix_server(self._handle, self.unixPath))
+        return self
+
+    async def stop(self):
+        # Ends every open stream, so the servers can close without waiting on idle subscribers
+        self.bus.close()
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        self.servers = []
+
+    async def _handle(self, reader, writer):
+        try:
+            requestLine = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if len(requestLine) < 2 or requestLine[0] != 'GET':
+                await self._respond(writer, '405 Method Not Allowed', b'')
+                return
+            url = urllib.parse.urlsplit(requestLine[1])
+            query = urllib.parse.parse_qs(url.query)
+
+            if url.path == '/recent':
+                await self._respond(writer, '200 OK', json.dumps(list(self.bus.history)).encode(),
+                                    'application/json')
+            elif url.path == '/metrics':
+                await self._respond(writer, '200 OK', metrics.REGISTRY.render().encode(),
+                                    'text/plain; version=0.0.4')
+            elif url.path == '/stats':
+                await self._respond(writer, '200 OK', json.dumps(metrics.REGISTRY.snapshot()).encode(),
+                                    'application/json')
+            elif url.path == '/events':
+                since = headers.get('last-event-id', query.get('since', [None])[0])
+                await self._stream(writer, int(since) if since not in (None, '') else None)
+            else:
+                await self._respond(writer, '404 Not Found', b'')
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, body, contentType='text/plain'):
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: {contentType}\r\nContent-Length: {len(body)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + body)
+        await writer.drain()
+
+    async def _stream(self, writer, since):
+        queue = self.bus.subscribe(since)
+        try:
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                         b'Connection: keep-alive\r\n\r\n')
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    writer.write(b': keep-alive\n\n')
+                    await writer.drain()
+                    continue
+                if event is None:
+                    return
+                writer.write(f'id: {event["id"]}\nevent: {event["type"]}\ndata: {json.dumps(event)}\n\n'.encode())
+                await writer.drain()
+        finally:
+            self.bus.unsubscribe(queue)
+
+
+async def readEvents(host='127.0.0.1', port=8765, unixPath=None, since=None):
+    """
+    Subscribe to an EventBusServer and yield its events. Runs until the server goes away.
+
+    Parameters:
+    - host (str): Server address.
+    - port (int): Server port.
+    - unixPath (str): Connect to this Unix socket instead of host and port.
+    - since (int): Last event id already seen, to resume after it.
+
+    Returns:
+    Async generator of event dicts.
+    """
+    if unixPath is not None:
+        reader, writer = await asyncio.open_unix_connection(unixPath)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    path = '/events' if since is None else f'/events?since={since}'
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n'.encode())
+    await writer.drain()
+    try:
+        # Skip the response headers
+        while (await reader.readline()).strip():
+            pass
+        data = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            line = line.decode().rstrip('\n')
+            if line.startswith('data:'):
+                data.append(line[5:].strip())
+            elif not line and data:
+                yield json.loads('\n'.join(data))
+                data = []
+    finally:
+        writer.close()
+
+
+async def _printEvents(host, port):
+    async for event in readEvents(host, port):
+        print(json.dumps(event))
+
+
+if __name__ == '__main__':
+    # Simple subscriber for trying the bus out: python eventBus.py [host] [port]
+    arguments = sys.argv[1:]
+    asyncio.run(_printEvents(arguments[0] if arguments else '127.0.0.1', int(arguments[1]) if len(arguments) > 1
+                             else 8765))
@@ -0,0 +1,92 @@
+import numpy as np
+
+# Column layouts used for the shot and goal stores. 'EN' is the play's sortOrder and 'SN' the scorer's sweater number.
+SHOT_COLUMNS = (('x', np.float64), ('y', np.float64), ('EN', np.int64))
+GOAL_COLUMNS = (('x', np.float64), ('y', np.float64), ('SN', np.int64), ('EN', np.int64))
+
+
+# Append-only, column-oriented store for shots and goals. It replaces growing a DataFrame with pd.concat, which copies
+# every row already stored on every append. Each column is a NumPy array that doubles in size when it fills up, so
+# appending is amortised O(1), and reading a column returns a view of the filled part without copying anything.
+class EventStore:
+    """
+    Growable columnar store of numeric events.
+
+    Parameters:
+    - columns (tuple): (name, dtype) pairs, e.g. SHOT_COLUMNS.
+    - capacity (int): Number of rows to allocate up front.
+
+    Note:
+    store['x'] and store.columns() return views into the store's buffers. They stay valid until the next append that
+    has to grow the buffers, so take a copy if you need to keep one around while appending. The store can be passed
+    straight to hockey_rink and matplotlib as data=, since they only look columns up by name.
+    """
+
+    __slots__ = ('names', '_arrays', '_size')
+
+    def __init__(self, columns, capacity=64):
+        self.names = tuple(name for name, _ in columns)
+        self._arrays = {name: np.empty(capacity, dtype=dtype) for name, dtype in columns}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        return self._arrays[name][:self._size]
+
+    def __contains__(self, name):
+        return name in self._arrays
+
+    def _reserve(self, size):
+        capacity = len(self._arrays[self.names[0]])
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity = max(1, capacity * 2)
+        for name, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._arrays[name] = grown
+
+    def append(self, *values):
+        """
+        Append one row. Values are given in column order.
+        """
+        self._reserve(self._size + 1)
+        for name, value in zip(self.names, values):
+            self._arrays[name][self._size] = value
+        self._size += 1
+
+    def extend(self, rows):
+        """
+        Append many rows at once. rows is a sequence of rows in column order, or a 2D array.
+        """
+        rows = np.asarray(rows)
+        if rows.size == 0:
+            return
+        rows = rows.reshape(-1, len(self.names))
+        start = self._size
+        self._reserve(start + len(rows))
+        for index, name in enumerate(self.names):
+            self._arrays[name][start:start + len(rows)] = rows[:, index]
+        self._size += len(rows)
+
+    def columns(self):
+        """
+        Returns a dict of column name to zero-copy view of the filled rows.
+        """
+        return {name: self[name] for name in self.names}
+
+    def copy(self):
+        """
+        Returns a new store with a copy of the filled rows, safe to read on another thread while this one grows.
+        """
+        store = EventStore(tuple((name, array.dtype) for name, array in self._arrays.items()), max(1, self._size))
+        for name in self.names:
+            store._arrays[name][:self._size] = self[name]
+        store._size = self._size
+        return store
+
+    def clear(self):
+        self._size = 0
@@ -0,0 +1,135 @@
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+import metrics
+
+# (connect, read) timeouts in seconds for each NHL API endpoint. A hung socket used to freeze the whole lamp, so
+# every request now has a deadline. The endpoint is picked by looking for the key in the URL.
+DEFAULT_TIMEOUTS = {
+    'play-by-play': (3.05, 8),
+    'schedule': (3.05, 15),
+    'default': (3.05, 10),
+}
+
+
+class FetchResult:
+    """
+    The result of a single fetch.
+
+    Attributes:
+    - data (dict): The decoded JSON body. On a 304 this is the body cached from the last 200.
+    - notModified (bool): True if the server answered 304 and no body was downloaded or decoded.
+    - stale (bool): True if the request failed and the cached body was returned instead.
+    - numBytes (int): Size of the (compressed) body that was transferred.
+    - elapsed (float): Wall-clock seconds spent on the request.
+    """
+
+    __slots__ = ('data', 'notModified', 'stale', 'numBytes', 'elapsed')
+
+    def __init__(self, data, notModified=False, stale=False, numBytes=0, elapsed=0.0):
+        self.data = data
+        self.notModified = notModified
+        self.stale = stale
+        self.numBytes = numBytes
+        self.elapsed = elapsed
+
+
+# Shared HTTP layer for every call to the NHL API. One pooled session keeps connections alive between polls, and
+# ETag/Last-Modified validators are sent back so unchanged payloads come back as an empty 304.
+class FetchClient:
+    """
+    Pooled, conditional JSON fetcher.
+
+    Parameters:
+    - timeouts (dict): Endpoint name to (connect, read) timeout, see DEFAULT_TIMEOUTS.
+    - retries (int): How many times a failed request or a 429/5xx answer is retried.
+    - backoff (float): Backoff factor between retries; the waits are backoff, 2 * backoff, 4 * backoff, ...
+    - poolSize (int): Number of keep-alive connections kept per host.
+
+    Note:
+    gzip is always negotiated. brotli is optional: 'br' is only put in Accept-Encoding when the brotli package can be
+    imported, so without it the NHL sends gzip and nothing else changes. acceptEncoding says which were asked for.
+    """
+
+    def __init__(self, timeouts=None, retries=3, backoff=0.5, poolSize=4):
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=('GET',), raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=poolSize, pool_maxsize=poolSize)
+
+        self.session = requests.Session()
+        # urllib3 lists only the encodings it can decode here, so 'br' is left out when brotli isn't installed
+        self.acceptEncoding = make_headers(accept_encoding=True)['accept-encoding']
+        self.session.headers['Accept-Encoding'] = self.acceptEncoding
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.cache = {}  # url -> (etag, lastModified, data)
+
+    def timeoutFor(self, url):
+        for endpoint, timeout in self.timeouts.items():
+            if endpoint in url:
+                return timeout
+        return self.timeouts['default']
+
+    def get(self, url):
+        """
+        Fetch a JSON document, revalidating against the copy from the last successful fetch.
+
+        Parameters:
+        - url (str): The URL to fetch.
+
+        Returns:
+        FetchResult: The decoded body and some information about the transfer.
+
+        Note:
+        If the request fails after all retries and an earlier copy of the document is cached, the cached copy is
+        returned with stale set to True so a single network blip doesn't stop the lamp. Otherwise the
+        requests.RequestException is raised.
+        """
+        headers = {}
+        cached = self.cache.get(url)
+        if cached is not None:
+            etag, lastModified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if lastModified:
+                headers['If-Modified-Since'] = lastModified
+
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeoutFor(url))
+            metrics.observe('lamp_fetch_seconds', time.perf_counter() - start)
+            if response.status_code == 304 and cached is not None:
+                metrics.inc('lamp_fetch_total', result='not_modified')
+                return FetchResult(cached[2], notModified=True, elapsed=time.perf_counter() - start)
+            response.raise_for_status()
+            with metrics.span('lamp_decode_seconds'):
+                data = response.json()
+        except (requests.RequestException, ValueError) as error:
+            metrics.inc('lamp_fetch_total', result='failed')
+            if cached is None:
+                raise
+            print(f'Request to {url} failed ({error}), using the last copy')
+            return FetchResult(cached[2], stale=True, elapsed=time.perf_counter() - start)
+
+        self.cache[url] = (response.headers.get('ETag'), response.headers.get('Last-Modified'), data)
+        numBytes = int(response.headers.get('Content-Length', len(response.content)))
+        metrics.inc('lamp_fetch_total', result='ok')
+        metrics.observe('lamp_payload_bytes', numBytes, metrics.BYTES_BUCKETS)
+        return FetchResult(data, numBytes=numBytes, elapsed=time.perf_counter() - start)
+
+    def getJSON(self, url):
+        """
+        Returns only the decoded body of get(url).
+        """
+        return self.get(url).data
+
+    def close(self):
+        self.session.close()
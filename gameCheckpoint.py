@@ -0,0 +1,117 @@
+import json
+import os
+import time
+
+from atomicFile import atomicWrite
+from eventStore import EventStore
+
+# Bumped whenever the file layout changes, so an old checkpoint is ignored instead of misread
+CHECKPOINT_VERSION = 2
+
+
+# What the lamp needs to pick a game back up after a crash or a restart, written after every poll that changed
+# something. It only holds the lamp's own state (where it got to in the feed, the score it last saw, the state of
+# every goal and the shots it has plotted), so it stays a few kilobytes no matter how long the game runs.
+class GameCheckpoint:
+    """
+    Small on-disk checkpoint of one game.
+
+    Parameters:
+    - gameId (int): The game being followed.
+    - folder (str): Folder the checkpoint files are kept in. It is created if needed.
+
+    Attributes:
+    - lastSortOrder (int): sortOrder of the last play handled, -1 before the first one.
+    - scores (dict): 'homeTeam' and 'awayTeam' scores as of the last poll handled.
+    - goals (dict): The game's GoalTracker states(), so a goal that was already reacted to isn't reacted to again.
+    - stores (dict): Name to column dict of the accumulated shot and goal stores.
+
+    Note:
+    save() goes through atomicWrite, so a crash or power cut at any point leaves either the old checkpoint or the new
+    one, never half of each.
+    """
+
+    def __init__(self, gameId, folder='./cache/checkpoints'):
+        self.gameId = gameId
+        self.path = os.path.join(folder, f'{gameId}.json')
+        self.lastSortOrder = -1
+        self.scores = {'homeTeam': 0, 'awayTeam': 0}
+        self.goals = {}
+        self.stores = {}
+        self.savedAt = None
+
+    def load(self):
+        """
+        Read the checkpoint from disk.
+
+        Returns:
+        bool: True if a checkpoint for this game was found. If not, or it can't be read, nothing is changed.
+        """
+        try:
+            with open(self.path, 'r') as checkpointFile:
+                state = json.load(checkpointFile)
+        except (OSError, ValueError):
+            return False
+        if state.get('version') != CHECKPOINT_VERSION or state.get('gameId') != self.gameId:
+            return False
+        self.lastSortOrder = state['lastSortOrder']
+        self.scores = state['scores']
+        self.goals = state['goals']
+        self.stores = state['stores']
+        self.savedAt = state.get('savedAt')
+        return True
+
+    def record(self, feed, stores=None):
+        """
+        Take the current state of a game, ready to be saved.
+
+        Parameters:
+        - feed (GameFeed): The game's feed, after its last poll was handled.
+        - stores (dict): Name to EventStore of shots and goals to keep, e.g. {'sabresShots': sabresShots}.
+        """
+        self.lastSortOrder = feed.lastSortOrder
+        self.scores = {homeOrAway: feed.score(homeOrAway) for homeOrAway in ('homeTeam', 'awayTeam')}
+        self.goals = feed.goals.states()
+        # Plain lists are taken now, so the stores can keep growing while save() runs on another thread
+        for name, store in (stores or {}).items():
+            self.stores[name] = {column: values.tolist() for column, values in store.columns().items()}
+
+    def restoreStore(self, name, columns):
+        """
+        Returns a saved store as a new EventStore.
+
+        Parameters:
+        - name (str): The name the store was recorded under.
+        - columns (tuple): The store's column layout, e.g. SHOT_COLUMNS.
+        """
+        store = EventStore(columns)
+        saved = self.stores.get(name)
+        if saved:
+            store.extend(list(zip(*(saved[column] for column in store.names))))
+        return store
+
+    def save(self):
+        """
+        Write the recorded state to disk atomically.
+        """
+        self.savedAt = time.time()
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'gameId': self.gameId,
+            'savedAt': self.savedAt,
+            'lastSortOrder': self.lastSortOrder,
+            'scores': self.scores,
+            'goals': self.goals,
+            'stores': self.stores,
+        }
+        with atomicWrite(self.path) as checkpointFile:
+            json.dump(state, checkpointFile, separators=(',', ':'))
+
+    def remove(self):
+        """
+        Delete the checkpoint, once the game is over.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,246 @@
+import time
+
+import metrics
+from fetchClient import FetchClient
+from goalTracker import PENDING, GoalTracker
+
+
+class FeedUpdate:
+    """
+    The result of a single poll of a game's play-by-play feed.
+
+    Attributes:
+    - response (dict): The full decoded play-by-play response from the NHL API.
+    - newPlays (list): Plays that have not been seen before, in sortOrder.
+    - changedPlays (list): Previously seen plays whose contents were edited by the NHL (scorer changes, etc.).
+    - removedPlays (list): Previously seen plays that no longer appear in the feed (overturned goals, etc.).
+    - goalTransitions (list): GoalTransition for every goal that was found, confirmed or overturned by this poll.
+    """
+
+    __slots__ = ('response', 'newPlays', 'changedPlays', 'removedPlays', 'goalTransitions')
+
+    def __init__(self, response, newPlays=None, changedPlays=None, removedPlays=None, goalTransitions=None):
+        self.response = response
+        self.newPlays = newPlays or []
+        self.changedPlays = changedPlays or []
+        self.removedPlays = removedPlays or []
+        self.goalTransitions = goalTransitions or []
+
+    def hasChanges(self):
+        return bool(self.newPlays or self.changedPlays or self.removedPlays)
+
+
+# Keeps track of the plays already seen for a game so that each poll only has to look at the plays that are new
+# since the last poll, instead of walking the entire game every ten seconds.
+class GameFeed:
+    """
+    Stateful, incremental reader of the v1/gamecenter/{GID}/play-by-play endpoint.
+
+    Parameters:
+    - url (str): The play-by-play URL for the game.
+    - client (FetchClient): The shared fetch layer. A new one is created if none is given.
+    - revisionWindow (int): How many of the most recent already-seen plays are re-checked on each poll for edits.
+      The NHL usually corrects plays (scorer changes, assists, coordinates) shortly after they happen.
+    - goalTracker (GoalTracker): State machine the goals are tracked in. A new one is created if none is given.
+
+    Note:
+    Each call to poll() does exactly one fetch. New plays are found by walking backwards from the end of the feed
+    until a play at or before the last seen sortOrder is reached, so the cost of a poll scales with the number of
+    new plays rather than the length of the game. If the number of already-seen plays no longer matches what we have
+    stored, a full reconcile is done to find the removed or edited plays. Every diff is also run through the goal
+    tracker, and goals already in the feed on the first poll are taken as history rather than reported.
+    """
+
+    def __init__(self, url, client=None, revisionWindow=20, goalTracker=None):
+        self.url = url
+        self.client = client if client is not None else FetchClient()
+        self.revisionWindow = revisionWindow
+        self.response = None
+        self.previousResponse = None
+        self.plays = {}  # eventId -> play
+        self.playOrder = []  # eventIds in sortOrder
+        self.lastSortOrder = -1
+        self.lastUpdate = None  # FeedUpdate from the most recent poll, for anyone downstream of the poller
+        self.goals = goalTracker if goalTracker is not None else GoalTracker()
+        self.clock = metrics.FeedClock()
+
+    def __len__(self):
+        return len(self.playOrder)
+
+    def poll(self):
+        """
+        Fetch the feed once and return a FeedUpdate with only the plays that are new or have changed.
+
+        If the server reports the feed as unchanged (304), the fetch failed and a stale copy was returned, or the
+        response has lost every play the game had, the diff is skipped entirely and an empty update is returned.
+        """
+        result = self.client.get(self.url)
+        # A response with no plays at all for a game that had some is a bad one, not every play taken back
+        truncated = self.playOrder and not (result.data or {}).get('plays')
+        if (result.notModified or result.stale or truncated) and self.response is not None:
+            self.previousResponse = self.response
+            self.lastUpdate = FeedUpdate(self.response)
+        else:
+            with metrics.span('lamp_diff_seconds'):
+                self.lastUpdate = self.ingest(result.data)
+        self._recordPoll(time.time())
+        return self.lastUpdate
+
+    def _recordPoll(self, now):
+        metrics.inc('lamp_polls_total')
+        metrics.setGauge('lamp_last_poll_timestamp_seconds', now)
+        for transition in self.lastUpdate.goalTransitions:
+            metrics.inc('lamp_goal_transitions_total', state=transition.state)
+            if transition.state == PENDING:
+                # Worked out before this response's clock is taken in, since the clock stops on a goal
+                delay = self.clock.delayOf(transition.play, now)
+                if delay is not None:
+                    metrics.observe('lamp_goal_detection_delay_seconds', delay, metrics.DELAY_BUCKETS)
+        self.clock.observe(self.response, now)
+
+    def ingest(self, response):
+        """
+        Diff a decoded play-by-play response against the plays already seen.
+
+        Parameters:
+        - response (dict): A decoded play-by-play response.
+
+        Returns:
+        FeedUpdate: The new, changed and removed plays.
+        """
+        self.previousResponse = self.response
+        self.response = response
+        plays = response.get('plays') or []
+
+        # Walk backwards to find the plays after the last one we saw
+        start = len(plays)
+        while start > 0 and plays[start - 1]['sortOrder'] > self.lastSortOrder:
+            start -= 1
+        newPlays = plays[start:]
+
+        changedPlays = []
+        removedPlays = []
+        if start != len(self.playOrder):
+            # Plays were inserted or removed before the last seen play, so reconcile everything
+            changedPlays, removedPlays, newPlays = self._reconcile(plays)
+        else:
+            # Only re-check the tail of the plays we have already seen
+            for play in plays[max(0, start - self.revisionWindow):start]:
+                eventId = play['eventId']
+                if eventId not in self.plays:
+                    changedPlays, removedPlays, newPlays = self._reconcile(plays)
+                    break
+                if self.plays[eventId] != play:
+                    self.plays[eventId] = play
+                    changedPlays.append(play)
+            else:
+                for play in newPlays:
+                    self.plays[play['eventId']] = play
+                    self.playOrder.append(play['eventId'])
+
+        self.lastSortOrder = plays[-1]['sortOrder'] if plays else -1
+
+        if self.previousResponse is None:
+            self.goals.seed(plays)
+            goalTransitions = []
+        else:
+            goalTransitions = self.goals.advance(newPlays, changedPlays, removedPlays,
+                                                 response.get('gameState') in ('FINAL', 'OFF'))
+        return FeedUpdate(response, newPlays, changedPlays, removedPlays, goalTransitions)
+
+    def resume(self, lastSortOrder, scores, goalStates):
+        """
+        Diff the last response again as if only the plays up to a checkpoint had been seen.
+
+        Parameters:
+        - lastSortOrder (int): sortOrder of the last play handled before the restart.
+        - scores (dict): 'homeTeam' and 'awayTeam' scores as of the checkpoint.
+        - goalStates (dict): The goal tracker's states() as of the checkpoint.
+
+        Returns:
+        FeedUpdate: The plays after the checkpoint as new plays, with the checkpoint's score as the previous score and
+        its goal states in the tracker, so goals scored while the lamp was down are picked up exactly like goals found
+        by a normal poll, and goals already handled are not reported again. Goals from before the checkpoint that are
+        gone from the feed are reported as overturned.
+
+        Note:
+        No fetch is done. The feed must have been polled once, and the plays up to the checkpoint are simply marked as
+        seen instead of being handed to anyone again.
+        """
+        response = self.response
+        self.playOrder = [eventId for eventId in self.playOrder if self.plays[eventId]['sortOrder'] <= lastSortOrder]
+        self.plays = {eventId: self.plays[eventId] for eventId in self.playOrder}
+        self.lastSortOrder = lastSortOrder
+        self.goals = GoalTracker(goalStates)
+        overturned = self.goals.overturnMissing({play['eventId']: play for play in response.get('plays') or []})
+        self.response = dict(response, **{homeOrAway: dict(response[homeOrAway], score=score)
+                                          for homeOrAway, score in scores.items()})
+        self.lastUpdate = self.ingest(response)
+        self.lastUpdate.goalTransitions[:0] = overturned
+        return self.lastUpdate
+
+    def _reconcile(self, plays):
+        seen = self.plays
+        currentIds = set()
+        newPlays = []
+        changedPlays = []
+        for play in plays:
+            eventId = play['eventId']
+            currentIds.add(eventId)
+            if eventId not in seen:
+                newPlays.append(play)
+            elif seen[eventId] != play:
+                changedPlays.append(play)
+        removedPlays = [seen[eventId] for eventId in self.playOrder if eventId not in currentIds]
+
+        self.plays = {play['eventId']: play for play in plays}
+        self.playOrder = [play['eventId'] for play in plays]
+        return changedPlays, removedPlays, newPlays
+
+    def score(self, homeOrAway):
+        """
+        Returns the current score of 'homeTeam' or 'awayTeam' from the last poll.
+        """
+        return self.response[homeOrAway].get('score', 0)
+
+    def previousScore(self, homeOrAway):
+        """
+        Returns the score of 'homeTeam' or 'awayTeam' from the poll before the last one. After the very first poll
+        this is the same as score().
+        """
+        if self.previousResponse is None:
+            return self.score(homeOrAway)
+        return self.previousResponse[homeOrAway].get('score', 0)
+
+    def allPlays(self):
+        """
+        Returns every play seen so far, in sortOrder.
+        """
+        return [self.plays[eventId] for eventId in self.playOrder]
+
+    def latestPlay(self, typeDescKey, teamId=None):
+        """
+        Walks backwards from the end of the feed to find the most recent play of a given type.
+
+        Parameters:
+        - typeDescKey (str): The play type to look for, e.g. 'goal'.
+        - teamId (int): If given, only plays owned by this team are returned.
+
+        Returns:
+        dict or None: The most recent matching play, or None if there isn't one.
+        """
+        for eventId in reversed(self.playOrder):
+            play = self.plays[eventId]
+            if play['typeDescKey'] != typeDescKey:
+                continue
+            if teamId is None or play.get('details', {}).get('eventOwnerTeamId') == teamId:
+                return play
+        return None
+
+    def lastPlay(self):
+        """
+        Returns the most recent play in the feed, or None if the game has no plays yet.
+        """
+        if not self.playOrder:
+            return None
+        return self.plays[self.playOrder[-1]]
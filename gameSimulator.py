@@ -0,0 +1,364 @@
+"""
+Offline game simulator.
+
+Runs recorded or made up games through the whole lamp - main(), the schedule, the feed, the goal tracker, the event
+bus, checkpoints, the play archive, the audio mixer on a null device and the rink renderer - with a clock that runs
+up to thousands of times faster than real time, then prints a timing report.
+
+Usage:
+    python gameSimulator.py [--games 82] [--speed 1000] [--recording game.json ...] [--json report.json] [--gui]
+
+Nothing touches the network or the lamp's own cache folders. --speed 0 runs as fast as the lamp can go.
+"""
+import argparse
+import asyncio
+import bisect
+import contextlib
+import datetime
+import io
+import json
+import re
+import shutil
+import tempfile
+import time
+
+import lampConfig
+import metrics
+import sabresGoalCheck
+from eventBus import EventBus
+from fetchClient import FetchResult
+from runStats import peakRSSMB, percentile
+from syntheticGame import generateGame
+
+PLAY_BY_PLAY_PATH = re.compile(r'v1/gamecenter/(\d+)/play-by-play$')
+SCHEDULE_PATH = re.compile(r'v1/schedule/(\d{4}-\d{2}-\d{2})$')
+
+# The stages of the lamp that are timed, in the order they happen
+REPORTED_STAGES = ('lamp_decode_seconds', 'lamp_diff_seconds', 'lamp_render_seconds', 'lamp_encode_seconds',
+                   'lamp_gui_update_seconds', 'lamp_audio_start_seconds')
+
+
+def syntheticSeason(games, seed=0, firstDay=datetime.date(2024, 1, 13)):
+    """
+    Returns made up games, one a day, each from its own seed so the same arguments always give the same season.
+    """
+    return [generateGame(seed + day, 2023020001 + day, f'{firstDay + datetime.timedelta(days=day)}T00:00:00Z')
+            for day in range(games)]
+
+
+def _utc(startTimeUTC):
+    return datetime.datetime.fromisoformat(startTimeUTC.replace('Z', '+00:00'))
+
+
+# Simulated time for the lamp. It only moves when the lamp waits, so a replay doesn't depend on how fast the machine
+# running it is.
+class SimulatedClock:
+    """
+    A clock that runs faster than real time.
+
+    Parameters:
+    - start (datetime): Time zone aware time the simulation starts at.
+    - speed (float): Simulated seconds per real second for waits between polls. 0 doesn't wait at all.
+
+    Note:
+    Waits for a time of day (the next game, puck drop) are skipped straight to the end, since nothing happens during
+    them. The same games therefore always give the same polls at the same simulated times, whatever the speed.
+    """
+
+    def __init__(self, start, speed=0.0):
+        self.start = start.astimezone(datetime.timezone.utc)
+        self.speed = speed
+        self.elapsed = 0.0
+
+    def now(self, tz=None):
+        current = self.start + datetime.timedelta(seconds=self.elapsed)
+        if tz is None:
+            # Naive local time, like datetime.datetime.now()
+            return current.astimezone().replace(tzinfo=None)
+        return current.astimezone(tz)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds / self.speed if self.speed else 0)
+        self.elapsed += seconds
+
+    async def sleepUntil(self, when):
+        self.elapsed += max(0.0, (when - self.now()).total_seconds())
+        await asyncio.sleep(0)
+
+
+# Stands in for the NHL API. Each request is answered from the snapshot the recording had reached at the simulated
+# time, so the lamp sees exactly what it would have seen polling the real game.
+class SimulatedFeed:
+    """
+    In-process replacement for the FetchClient, serving recorded games.
+
+    Parameters:
+    - recordings (list): Games as made by syntheticGame.generateGame or benchmarks/recordGame.py.
+    - clock (SimulatedClock): The simulated time requests are answered at.
+
+    Note:
+    A snapshot is encoded to JSON the first time it is served and decoded again on every 200, so the lamp pays the
+    same decoding cost it would with the API. Asking again for the snapshot that was served last gets notModified,
+    like a 304. Before puck drop a game is served as 'PRE' with no plays. The schedule only lists the recorded games.
+    """
+
+    def __init__(self, recordings, clock):
+        self.clock = clock
+        self.games = {}
+        for recording in recordings:
+            gameId = recording['gameId']
+            snapshots = recording['snapshots']
+            entry = next(game for day in recording['schedule']['gameWeek'] for game in day['games']
+                         if game['id'] == gameId)
+            goals = {}
+            for index, snapshot in enumerate(snapshots):
+                for play in snapshot['playByPlay'].get('plays', []):
+                    if play['typeDescKey'] == 'goal':
+                        goals.setdefault(play['eventId'], snapshot['t'])
+            self.games[gameId] = {
+                'entry': entry,
+                'puckDrop': _utc(snapshots[0]['playByPlay'].get('startTimeUTC', entry['startTimeUTC'])),
+                'times': [snapshot['t'] for snapshot in snapshots],
+                'snapshots': snapshots,
+                'encoded': {},
+                'goals': goals,
+            }
+        self.served = {}  # url -> (index, data) of the last 200
+        self.seenGoals = set()
+        self.latencies = []  # simulated seconds from a goal appearing in the feed to the lamp fetching it
+        self.stats = {'requests': 0, 'notModified': 0, 'bytes': 0}
+
+    def get(self, url):
+        self.stats['requests'] += 1
+        match = PLAY_BY_PLAY_PATH.search(url)
+        if match:
+            return self._playByPlay(url, int(match.group(1)))
+        match = SCHEDULE_PATH.search(url)
+        if match:
+            return FetchResult(self._schedule(match.group(1)))
+        raise ValueError(f'Nothing to simulate for {url}')
+
+    def getJSON(self, url):
+        return self.get(url).data
+
+    def close(self):
+        pass
+
+    def _playByPlay(self, url, gameId):
+        game = self.games[gameId]
+        gameSeconds = (self.clock.now(datetime.timezone.utc) - game['puckDrop']).total_seconds()
+        index = bisect.bisect_right(game['times'], gameSeconds) - 1
+
+        served = self.served.get(url)
+        if served is not None and served[0] == index:
+            self.stats['notModified'] += 1
+            metrics.inc('lamp_fetch_total', result='not_modified')
+            return FetchResult(served[1], notModified=True)
+
+        body = game['encoded'].get(index)
+        if body is None:
+            body = game['encoded'][index] = json.dumps(self._snapshot(game, index)).encode()
+        with metrics.span('lamp_decode_seconds'):
+            data = json.loads(body)
+        self.served[url] = (index, data)
+        self.stats['bytes'] += len(body)
+        metrics.inc('lamp_fetch_total', result='ok')
+        metrics.observe('lamp_payload_bytes', len(body), metrics.BYTES_BUCKETS)
+
+        for eventId, appearedAt in game['goals'].items():
+            if appearedAt <= gameSeconds and (gameId, eventId) not in self.seenGoals:
+                self.seenGoals.add((gameId, eventId))
+                self.latencies.append(gameSeconds - appearedAt)
+        return FetchResult(data, numBytes=len(body))
+
+    def _snapshot(self, game, index):
+        if index >= 0:
+            return game['snapshots'][index]['playByPlay']
+        first = game['snapshots'][0]['playByPlay']
+        clock = dict(first.get('clock', {}), running=False)
+        return dict(first, gameState='PRE', plays=[], clock=clock,
+                    homeTeam=dict(first['homeTeam'], score=0), awayTeam=dict(first['awayTeam'], score=0))
+
+    def _schedule(self, date):
+        firstDay = datetime.date.fromisoformat(date)
+        week = []
+        for offset in range(7):
+            day = (firstDay + datetime.timedelta(days=offset)).isoformat()
+            week.append({'date': day, 'games': [game['entry'] for game in self.games.values()
+                                                if game['entry']['startTimeUTC'][:10] == day]})
+        return {'gameWeek': week}
+
+
+# Takes the place of the GUI when no window is wanted. The rink is still drawn and encoded for every update, so the
+# rendering cost is measured, but nothing is shown.
+class HeadlessDisplay:
+    """
+    Display with the GameView interface that only counts what it would have sent.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.scorers = []
+        self.rink = None
+        self.updates = 0
+        self.rinkBytes = 0
+
+    def newGame(self, opName):
+        self.values = {}
+        self.scorers = []
+
+    def show(self, rink=None, scorers=None, **values):
+        changed = any(self.values.get(name) != value for name, value in values.items())
+        self.values.update(values)
+        if rink is not None and rink is not self.rink:
+            self.rink = rink
+            self.rinkBytes += len(rink)
+            changed = True
+        if scorers is not None and scorers != self.scorers:
+            self.scorers = list(scorers)
+            changed = True
+        self.updates += changed
+        return changed
+
+
+async def simulate(recordings, speed=0.0, display=None, render=True, configPath=None, profile=None, verbose=False):
+    """
+    Follow every game in recordings with the lamp, in simulated time.
+
+    Parameters:
+    - recordings (list): The games to play, on different days.
+    - speed (float): Simulated seconds per real second between polls. 0 runs as fast as possible.
+    - display (GameView): Where to show the games. A HeadlessDisplay is used if None.
+    - render (bool): Draw and encode the rink. False runs the lamp headless.
+    - configPath (str): Settings file to start from, see lampConfig.py.
+    - profile (str): Profile to start from, see lampConfig.PROFILES.
+    - verbose (bool): Show the lamp's own output.
+
+    Returns:
+    dict: The timing report.
+
+    Note:
+    Caches, checkpoints, the archive and the stats file go to a temporary folder that is removed afterwards, and the
+    audio plays to the null device. The least time between GUI refreshes is scaled by speed like the waits between
+    polls.
+    """
+    firstPuckDrop = min(_utc(recording['snapshots'][0]['playByPlay'].get('startTimeUTC', '9999-12-31T00:00:00Z'))
+                        for recording in recordings)
+    clock = SimulatedClock(firstPuckDrop - datetime.timedelta(hours=1), speed)
+    feed = SimulatedFeed(recordings, clock)
+    workFolder = tempfile.mkdtemp(prefix='lampSimulation')
+    overrides = {
+        'mode': 'gui' if render else 'headless',
+        'teams': [sabresGoalCheck.SABRES_TEAM_ID],
+        'cache': {'schedule': f'{workFolder}/schedule.json', 'checkpoints': f'{workFolder}/checkpoints',
+                  'stats': f'{workFolder}/stats.json'},
+        'archive': {'folder': f'{workFolder}/archive'},
+        'audio': {'device': 'null'},
+    }
+    config = lampConfig.loadConfig(configPath, profile, overrides)
+    # The least time between GUI refreshes is in simulated seconds too, so a replay redraws as often as the game would
+    config['render']['refreshInterval'] = config['render']['refreshInterval'] / speed if speed else 0.0
+    sabresGoalCheck.configure(config, feed, clock)
+    sabresGoalCheck.eventBus = EventBus(historySize=1000 * len(recordings))
+    display = display if display is not None or not render else HeadlessDisplay()
+    metrics.REGISTRY.reset()
+
+    cpuStart = time.process_time()
+    wallStart = time.time()
+    try:
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            await sabresGoalCheck.main(display, maxGames=len(recordings))
+    finally:
+        shutil.rmtree(workFolder, ignore_errors=True)
+    cpuSeconds = time.process_time() - cpuStart
+    wallSeconds = time.time() - wallStart
+
+    snapshot = metrics.REGISTRY.snapshot()
+    events = {}
+    for event in sabresGoalCheck.eventBus.history:
+        events[event['type']] = events.get(event['type'], 0) + 1
+
+    return {
+        'games': len(recordings),
+        'speed': speed,
+        'plays': sum(len(recording['snapshots'][-1]['playByPlay'].get('plays', [])) for recording in recordings),
+        'goals': sum(len(game['goals']) for game in feed.games.values()),
+        'goalsDetected': len(feed.latencies),
+        'latencyP50': percentile(feed.latencies, 0.50),
+        'latencyP95': percentile(feed.latencies, 0.95),
+        'latencyMax': max(feed.latencies) if feed.latencies else None,
+        'polls': int(snapshot['counters'].get('lamp_polls_total', 0)),
+        'requests': feed.stats['requests'],
+        'notModified': feed.stats['notModified'],
+        'bytesDecoded': feed.stats['bytes'],
+        'events': events,
+        'displayUpdates': display.updates if isinstance(display, HeadlessDisplay) else None,
+        'simulatedSeconds': round(clock.elapsed, 1),
+        'wallSeconds': round(wallSeconds, 3),
+        'cpuSeconds': round(cpuSeconds, 3),
+        'maxRSSMB': round(peakRSSMB(), 1),
+        'stages': {name: snapshot['histograms'][name] for name in REPORTED_STAGES if name in snapshot['histograms']},
+    }
+
+
+def printReport(report):
+    speed = f"{report['speed']:g}x" if report['speed'] else 'full speed'
+    print(f"Simulated {report['games']} games ({report['simulatedSeconds']:.0f} s) at {speed} in "
+          f"{report['wallSeconds']} s, CPU {report['cpuSeconds']} s, peak RSS {report['maxRSSMB']} MB")
+    print(f"Plays: {report['plays']}  goals: {report['goals']}  detected: {report['goalsDetected']}")
+    if report['goalsDetected']:
+        print(f"Detection latency (game seconds): p50 {report['latencyP50']:.1f}  p95 {report['latencyP95']:.1f}  "
+              f"max {report['latencyMax']:.1f}")
+    print(f"Polls: {report['polls']}  requests: {report['requests']}  not modified: {report['notModified']}  "
+          f"bytes decoded: {report['bytesDecoded']}")
+    print('Events: ' + '  '.join(f'{kind} {count}' for kind, count in sorted(report['events'].items())))
+    if report['displayUpdates'] is not None:
+        print(f"Display updates: {report['displayUpdates']}")
+    print('Stage timings in ms (p50 and p95 of the last 256):')
+    for name, stats in report['stages'].items():
+        if stats.get('count'):
+            print(f"  {name[5:-8]:<12} count {stats['total']:>6}  mean {1000 * stats['sum'] / stats['total']:8.2f}  "
+                  f"p50 {1000 * stats['p50']:8.2f}  p95 {1000 * stats['p95']:8.2f}  max {1000 * stats['max']:8.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recording', nargs='+', help='Recordings written by benchmarks/recordGame.py.')
+    parser.add_argument('--games', type=int, default=1, help='How many synthetic games to play without --recording.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first synthetic game.')
+    parser.add_argument('--speed', type=float, default=0, help='Simulated seconds per real second, 0 for flat out.')
+    parser.add_argument('--no-render', action='store_true', help="Don't draw the rink.")
+    parser.add_argument('--gui', action='store_true', help='Show the games in the GUI while they play.')
+    parser.add_argument('-c', '--config', help='Settings file to start from.')
+    parser.add_argument('-p', '--profile', choices=sorted(lampConfig.PROFILES), help='Profile to start from.')
+    parser.add_argument('--verbose', action='store_true', help="Show the lamp's own output.")
+    parser.add_argument('--json', help='Also write the report to this file.')
+    options = parser.parse_args()
+
+    if options.recording:
+        recordings = []
+        for path in options.recording:
+            with open(path, 'r') as recordingFile:
+                recordings.append(json.load(recordingFile))
+    else:
+        recordings = syntheticSeason(options.games, options.seed)
+
+    def finish(report):
+        printReport(report)
+        if options.json:
+            with open(options.json, 'w') as reportFile:
+                json.dump(report, reportFile, indent=2)
+
+    if options.gui:
+        import flet as ft
+        from gameView import GameView
+
+        async def session(page):
+            finish(await simulate(recordings, options.speed, GameView(page), True, options.config, options.profile,
+                                  options.verbose))
+
+        ft.run(session)
+    else:
+        finish(asyncio.run(simulate(recordings, options.speed, None, not options.no_render, options.config,
+                                    options.profile, options.verbose)))
@@ -0,0 +1,230 @@
+import flet as ft
+
+# Width of each half of the score, shots and period rows
+COLUMN_WIDTH = 257
+
+
+def _cell(control):
+    return ft.Column(controls=[control], horizontal_alignment=ft.CrossAxisAlignment.CENTER, width=COLUMN_WIDTH)
+
+
+def _row(left, right):
+    return ft.Row(controls=[_cell(left), _cell(right)], alignment=ft.MainAxisAlignment.START)
+
+
+# The GUI's controls, built once and then only edited. Each refresh works out the text every control should show,
+# changes the controls whose text is different, appends the goal scorers that are new and sends all of it to the
+# page in one page.update(), so a connected browser only gets the fields that actually changed.
+class GameView:
+    """
+    View-model of the GUI for one page.
+
+    Parameters:
+    - page (ft.Page): The page the controls are added to.
+    - teamName (str): Name shown for the tracked team.
+    - title (str): The window or browser tab title.
+
+    Note:
+    The control tree is added to the page the first time the view is made and never again, so following several
+    games in a row doesn't pile up layouts. Call newGame() at the start of each game and show() with the latest
+    values as often as needed; a call that changes nothing doesn't touch the page.
+    """
+
+    def __init__(self, page, teamName='Sabres', title='Sabres Goal Lamp - GUI'):
+        self.page = page
+        self.teamName = teamName
+        self.opName = ''
+        self.values = {'period': 'Pre-Game', 'timeRemaining': '20:00', 'teamScore': 0, 'opScore': 0,
+                       'teamShots': 0, 'opShots': 0, 'shootingPercentage': None}
+        self.scorers = []  # the scorer lines currently on screen
+        self.rink = None
+
+        # gapless_playback keeps the old rink on screen while the new one is decoded, so updates don't flicker
+        self.rinkImage = ft.Image(src=b'', gapless_playback=True)
+        self.periodText = ft.Text(size=15, weight=ft.FontWeight.BOLD)
+        self.timeRemainingText = ft.Text(size=15, weight=ft.FontWeight.BOLD)
+        self.teamScoreText = ft.Text(size=15, weight=ft.FontWeight.BOLD)
+        self.opScoreText = ft.Text(size=15, weight=ft.FontWeight.BOLD)
+        self.teamShotsText = ft.Text(size=15, weight=ft.FontWeight.BOLD)
+        self.opShotsText = ft.Text(size=15, weight=ft.FontWeight.BOLD)
+        self.scorerColumn = ft.Column(controls=[])
+        self._setTexts()
+
+        rinkData = ft.Column(
+            controls=[
+                ft.Text('Rink Image', size=30, weight=ft.FontWeight.BOLD),
+                self.rinkImage,
+                _row(self.periodText, self.timeRemainingText),
+                _row(self.teamScoreText, self.opScoreText),
+                _row(self.teamShotsText, self.opShotsText),
+            ],
+            height=page.height,
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER
+        )
+        goalData = ft.Column(
+            controls=[
+                ft.Text('Goal Data', size=30, weight=ft.FontWeight.BOLD),
+                self.scorerColumn
+            ],
+            height=page.height,
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER
+        )
+
+        page.title = title
+        page.add(ft.Row(controls=[rinkData, goalData], width=page.width, alignment=ft.MainAxisAlignment.SPACE_EVENLY))
+
+    def newGame(self, opName):
+        """
+        Clear the view for a new game against opName.
+        """
+        self.opName = opName
+        self.values.update(period='Pre-Game', timeRemaining='20:00', teamScore=0, opScore=0, teamShots=0, opShots=0,
+                           shootingPercentage=None)
+        self.show(scorers=[])
+
+    def show(self, rink=None, scorers=None, **values):
+        """
+        Push new values to the page, sending only what changed.
+
+        Parameters:
+        - rink (bytes): Encoded image of the rink. Only sent if it is a different image from the one shown.
+        - scorers (list): Every goal scorer line for the game so far, in order.
+        - values: Any of period, timeRemaining, teamScore, opScore, teamShots, opShots and shootingPercentage.
+
+        Returns:
+        bool: True if anything changed and the page was updated.
+        """
+        self.values.update(values)
+        changed = self._setTexts()
+
+        if rink is not None and rink is not self.rink:
+            self.rink = rink
+            self.rinkImage.src = rink
+            changed = True
+
+        if scorers is not None and scorers != self.scorers:
+            if scorers[:len(self.scorers)] == self.scorers:
+                # The usual case, a goal was added, so only the new lines are sent
+                self.scorerColumn.controls.extend(ft.Text(line) for line in scorers[len(self.scorers):])
+            else:
+                # A goal was taken back or the game changed, so the list is rebuilt
+                self.scorerColumn.controls = [ft.Text(line) for line in scorers]
+            self.scorers = list(scorers)
+            changed = True
+
+        if changed:
+            self.page.update()
+        return changed
+
+    def _texts(self):
+        values = self.values
+        teamShots = f'{self.teamName}: {values["teamShots"]}'
+        if values['shootingPercentage'] is not None:
+            teamShots += f' ({values["shootingPercentage"]:.1f}%)'
+        return (
+            (self.periodText, f'Period: {values["period"]}'),
+            (self.timeRemainingText, f'Time: {values["timeRemaining"]}'),
+            (self.teamScoreText, f'{self.teamName}: {values["teamScore"]}'),
+            (self.opScoreText, f'{self.opName}: {values["opScore"]}'),
+            (self.teamShotsText, teamShots),
+            (self.opShotsText, f'{self.opName}: {values["opShots"]}'),
+        )
+
+    def _setTexts(self):
+        changed = False
+        for control, text in self._texts():
+            if control.value != text:
+                control.value = text
+                changed = True
+        return changed
+
+
+# Serves one game to any number of browsers. The poller, the rink renderer and the image encoder run once and hand
+# their results here, and every connected page gets its own GameView of the same state, so the work done per game
+# doesn't grow with the number of people watching.
+class DashboardHub:
+    """
+    Fans the state of one game out to the GameView of every connected page.
+
+    Parameters:
+    - teamName (str): Name shown for the tracked team.
+    - title (str): The browser tab title.
+
+    Note:
+    It has the same newGame() and show() as a GameView, so the lamp drives it exactly like a single view. A page that
+    connects part way through a game is brought up to date from the last values shown. A page stops being updated
+    as soon as it disconnects (a closed tab) and is brought up to date again if it reconnects. A page whose update
+    fails is dropped, the same as one that closes.
+    """
+
+    def __init__(self, teamName='Sabres', title='Sabres Goal Lamp - GUI'):
+        self.teamName = teamName
+        self.title = title
+        self.views = []
+        self.opName = ''
+        self.state = {}  # every value shown since the last newGame()
+
+    def subscribe(self, page):
+        """
+        Add a GameView of the current game to a newly connected page.
+
+        Returns:
+        GameView: The page's view.
+        """
+        view = GameView(page, self.teamName, self.title)
+        # A closed tab only disconnects; the session itself expires much later, so on_close is just a backstop
+        page.on_disconnect = lambda event: self.unsubscribe(view)
+        page.on_connect = lambda event: self._attach(view)
+        page.on_close = lambda event: self.unsubscribe(view)
+        self._attach(view)
+        return view
+
+    def _attach(self, view):
+        # Also used when a page that dropped its connection comes back, since it missed everything in between
+        if view in self.views:
+            return
+        try:
+            view.newGame(self.opName)
+            view.show(**self.state)
+        except Exception as error:
+            print(f'Dropping a dashboard viewer: {error}')
+            return
+        self.views.append(view)
+        print(f'Dashboard viewer connected, {len(self.views)} watching.')
+
+    def unsubscribe(self, view):
+        if view in self.views:
+            self.views.remove(view)
+            print(f'Dashboard viewer left, {len(self.views)} watching.')
+
+    def newGame(self, opName):
+        """
+        Clear every view for a new game against opName.
+        """
+        self.opName = opName
+        self.state = {}
+        for view in list(self.views):
+            self._send(view, view.newGame, opName)
+
+    def show(self, **values):
+        """
+        Push new values to every page. Takes the same arguments as GameView.show().
+
+        Returns:
+        bool: True if any page was updated.
+        """
+        # rink and scorers are left out of a call when they haven't changed
+        self.state.update((name, value) for name, value in values.items()
+                          if value is not None or name not in ('rink', 'scorers'))
+        changed = False
+        for view in list(self.views):
+            changed = self._send(view, view.show, **values) or changed
+        return changed
+
+    def _send(self, view, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except Exception as error:
+            print(f'Dropping a dashboard viewer: {error}')
+            self.unsubscribe(view)
+            return False
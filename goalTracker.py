@@ -0,0 +1,182 @@
+# States a goal goes through. A goal is pending from the moment it shows up in the feed until play restarts with a
+# faceoff, which is when any challenge or video review is over. A goal that disappears from the feed or stops being a
+# goal was overturned, whether it was pending or already confirmed.
+PENDING = 'pending'
+CONFIRMED = 'confirmed'
+OVERTURNED = 'overturned'
+
+
+class GoalTransition:
+    """
+    One goal changing state.
+
+    Attributes:
+    - eventId (int): The goal's play eventId.
+    - teamId (int): The team that scored it.
+    - state (str): The new state, PENDING, CONFIRMED or OVERTURNED.
+    - previousState (str): The state before, or None for a goal that was just found. OVERTURNED for a goal that is
+      back in the feed after being overturned.
+    - play (dict): The goal's play-by-play entry, as last seen. None for a confirmation, which comes from a later
+      play, and for a goal that was overturned while the lamp wasn't running.
+    """
+
+    __slots__ = ('eventId', 'teamId', 'state', 'previousState', 'play')
+
+    def __init__(self, eventId, teamId, state, previousState, play):
+        self.eventId = eventId
+        self.teamId = teamId
+        self.state = state
+        self.previousState = previousState
+        self.play = play
+
+    def __repr__(self):
+        return f'GoalTransition({self.eventId}, {self.teamId}, {self.previousState} -> {self.state})'
+
+
+# Per-game state machine of every goal, keyed on the play's eventId. Goals are found from the plays a poll reports as
+# new, changed or removed, so there is no comparing of score snapshots and no walking back through the feed, and a
+# goal is reported once per state no matter how many polls it appears in.
+class GoalTracker:
+    """
+    Tracks the goals of one game through pending, confirmed and overturned.
+
+    Parameters:
+    - states (dict): eventId to [teamId, sortOrder, state], as returned by states(), to carry on from a checkpoint.
+
+    Note:
+    advance() returns only the goals whose state changed, so each change gets exactly one reaction. An overturned
+    goal whose eventId shows up as a goal again, e.g. after one bad response from the NHL left it out, is found again
+    as a pending goal.
+    """
+
+    def __init__(self, states=None):
+        self.goals = {}  # eventId -> [teamId, sortOrder, state]
+        self.pending = {}  # eventId -> sortOrder of the goals still waiting on a faceoff
+        for eventId, (teamId, sortOrder, state) in (states or {}).items():
+            self._set(int(eventId), teamId, sortOrder, state)
+
+    def __len__(self):
+        return len(self.goals)
+
+    def state(self, eventId):
+        """
+        Returns the state of a goal, or None if no goal with this eventId was seen.
+        """
+        goal = self.goals.get(eventId)
+        return goal[2] if goal is not None else None
+
+    def count(self, teamId=None):
+        """
+        Returns the number of goals that have not been overturned, for one team or both.
+        """
+        return sum(1 for goalTeam, _, state in self.goals.values()
+                   if state != OVERTURNED and (teamId is None or goalTeam == teamId))
+
+    def states(self):
+        """
+        Returns the tracker's state as plain data for a checkpoint.
+        """
+        return {eventId: list(goal) for eventId, goal in self.goals.items()}
+
+    def seed(self, plays):
+        """
+        Take in the goals of a game that was already going when the lamp started, without reporting any of them.
+
+        Parameters:
+        - plays (list): Every play in the feed so far.
+
+        Note:
+        The goals are taken as confirmed, even one still waiting on a faceoff. It was never announced, so its
+        confirmation isn't announced either. If it is overturned after all, that is still reported.
+        """
+        for play in plays:
+            if play['typeDescKey'] == 'goal':
+                self._set(play['eventId'], play.get('details', {}).get('eventOwnerTeamId'), play['sortOrder'],
+                          CONFIRMED)
+
+    def advance(self, newPlays, changedPlays=(), removedPlays=(), gameOver=False):
+        """
+        Move goals along with one poll of the feed.
+
+        Parameters:
+        - newPlays (list): Plays that are new since the last poll, in sortOrder.
+        - changedPlays (list): Plays that were already seen and have been edited.
+        - removedPlays (list): Plays that were already seen and are gone from the feed.
+        - gameOver (bool): The game is final, so every pending goal stands.
+
+        Returns:
+        list: GoalTransition for every goal that changed state, in the order the changes happened.
+        """
+        transitions = []
+        for play in removedPlays:
+            if play['typeDescKey'] == 'goal':
+                self._overturn(play, transitions)
+        for play in changedPlays:
+            # A goal can be changed into another play type instead of being deleted
+            if play['typeDescKey'] != 'goal':
+                self._overturn(play, transitions)
+            elif self.state(play['eventId']) in (None, OVERTURNED):
+                self._found(play, transitions)
+
+        # The one pass over the new plays both finds goals and confirms them once play restarts
+        for play in newPlays:
+            typeDescKey = play['typeDescKey']
+            if typeDescKey == 'goal':
+                if self.state(play['eventId']) in (None, OVERTURNED):
+                    self._found(play, transitions)
+            elif typeDescKey == 'faceoff' and self.pending:
+                self._confirmBefore(play['sortOrder'], transitions)
+
+        if gameOver and self.pending:
+            self._confirmBefore(float('inf'), transitions)
+        return transitions
+
+    def overturnMissing(self, plays):
+        """
+        Overturn the goals that are no longer goals in the feed, for picking a game back up after a restart.
+
+        Parameters:
+        - plays (dict): eventId to play of every play in the feed.
+
+        Returns:
+        list: GoalTransition for every goal that was overturned.
+
+        Note:
+        A goal taken back while the lamp was down never shows up as a removed or changed play, since the lamp didn't
+        see the poll it happened in, so its absence from the feed is all there is to go on.
+        """
+        transitions = []
+        for eventId, (teamId, sortOrder, state) in list(self.goals.items()):
+            play = plays.get(eventId)
+            if state != OVERTURNED and (play is None or play['typeDescKey'] != 'goal'):
+                self._set(eventId, teamId, sortOrder, OVERTURNED)
+                transitions.append(GoalTransition(eventId, teamId, OVERTURNED, state, None))
+        return transitions
+
+    def _set(self, eventId, teamId, sortOrder, state):
+        self.goals[eventId] = [teamId, sortOrder, state]
+        if state == PENDING:
+            self.pending[eventId] = sortOrder
+        else:
+            self.pending.pop(eventId, None)
+
+    def _found(self, play, transitions):
+        teamId = play.get('details', {}).get('eventOwnerTeamId')
+        previousState = self.state(play['eventId'])
+        self._set(play['eventId'], teamId, play['sortOrder'], PENDING)
+        transitions.append(GoalTransition(play['eventId'], teamId, PENDING, previousState, play))
+
+    def _overturn(self, play, transitions):
+        goal = self.goals.get(play['eventId'])
+        if goal is None or goal[2] == OVERTURNED:
+            return
+        previousState = goal[2]
+        self._set(play['eventId'], goal[0], goal[1], OVERTURNED)
+        transitions.append(GoalTransition(play['eventId'], goal[0], OVERTURNED, previousState, play))
+
+    def _confirmBefore(self, sortOrder, transitions):
+        for eventId, goalSortOrder in list(self.pending.items()):
+            if goalSortOrder < sortOrder:
+                teamId = self.goals[eventId][0]
+                self._set(eventId, teamId, goalSortOrder, CONFIRMED)
+                transitions.append(GoalTransition(eventId, teamId, CONFIRMED, PENDING, None))
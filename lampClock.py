@@ -0,0 +1,37 @@
+import asyncio
+import datetime
+
+# Longest single sleep when waiting for a wall-clock time. asyncio sleeps on the monotonic clock, which doesn't move
+# while a machine is suspended, so long waits are broken up and the wall clock is checked again after each piece.
+MAX_SLEEP_CHUNK = 300
+
+
+# The lamp's sense of time. Everything in the lamp that waits, or asks what time it is, goes through a clock, so the
+# simulator can run a game through it faster than real time.
+class WallClock:
+    """
+    The real clock.
+    """
+
+    def now(self, tz=None):
+        """
+        Returns the current time, like datetime.datetime.now(tz).
+        """
+        return datetime.datetime.now(tz)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    async def sleepUntil(self, when):
+        """
+        Sleep until a local datetime without blocking the event loop. Returns immediately if it has already passed.
+        """
+        while True:
+            delay = (when - self.now()).total_seconds()
+            if delay <= 0:
+                return
+            await self.sleep(min(delay, MAX_SLEEP_CHUNK))
+
+
+# The clock everything uses unless it is given another one
+WALL_CLOCK = WallClock()
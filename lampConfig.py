@@ -0,0 +1,224 @@
+import copy
+import json
+
+# TOML config files need Python 3.11 or newer. JSON works everywhere.
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+MODES = ('headless', 'gui', 'web', 'scoreboard')
+IMAGE_FORMATS = ('png', 'jpeg')
+# How the type of each setting is described in error messages
+TYPE_NAMES = {bool: 'true or false', int: 'a whole number', float: 'a number', str: 'a string', list: 'a list'}
+
+# Every setting the lamp has, with its default. A config file or profile only needs the settings it changes, and
+# anything not listed here is rejected so a typo doesn't go unnoticed.
+DEFAULT_CONFIG = {
+    # headless plays the songs only, gui opens a window, web serves the dashboard to any number of browsers and
+    # scoreboard follows every game in the league for the event bus, ignoring teams
+    'mode': 'headless',
+    # NHL team IDs to follow. The GUI and the dashboard always follow the Sabres.
+    'teams': [7],
+    'api': {
+        'baseUrl': 'https://api-web.nhle.com/',
+        'connectTimeout': 3.05,
+        'feedTimeout': 8.0,
+        'scheduleTimeout': 15.0,
+        'timeout': 10.0,
+        'retries': 3,
+        'backoff': 0.5,
+    },
+    # Seconds between polls of a game, by what is going on in it (see PollScheduler)
+    'polling': {
+        'baseInterval': 10.0,
+        'fastInterval': 3.0,
+        'slowInterval': 60.0,
+        'finalInterval': 300.0,
+        'wakeLeadMinutes': 30.0,
+        'revisionWindow': 20,
+    },
+    'cache': {
+        'schedule': './cache/schedule.json',
+        'scheduleMaxAgeDays': 7.0,
+        'checkpoints': './cache/checkpoints',
+        'stats': './cache/stats.json',
+        'statsInterval': 60.0,
+        # Decoded goal songs kept in memory
+        'audioMB': 64,
+    },
+    'archive': {
+        'enabled': True,
+        'folder': './archive',
+    },
+    'concurrency': {
+        # Keep-alive connections to the NHL API
+        'connections': 4,
+        # Threads for fetching, checkpointing and archiving off the event loop. 0 uses Python's default.
+        'workerThreads': 0,
+    },
+    'render': {
+        'width': 10.0,
+        'height': 4.31,
+        'dpi': 100,
+        'format': 'png',
+        'pngCompression': 1,
+        'jpegQuality': 85,
+        # Least number of seconds between two GUI updates
+        'refreshInterval': 0.25,
+    },
+    'audio': {
+        'device': 'default',
+        'clipLength': 20.0,
+        'bufferMilliseconds': 50,
+        'goalSongs': './audioFiles/SabresGoalSongs.json',
+        'teamGoalSongs': './audioFiles/teamGoalSongs.json',
+    },
+    # Event bus for other lamps and displays. It is off unless a port or a socket is given.
+    'bus': {
+        'host': '0.0.0.0',
+        'port': 0,
+        'socket': '',
+        'historySize': 500,
+        'queueSize': 256,
+    },
+}
+
+# Settings tuned for the places the lamp usually runs. A profile is applied on top of the defaults and under the
+# config file, so a file can still change anything a profile sets.
+PROFILES = {
+    # A Raspberry Pi next to a speaker: few cores, little memory, an SD card that shouldn't be written to constantly
+    'pi-lamp': {
+        'mode': 'headless',
+        'cache': {'statsInterval': 300.0, 'audioMB': 32},
+        'concurrency': {'connections': 2, 'workerThreads': 2},
+        'render': {'dpi': 72, 'refreshInterval': 1.0},
+        # A bigger buffer keeps a busy Pi from crackling, at a few tens of milliseconds of extra latency
+        'audio': {'bufferMilliseconds': 100},
+    },
+    # One machine feeding the dashboards and lamps of a whole building
+    'arena-server': {
+        'mode': 'web',
+        'polling': {'baseInterval': 5.0, 'fastInterval': 2.0},
+        'cache': {'statsInterval': 15.0},
+        'concurrency': {'connections': 8, 'workerThreads': 8},
+        # JPEG is a fraction of the size of PNG, which adds up over many browsers
+        'render': {'format': 'jpeg', 'jpegQuality': 80, 'refreshInterval': 0.5},
+        'bus': {'port': 8765, 'historySize': 2000, 'queueSize': 1024},
+    },
+}
+
+
+def mergeConfig(base, overrides):
+    """
+    Returns a copy of base with overrides laid on top, section by section.
+
+    Parameters:
+    - base (dict): The settings to start from.
+    - overrides (dict): The settings to change. Sections only need the keys they change.
+    """
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = mergeConfig(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def readConfigFile(path):
+    """
+    Returns the settings in a .toml or .json config file.
+    """
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise ValueError(f'{path}: TOML config files need Python 3.11 or newer, use a .json file instead')
+        with open(path, 'rb') as configFile:
+            return tomllib.load(configFile)
+    with open(path, 'r') as configFile:
+        return json.load(configFile)
+
+
+def loadConfig(path=None, profile=None, overrides=None):
+    """
+    Build the lamp's settings from the defaults, a profile, a config file and command-line overrides, in that order.
+
+    Parameters:
+    - path (str): A .toml or .json config file, or None.
+    - profile (str): One of PROFILES. If None, the config file can name one with a top-level 'profile' key.
+    - overrides (dict): Settings that win over everything else, e.g. from command-line flags.
+
+    Returns:
+    dict: The complete, checked settings, laid out like DEFAULT_CONFIG.
+
+    Note:
+    A ValueError says which setting is wrong and why, for unknown settings, wrong types and values out of range.
+    """
+    fileConfig = readConfigFile(path) if path else {}
+    profile = profile or fileConfig.pop('profile', None)
+    fileConfig.pop('profile', None)
+    if profile is not None and profile not in PROFILES:
+        raise ValueError(f'Unknown profile {profile!r}, expected one of {", ".join(PROFILES)}')
+
+    config = DEFAULT_CONFIG
+    for layer in (PROFILES.get(profile, {}), fileConfig, overrides or {}):
+        config = mergeConfig(config, layer)
+    validateConfig(config)
+    return config
+
+
+def validateConfig(config):
+    """
+    Check that every setting is known and has a sensible value. Raises ValueError if not.
+    """
+    _checkTypes(config, DEFAULT_CONFIG, '')
+
+    if config['mode'] not in MODES:
+        raise ValueError(f'mode must be one of {", ".join(MODES)}, not {config["mode"]!r}')
+    if not config['teams'] or not all(isinstance(teamId, int) and teamId > 0 for teamId in config['teams']):
+        raise ValueError('teams must be a list of NHL team IDs')
+    if config['render']['format'] not in IMAGE_FORMATS:
+        raise ValueError(f'render.format must be one of {", ".join(IMAGE_FORMATS)}')
+    if not 0 <= config['render']['pngCompression'] <= 9:
+        raise ValueError('render.pngCompression must be between 0 and 9')
+    if not 1 <= config['render']['jpegQuality'] <= 95:
+        raise ValueError('render.jpegQuality must be between 1 and 95')
+    if not 0 <= config['bus']['port'] <= 65535:
+        raise ValueError('bus.port must be between 0 and 65535')
+
+    positive = [('polling', key) for key in ('baseInterval', 'fastInterval', 'slowInterval', 'finalInterval')]
+    positive += [('api', 'connectTimeout'), ('api', 'feedTimeout'), ('api', 'scheduleTimeout'), ('api', 'timeout'),
+                 ('cache', 'audioMB'), ('concurrency', 'connections'), ('render', 'width'), ('render', 'height'),
+                 ('render', 'dpi'), ('audio', 'clipLength'), ('audio', 'bufferMilliseconds'),
+                 ('bus', 'historySize'), ('bus', 'queueSize')]
+    for section, key in positive:
+        if config[section][key] <= 0:
+            raise ValueError(f'{section}.{key} must be greater than 0')
+    for section, key in (('api', 'retries'), ('api', 'backoff'), ('polling', 'wakeLeadMinutes'),
+                         ('polling', 'revisionWindow'), ('cache', 'scheduleMaxAgeDays'), ('cache', 'statsInterval'),
+                         ('concurrency', 'workerThreads'), ('render', 'refreshInterval')):
+        if config[section][key] < 0:
+            raise ValueError(f'{section}.{key} can\'t be negative')
+
+
+def _checkTypes(config, defaults, prefix):
+    for key, value in config.items():
+        name = prefix + key
+        if key not in defaults:
+            raise ValueError(f'Unknown setting {name}')
+        default = defaults[key]
+        if isinstance(default, dict):
+            if not isinstance(value, dict):
+                raise ValueError(f'{name} must be a section')
+            _checkTypes(value, default, name + '.')
+        elif not _sameType(value, default):
+            raise ValueError(f'{name} must be {TYPE_NAMES[type(default)]}, not {value!r}')
+
+
+def _sameType(value, default):
+    if isinstance(default, bool) or isinstance(value, bool):
+        return isinstance(value, bool) and isinstance(default, bool)
+    if isinstance(default, float):
+        # Whole numbers are fine wherever a number of seconds is expected
+        return isinstance(value, (int, float))
+    return isinstance(value, type(default))
@@ -0,0 +1,166 @@
+import asyncio
+
+from audioEngine import AudioEngine
+from lampClock import WALL_CLOCK
+
+
+# How often the audio task checks whether the current song has finished
+VOICE_POLL_INTERVAL = 0.05
+
+
+async def sleepUntil(when, clock=WALL_CLOCK):
+    """
+    Sleep until a local datetime without blocking the event loop. Returns immediately if it has already passed.
+
+    Parameters:
+    - when (datetime): The local time to wake up at.
+    - clock (WallClock): The clock to wait on.
+    """
+    await clock.sleepUntil(when)
+
+
+# Plays goal songs and horns on their own task so the poller keeps running during a celebration. Songs are queued
+# so a quick answering goal is still announced, just after the current clip.
+class AudioTask:
+    """
+    Background audio player driven by a queue.
+
+    Parameters:
+    - clipLength (float): The maximum number of seconds a song holds the queue before the next one starts. The song
+      fades out at that point.
+    - engine (AudioEngine): The mixer songs are played through. A new one on the default sound output is made if
+      none is given.
+
+    Note:
+    Songs that have been preloaded start within one audio buffer of play() being called. Anything else is decoded in
+    a worker thread first, so the event loop is never blocked either way. A song queued for a goal can be taken back
+    with cancel(), whether it is playing or still waiting its turn.
+    """
+
+    def __init__(self, clipLength=20, engine=None):
+        self.clipLength = clipLength
+        self.engine = engine if engine is not None else AudioEngine(clipLength=clipLength)
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.current = None
+        self.currentGoal = None  # eventId of the goal the current song is for
+        self.cancelledGoals = set()
+
+    def start(self):
+        if self.task is None:
+            self.engine.start()
+            self.task = asyncio.create_task(self._run())
+        return self.task
+
+    def play(self, path, goalId=None):
+        """
+        Queue a file to be played. Never blocks.
+
+        Parameters:
+        - path (str): The song or horn to play.
+        - goalId (int): eventId of the goal the song is for, so it can be cancelled if the goal is overturned.
+        """
+        self.queue.put_nowait((path, goalId))
+
+    async def preload(self, paths):
+        """
+        Decode files in a worker thread so they are ready to play instantly.
+        """
+        await asyncio.to_thread(self.engine.preload, paths)
+
+    def skip(self):
+        """
+        Fade out the song that is currently playing and move on to the next one in the queue.
+        """
+        if self.current is not None:
+            self.engine.stop(self.current)
+
+    def cancel(self, goalId):
+        """
+        Take back the song of one goal: fade it out if it is playing, or drop it if it is still queued.
+        """
+        self.cancelledGoals.add(goalId)
+        if self.current is not None and self.currentGoal == goalId:
+            self.engine.stop(self.current)
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.engine.stop(fadeSeconds=0)
+        self.engine.close()
+
+    async def _run(self):
+        while True:
+            path, goalId = await self.queue.get()
+            if goalId is not None and goalId in self.cancelledGoals:
+                # The goal was overturned before its song came up
+                self.queue.task_done()
+                continue
+            self.currentGoal = goalId
+            try:
+                if path in self.engine.cache:
+                    self.current = self.engine.play(path, self.clipLength)
+                else:
+                    self.current = await asyncio.to_thread(self.engine.play, path, self.clipLength)
+                # The mixer plays on its own thread, this only waits for the song to end before starting the next
+                while not self.current.finished:
+                    await asyncio.sleep(VOICE_POLL_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                print(f'Could not play {path}: {error}')
+            finally:
+                self.current = None
+                self.currentGoal = None
+                self.queue.task_done()
+
+
+# Redraws the GUI from its own task. Any number of refresh requests that arrive while a redraw is running, or within
+# minInterval of the last one, are coalesced into a single redraw.
+class RefreshTask:
+    """
+    Coalescing refresh loop.
+
+    Parameters:
+    - refresh (callable): Function that redraws the display. It is called with no arguments.
+    - minInterval (float): The least number of seconds between two redraws, so a burst of plays is one redraw.
+    """
+
+    def __init__(self, refresh, minInterval=0.0):
+        self.refresh = refresh
+        self.minInterval = minInterval
+        self.pending = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        return self.task
+
+    def request(self):
+        self.pending.set()
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run(self):
+        while True:
+            await self.pending.wait()
+            self.pending.clear()
+            try:
+                self.refresh()
+            except Exception as error:
+                print(f'Display refresh failed: {error}')
+            if self.minInterval:
+                await asyncio.sleep(self.minInterval)
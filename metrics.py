@@ -0,0 +1,268 @@
+import collections
+import contextlib
+import json
+import threading
+import time
+
+from atomicFile import atomicWrite
+
+# Histogram buckets, in seconds for timings and bytes for payload sizes
+TIMING_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DELAY_BUCKETS = (1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 120.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 131072, 262144, 524288, 1048576)
+
+# Every metric the lamp records, with the help text shown on /metrics
+METRIC_HELP = {
+    'lamp_fetch_seconds': 'Time spent on one request to the NHL API, including retries.',
+    'lamp_decode_seconds': 'Time spent decoding a JSON response body.',
+    'lamp_payload_bytes': 'Size of a response body as transferred.',
+    'lamp_fetch_total': 'Requests to the NHL API by result.',
+    'lamp_diff_seconds': 'Time spent diffing a play-by-play response against the plays already seen.',
+    'lamp_polls_total': 'Polls of a game feed.',
+    'lamp_goal_transitions_total': 'Goal state changes by new state.',
+    'lamp_goal_detection_delay_seconds': 'Estimated time from a goal on the game clock to the lamp seeing it.',
+    'lamp_scoreboard_changes_total': 'Games whose score, period or state changed between two scoreboard polls.',
+    'lamp_poll_interval_seconds': 'Seconds the poller chose to wait before the next poll.',
+    'lamp_last_poll_timestamp_seconds': 'Unix time of the last poll.',
+    'lamp_render_seconds': 'Time spent drawing new markers on the rink.',
+    'lamp_encode_seconds': 'Time spent encoding the rink image.',
+    'lamp_render_coalesced_total': 'Rink frames replaced by a newer one before they were drawn.',
+    'lamp_gui_update_seconds': 'Time spent updating the GUI.',
+    'lamp_audio_start_seconds': 'Time from asking for a song to its first samples being mixed.',
+}
+
+
+class Histogram:
+    """
+    Cumulative histogram with a rolling window of recent values.
+
+    Parameters:
+    - buckets (tuple): Upper bounds of the buckets, in increasing order.
+    - window (int): How many recent values are kept for the rolling statistics.
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'recent')
+
+    def __init__(self, buckets=TIMING_BUCKETS, window=256):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = collections.deque(maxlen=window)
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def rolling(self):
+        """
+        Returns count, mean, p50, p95 and max of the recent values, or None if there are none.
+        """
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return {
+            'count': len(values),
+            'mean': sum(values) / len(values),
+            'p50': values[(len(values) - 1) // 2],
+            'p95': values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))],
+            'max': values[-1],
+        }
+
+
+# All of the lamp's counters, gauges and histograms in one place. Recording is a dictionary lookup and a few additions
+# under a lock, cheap enough for the poll loop and the audio thread.
+class MetricsRegistry:
+    """
+    Thread-safe store of metrics, rendered as Prometheus text or as JSON.
+
+    Note:
+    Counters and gauges can have labels, passed as keyword arguments. Histograms are unlabelled.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = collections.defaultdict(float)
+        self.gauges = {}
+        self.lastWrite = 0.0
+
+    def reset(self):
+        """
+        Forget every metric recorded so far.
+        """
+        with self.lock:
+            self.histograms = {}
+            self.counters = collections.defaultdict(float)
+            self.gauges = {}
+
+    def observe(self, name, value, buckets=TIMING_BUCKETS):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def setGauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """
+        Time the body of a with block into the histogram called name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        with self.lock:
+            for name in sorted(self.histograms):
+                histogram = self.histograms[name]
+                lines += _header(name, 'histogram')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{_number(bound)}"}} {cumulative}')
+                lines.append(f'{name}_sum {_number(histogram.sum)}')
+                lines.append(f'{name}_count {histogram.count}')
+            for kind, values in (('counter', self.counters), ('gauge', self.gauges)):
+                for name in sorted(set(name for name, _ in values)):
+                    lines += _header(name, kind)
+                    for (metricName, labels), value in sorted(values.items()):
+                        if metricName == name:
+                            lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """
+        Returns the metrics as a dict: rolling statistics of each histogram, and the counters and gauges.
+        """
+        with self.lock:
+            return {
+                'time': time.time(),
+                'histograms': {name: dict(histogram.rolling() or {}, total=histogram.count, sum=histogram.sum)
+                               for name, histogram in self.histograms.items()},
+                'counters': {name + _labels(labels): value for (name, labels), value in self.counters.items()},
+                'gauges': {name + _labels(labels): value for (name, labels), value in self.gauges.items()},
+            }
+
+    def writeJSON(self, path, minInterval=0.0):
+        """
+        Write snapshot() to a JSON file, replacing the last one.
+
+        Parameters:
+        - path (str): The file to write. Its folder is created if needed.
+        - minInterval (float): Skip the write if the last one was less than this many seconds ago.
+
+        Note:
+        The file is fsynced, so call it from a worker thread, not the event loop. Two threads calling it at once
+        don't both write.
+        """
+        now = time.time()
+        with self.lock:
+            if now - self.lastWrite < minInterval:
+                return
+            self.lastWrite = now
+        with atomicWrite(path) as statsFile:
+            json.dump(self.snapshot(), statsFile, indent=1)
+
+
+def _header(name, kind):
+    helpText = METRIC_HELP.get(name)
+    return ([f'# HELP {name} {helpText}'] if helpText else []) + [f'# TYPE {name} {kind}']
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# The registry the whole lamp records into, so any module can add a metric without anything being passed around
+REGISTRY = MetricsRegistry()
+observe = REGISTRY.observe
+inc = REGISTRY.inc
+setGauge = REGISTRY.setGauge
+span = REGISTRY.span
+
+
+def clockSeconds(text):
+    """
+    Returns 'MM:SS' as a number of seconds, or None if it can't be read.
+    """
+    try:
+        minutes, seconds = text.split(':')
+        return int(minutes) * 60 + int(seconds)
+    except (AttributeError, ValueError):
+        return None
+
+
+# Works out how long after a play happened the lamp saw it. Plays in the feed are stamped with the game clock, not
+# the wall clock, so the clock in each response is remembered together with the time it was first seen, and a play's
+# game clock time is turned into wall clock time from the latest of those readings in the same period.
+class FeedClock:
+    """
+    Maps the game clock of a play-by-play feed to wall clock time.
+
+    Parameters:
+    - rate (float): Game clock seconds per wall clock second. 1 for a live game, the replay speed for a replay.
+
+    Note:
+    Only responses with the clock running are used, and stoppages between that response and the play are not known,
+    so a delay can come out a little long. A reading that doesn't change between polls keeps the time it was first
+    seen at. Delays are measured against the feed's own clock, so any lag of the whole feed behind the arena is not
+    included.
+    """
+
+    def __init__(self, rate=1.0):
+        self.rate = rate
+        self.anchors = {}  # period -> (wall time, secondsRemaining) of the latest clock reading while running
+
+    def observe(self, response, wallTime):
+        """
+        Remember the clock of a response fetched at wallTime.
+        """
+        clock = response.get('clock') or {}
+        period = (response.get('periodDescriptor') or {}).get('number')
+        secondsRemaining = clock.get('secondsRemaining')
+        if not clock.get('running') or clock.get('inIntermission') or period is None or secondsRemaining is None:
+            return
+        anchor = self.anchors.get(period)
+        if anchor is None or anchor[1] != secondsRemaining:
+            self.anchors[period] = (wallTime, secondsRemaining)
+
+    def delayOf(self, play, wallTime):
+        """
+        Returns the estimated wall clock seconds between a play happening and wallTime, or None if there is no clock
+        reading in the play's period yet.
+        """
+        period = play.get('periodDescriptor', {}).get('number', play.get('period'))
+        anchor = self.anchors.get(period)
+        remaining = clockSeconds(play.get('timeRemaining'))
+        if anchor is None or remaining is None:
+            return None
+        anchorTime, anchorRemaining = anchor
+        return max(0.0, wallTime - (anchorTime + (anchorRemaining - remaining) / self.rate))
@@ -0,0 +1,265 @@
+import itertools
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from atomicFile import atomicWrite
+
+# One row per play. Removed plays (overturned goals, deleted shots) are written as a row with removed=True, and an
+# edited play is written again with a higher revision, so the newest revision of each eventId is the truth.
+PLAY_SCHEMA = pa.schema([
+    ('gameId', pa.int64()),
+    ('eventId', pa.int64()),
+    ('sortOrder', pa.int64()),
+    ('revision', pa.int64()),
+    ('removed', pa.bool_()),
+    ('typeDescKey', pa.string()),
+    ('period', pa.int8()),
+    ('timeRemaining', pa.string()),
+    ('situationCode', pa.string()),
+    ('teamId', pa.int32()),
+    ('playerId', pa.int64()),
+    ('x', pa.float64()),
+    ('y', pa.float64()),
+    ('homeTeamId', pa.int32()),
+    ('awayTeamId', pa.int32()),
+    ('homeTeamDefendingSide', pa.string()),
+])
+
+SHOT_TYPES = ('shot-on-goal', 'goal')
+
+
+def seasonOf(gameId, response=None):
+    """
+    Returns the season a game belongs to, e.g. 20232024 for game 2023020999.
+    """
+    if response and response.get('season'):
+        return int(response['season'])
+    startYear = int(str(gameId)[:4])
+    return startYear * 10000 + startYear + 1
+
+
+def playRows(gameId, response, plays, revision, removed=False):
+    """
+    Flatten plays from a play-by-play response into columns matching PLAY_SCHEMA.
+
+    Parameters:
+    - gameId (int): The game the plays belong to.
+    - response (dict): The response the plays came from, for the team IDs.
+    - plays (list): The plays to flatten.
+    - revision (int): Revision number written with every row.
+    - removed (bool): Mark every row as a removed play.
+
+    Returns:
+    dict: Column name to list of values.
+    """
+    homeTeamId = response.get('homeTeam', {}).get('id')
+    awayTeamId = response.get('awayTeam', {}).get('id')
+    columns = {field.name: [] for field in PLAY_SCHEMA}
+    for play in plays:
+        details = play.get('details', {})
+        columns['gameId'].append(gameId)
+        columns['eventId'].append(play['eventId'])
+        columns['sortOrder'].append(play.get('sortOrder'))
+        columns['revision'].append(revision)
+        columns['removed'].append(removed)
+        columns['typeDescKey'].append(play.get('typeDescKey'))
+        columns['period'].append(play.get('periodDescriptor', {}).get('number', play.get('period')))
+        columns['timeRemaining'].append(play.get('timeRemaining'))
+        columns['situationCode'].append(play.get('situationCode'))
+        columns['teamId'].append(details.get('eventOwnerTeamId'))
+        columns['playerId'].append(details.get('scoringPlayerId', details.get('shootingPlayerId')))
+        columns['x'].append(details.get('xCoord'))
+        columns['y'].append(details.get('yCoord'))
+        columns['homeTeamId'].append(homeTeamId)
+        columns['awayTeamId'].append(awayTeamId)
+        columns['homeTeamDefendingSide'].append(play.get('homeTeamDefendingSide'))
+    return columns
+
+
+def latestRevisions(table):
+    """
+    Keep only the newest revision of each play and drop the plays that were removed.
+
+    Parameters:
+    - table (pyarrow.Table): Rows in PLAY_SCHEMA, possibly with several revisions per play.
+
+    Returns:
+    pyarrow.Table: One row per live play, in game and sortOrder order.
+    """
+    if table.num_rows == 0:
+        return table
+    newest = table.group_by(['gameId', 'eventId']).aggregate([('revision', 'max')])
+    newest = newest.rename_columns(['gameId', 'eventId', 'revision'])
+    table = table.join(newest, ['gameId', 'eventId', 'revision'], join_type='inner')
+    table = table.filter(pc.invert(table['removed']))
+    return table.sort_by([('gameId', 'ascending'), ('sortOrder', 'ascending')]).select(PLAY_SCHEMA.names)
+
+
+# On-disk archive of every play the lamp has seen, so a season's shots can be studied without downloading anything
+# again. Games are written as Arrow IPC files in a hive-style season=/game= layout, which pyarrow.dataset can also
+# read directly.
+class PlayArchive:
+    """
+    Append-only play archive partitioned by season and game.
+
+    Parameters:
+    - root (str): Folder the archive lives in.
+
+    Note:
+    While a game is on, each poll that changed anything is written as a small part file, so a crash loses at most
+    one poll. compact() folds the parts into a single game.arrow once the game is final. Files are uncompressed Arrow
+    IPC rather than Parquet so that reads can memory-map them: loading a season maps the files and only the pages
+    that are actually touched are read from disk.
+    """
+
+    def __init__(self, root='./archive'):
+        self.root = root
+        self._revisions = itertools.count(int(time.time() * 1000))
+
+    def gamePath(self, gameId, season=None):
+        season = season if season is not None else seasonOf(gameId)
+        return os.path.join(self.root, f'season={season}', f'game={gameId}')
+
+    def appendPlays(self, gameId, response, plays, removed=()):
+        """
+        Write plays for a game as a new part file.
+
+        Parameters:
+        - gameId (int): The game the plays belong to.
+        - response (dict): The play-by-play response they came from.
+        - plays (list): New or edited plays.
+        - removed (list): Plays that disappeared from the feed.
+
+        Returns:
+        str or None: The part file written, or None if there was nothing to write.
+        """
+        if not plays and not removed:
+            return None
+        revision = next(self._revisions)
+        columns = playRows(gameId, response, plays, revision)
+        for name, values in playRows(gameId, response, removed, revision, removed=True).items():
+            columns[name].extend(values)
+        table = pa.Table.from_pydict(columns, schema=PLAY_SCHEMA)
+
+        folder = self.gamePath(gameId, seasonOf(gameId, response))
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'part-{revision}.arrow')
+        self._write(table, path)
+        return path
+
+    def recordUpdate(self, gameId, update):
+        """
+        Archive one poll of a game's feed, and compact the game once it is over.
+
+        Parameters:
+        - gameId (int): The game that was polled.
+        - update (FeedUpdate): The result of the poll.
+        """
+        response = update.response
+        self.appendPlays(gameId, response, update.newPlays + update.changedPlays, update.removedPlays)
+        if response.get('gameState') in ('FINAL', 'OFF'):
+            self.compact(gameId, seasonOf(gameId, response))
+
+    def compact(self, gameId, season=None):
+        """
+        Fold a game's part files into a single game.arrow with one row per live play.
+        """
+        folder = self.gamePath(gameId, season)
+        parts = self._parts(folder)
+        if not parts:
+            return
+        tables = [self._read(path) for path in parts]
+        gameFile = os.path.join(folder, 'game.arrow')
+        if os.path.exists(gameFile):
+            tables.insert(0, self._read(gameFile))
+        self._write(latestRevisions(pa.concat_tables(tables)), gameFile)
+        for path in parts:
+            os.remove(path)
+
+    def seasons(self):
+        """
+        Returns the archived seasons, oldest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name.split('=')[1]) for name in os.listdir(self.root) if name.startswith('season='))
+
+    def games(self, season):
+        """
+        Returns the archived game IDs of a season.
+        """
+        folder = os.path.join(self.root, f'season={season}')
+        if not os.path.isdir(folder):
+            return []
+        return sorted(int(name.split('=')[1]) for name in os.listdir(folder) if name.startswith('game='))
+
+    def loadGame(self, gameId, season=None):
+        """
+        Returns every live play of a game as a pyarrow Table, including a game that is still being written.
+        """
+        folder = self.gamePath(gameId, season)
+        paths = self._parts(folder)
+        gameFile = os.path.join(folder, 'game.arrow')
+        if os.path.exists(gameFile):
+            paths.insert(0, gameFile)
+        if not paths:
+            return PLAY_SCHEMA.empty_table()
+        table = pa.concat_tables([self._read(path) for path in paths])
+        # A compacted game with no parts is already one row per play, so it stays memory-mapped as is
+        return table if paths == [gameFile] else latestRevisions(table)
+
+    def loadSeason(self, season, typeDescKeys=None, teamId=None):
+        """
+        Load a season's plays, memory-mapped.
+
+        Parameters:
+        - season (int): e.g. 20232024.
+        - typeDescKeys (tuple): Only keep these play types. None keeps every type.
+        - teamId (int): Only keep plays made by this team. None keeps both teams.
+
+        Returns:
+        pyarrow.Table: The matching plays of every archived game in the season.
+        """
+        tables = [self.loadGame(gameId, season) for gameId in self.games(season)]
+        if not tables:
+            return PLAY_SCHEMA.empty_table()
+        table = pa.concat_tables(tables)
+        if typeDescKeys is not None:
+            table = table.filter(pc.is_in(table['typeDescKey'], value_set=pa.array(typeDescKeys)))
+        if teamId is not None:
+            table = table.filter(pc.equal(table['teamId'], teamId))
+        return table
+
+    def shots(self, season, teamId=None):
+        """
+        Returns a season's shots on goal, including goals, as a pyarrow Table.
+        """
+        return self.loadSeason(season, SHOT_TYPES, teamId)
+
+    def goals(self, season, teamId=None):
+        """
+        Returns a season's goals as a pyarrow Table.
+        """
+        return self.loadSeason(season, ('goal',), teamId)
+
+    @staticmethod
+    def _parts(folder):
+        if not os.path.isdir(folder):
+            return []
+        return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.startswith('part-'))
+
+    @staticmethod
+    def _write(table, path):
+        # Write next to the target and swap it in, so a reader never sees a half-written file
+        with atomicWrite(path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @staticmethod
+    def _read(path):
+        # The table's buffers point straight into the mapped file, which stays mapped while they are in use
+        return ipc.open_file(pa.memory_map(path, 'r')).read_all()
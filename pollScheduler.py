@@ -0,0 +1,105 @@
+import datetime
+
+from lampClock import WALL_CLOCK
+
+# Reasons the NHL gives on a stoppage while a goal is being looked at. A goal can still be taken back, so these are
+# polled as tightly as a goalie pull.
+REVIEW_REASONS = ('video-review', 'chlg', 'review')
+
+
+def _secondsFromClock(clock):
+    minutes, seconds = clock.split(':')
+    return int(minutes) * 60 + int(seconds)
+
+
+# Picks how long to wait before the next poll from the state of the game. A flat ten seconds wastes requests during
+# intermissions and is too slow when the goalie is pulled with a minute left.
+class PollScheduler:
+    """
+    Adaptive poll interval based on the last play-by-play response.
+
+    Parameters:
+    - baseInterval (float): Seconds between polls during normal play.
+    - fastInterval (float): Seconds between polls during high-leverage moments: the last two minutes of the third
+      period, overtime, an empty net, a two-man advantage, a power play, or a goal under review.
+    - slowInterval (float): Seconds between polls before the game and during intermissions.
+    - finalInterval (float): Seconds between polls once the game is over. The main loop normally stops before this.
+    - clock (WallClock): Where the current time comes from, for the wait until puck drop.
+    """
+
+    def __init__(self, baseInterval=10, fastInterval=3, slowInterval=60, finalInterval=300, clock=WALL_CLOCK):
+        self.clock = clock
+        self.baseInterval = baseInterval
+        self.fastInterval = fastInterval
+        self.slowInterval = slowInterval
+        self.finalInterval = finalInterval
+
+    def nextInterval(self, response):
+        """
+        Returns the number of seconds to wait before polling again.
+
+        Parameters:
+        - response (dict): The latest play-by-play response, or None if nothing has been fetched yet.
+        """
+        if not response:
+            return self.baseInterval
+
+        gameState = response.get('gameState', 'LIVE')
+        if gameState in ('FINAL', 'OFF'):
+            return self.finalInterval
+
+        clock = response.get('clock', {})
+        if gameState in ('FUT', 'PRE'):
+            return self._untilPuckDrop(response.get('startTimeUTC'))
+        if clock.get('inIntermission'):
+            return self._untilClockRunsOut(clock, self.slowInterval)
+
+        if gameState == 'CRIT' or self.isHighLeverage(response):
+            return self.fastInterval
+        return self.baseInterval
+
+    def _untilPuckDrop(self, startTimeUTC):
+        if not startTimeUTC:
+            return self.slowInterval
+        startTime = datetime.datetime.fromisoformat(startTimeUTC.replace('Z', '+00:00'))
+        secondsToStart = (startTime - self.clock.now(datetime.timezone.utc)).total_seconds()
+        return max(self.baseInterval, min(self.slowInterval, secondsToStart))
+
+    def _untilClockRunsOut(self, clock, interval):
+        # Don't sleep through the end of the intermission or the puck drop
+        secondsRemaining = clock.get('secondsRemaining')
+        if secondsRemaining is None or secondsRemaining <= 0:
+            return interval
+        return max(self.fastInterval, min(interval, secondsRemaining))
+
+    def isHighLeverage(self, response):
+        """
+        Returns True if the game is at a moment where a goal (or a goal being taken back) is likely soon.
+        """
+        plays = response.get('plays') or []
+        lastPlay = plays[-1] if plays else {}
+
+        period = response.get('periodDescriptor', {}).get('number', lastPlay.get('period', 1))
+        if period >= 4:
+            return True
+
+        if period == 3:
+            secondsRemaining = response.get('clock', {}).get('secondsRemaining')
+            if secondsRemaining is None and 'timeRemaining' in lastPlay:
+                secondsRemaining = _secondsFromClock(lastPlay['timeRemaining'])
+            if secondsRemaining is not None and secondsRemaining <= 120:
+                return True
+
+        # situationCode is away goalie, away skaters, home skaters, home goalie, e.g. '1551' at even strength
+        situationCode = lastPlay.get('situationCode', '')
+        if len(situationCode) == 4 and situationCode.isdigit():
+            awayGoalie, awaySkaters, homeSkaters, homeGoalie = (int(digit) for digit in situationCode)
+            if awayGoalie == 0 or homeGoalie == 0 or awaySkaters != homeSkaters:
+                return True
+
+        if lastPlay.get('typeDescKey') == 'stoppage':
+            reason = lastPlay.get('details', {}).get('reason', '')
+            if any(key in reason for key in REVIEW_REASONS):
+                return True
+
+        return False
@@ -0,0 +1,268 @@
+import concurrent.futures
+import io
+import os
+import threading
+
+import matplotlib
+matplotlib.use('agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from hockey_rink import NHLRink, RinkImage
+from PIL import Image
+
+import metrics
+
+# The logo drawn at centre ice, read from disk so drawing the rink never touches the network. It isn't in the repo,
+# since the team's logo is theirs to distribute: put a PNG here to have it drawn.
+SABRES_LOGO = './images/sabresLogo.png'
+SABRES_BLUE = '#003087'
+# The EN (sortOrder) column of a store with nothing drawn from it yet
+NO_IDS = np.empty(0, dtype=np.int64)
+
+
+# Draws the rink once and then only adds what is new. Building an NHLRink, drawing its features and re-plotting every
+# shot costs close to a second of matplotlib work, while blitting a handful of new markers onto a cached raster takes
+# a few milliseconds.
+class RinkRenderer:
+    """
+    Incremental renderer for the shot and goal plot.
+
+    Parameters:
+    - logoPath (str): Image drawn at centre ice. The rink is drawn without a logo if the file is missing.
+    - figsize (tuple): Figure size in inches. The default matches the shape of the rink so nothing needs cropping.
+    - dpi (int): Resolution of the rendered image.
+    - imageFormat (str): 'png' or 'jpeg', the format encode() returns.
+    - pngCompression (int): zlib level for PNG, 0 to 9. Higher is smaller and slower.
+    - jpegQuality (int): Quality for JPEG, 1 to 95.
+
+    Note:
+    The rink is drawn a single time and its raster is kept. Each call to update() restores that raster, draws only
+    the markers for rows it hasn't drawn yet, and keeps the result as the new raster. Markers are therefore layered
+    in the order they arrive, and nothing is ever drawn twice. If a store gets shorter (a new game, or a goal that
+    was taken back) the renderer starts again from the bare rink and draws every row once.
+    """
+
+    def __init__(self, logoPath=SABRES_LOGO, figsize=(10, 4.31), dpi=100, imageFormat='png', pngCompression=1,
+                 jpegQuality=85):
+        self.imageFormat = imageFormat
+        self.pngCompression = pngCompression
+        self.jpegQuality = jpegQuality
+        self.fig = plt.figure(figsize=figsize, dpi=dpi)
+        # Let the axes fill the whole figure, so the raster is the rink and nothing else
+        self.ax = self.fig.add_axes((0, 0, 1, 1))
+
+        # The rink's hidden 'ice' texture is downloaded from GitHub unless an image is handed to it
+        features = {'ice': {'image': np.zeros((1, 1, 4)), 'visible': False}}
+        if os.path.exists(logoPath):
+            features['sabresLogo'] = {
+                'feature_class': RinkImage,
+                'image': plt.imread(logoPath),
+                'x': 0, 'length': 27, 'width': 27,
+                'zorder': 15, 'alpha': 0.5,
+            }
+        else:
+            print(f'No logo found at {logoPath}, drawing the rink without one.')
+        self.rink = NHLRink(**features)
+        self.rink.draw(ax=self.ax)
+
+        self.fig.canvas.draw()
+        self.rinkBackground = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.background = self.rinkBackground
+        self.shotIdsDrawn = NO_IDS
+        self.goalIdsDrawn = NO_IDS
+        self._encoded = None
+
+    def reset(self):
+        """
+        Go back to the bare rink.
+        """
+        self.background = self.rinkBackground
+        self.shotIdsDrawn = NO_IDS
+        self.goalIdsDrawn = NO_IDS
+        self._encoded = None
+
+    def _blit(self, artists):
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        for artist in artists:
+            self.ax.draw_artist(artist)
+            # The pixels are kept in the raster, so the artist itself is no longer needed
+            artist.remove()
+        self.background = canvas.copy_from_bbox(self.fig.bbox)
+        self._encoded = None
+
+    def update(self, shots, goals):
+        """
+        Draw the shots and goals that haven't been drawn yet.
+
+        Parameters:
+        - shots (EventStore): The team's shots, with 'x', 'y' and 'EN' columns.
+        - goals (EventStore): The team's goals, with 'x', 'y', 'SN' and 'EN' columns.
+
+        Returns:
+        bool: True if anything new was drawn.
+
+        Note:
+        What was drawn is remembered by the plays' EN (sortOrder), not by how many there were. If any play already on
+        the rink is no longer at the front of its store, e.g. a goal was overturned and another scored in the same
+        poll, the rink is drawn again from scratch.
+        """
+        if not (_drawnStill(shots, self.shotIdsDrawn) and _drawnStill(goals, self.goalIdsDrawn)):
+            self.reset()
+        shotsDrawn, goalsDrawn = len(self.shotIdsDrawn), len(self.goalIdsDrawn)
+        if len(shots) == shotsDrawn and len(goals) == goalsDrawn:
+            return False
+
+        with metrics.span('lamp_render_seconds'):
+            artists = []
+            if len(shots) > shotsDrawn:
+                newShots = {'x': shots['x'][shotsDrawn:], 'y': shots['y'][shotsDrawn:]}
+                artists.append(self.rink.scatter('x', 'y', data=newShots, ax=self.ax, marker='X', c=SABRES_BLUE))
+            if len(goals) > goalsDrawn:
+                newGoals = {'x': goals['x'][goalsDrawn:], 'y': goals['y'][goalsDrawn:],
+                            'SN': goals['SN'][goalsDrawn:]}
+                artists.append(self.rink.scatter('x', 'y', data=newGoals, ax=self.ax, facecolor=SABRES_BLUE,
+                                                 edgecolor='black', s=300))
+                artists.extend(self.rink.text('x', 'y', s='SN', data=newGoals, ax=self.ax, ha='center',
+                                              va='center', fontsize=14, c='#FFFFFF'))
+
+            self._blit(artists)
+        self.shotIdsDrawn = shots['EN'].copy()
+        self.goalIdsDrawn = goals['EN'].copy()
+        return True
+
+    def toImage(self):
+        """
+        Returns the current raster as a PIL image without re-rendering the figure.
+        """
+        width, height = self.fig.canvas.get_width_height()
+        return Image.frombuffer('RGBA', (width, height), np.asarray(self.fig.canvas.buffer_rgba()), 'raw', 'RGBA', 0, 1)
+
+    def encode(self):
+        """
+        Returns the current raster encoded as PNG or JPEG bytes, ready to hand to an ft.Image.
+
+        Note:
+        The encoding is done in memory and kept until something new is drawn, so asking for the image again without
+        an update costs nothing. PNG is lossless, so the markers stay sharp, and by default a fast compression level
+        is used since the bytes never leave the machine or the local network. JPEG is much smaller, for sending the
+        rink to a lot of browsers.
+        """
+        if self._encoded is None:
+            with metrics.span('lamp_encode_seconds'):
+                buffer = io.BytesIO()
+                if self.imageFormat == 'jpeg':
+                    self.toImage().convert('RGB').save(buffer, format='JPEG', quality=self.jpegQuality)
+                else:
+                    self.toImage().convert('RGB').save(buffer, format='PNG', compress_level=self.pngCompression)
+                self._encoded = buffer.getvalue()
+        return self._encoded
+
+    def save(self, path):
+        """
+        Write the current raster to a file. The format follows the file extension.
+        """
+        self.toImage().convert('RGB').save(path)
+
+
+# Whether the rows of a store that are already on the rink are still the first rows of it, in the same order
+def _drawnStill(store, idsDrawn):
+    return np.array_equal(store['EN'][:len(idsDrawn)], idsDrawn)
+
+
+# Keeps matplotlib off the event loop. The poller hands over the latest shots and goals and carries on; a single
+# render thread draws and encodes them. Anything handed over while a frame is being drawn replaces whatever was
+# already waiting, so after a burst of plays only the newest state is drawn and the thread never falls behind.
+class RenderWorker:
+    """
+    Draws and encodes the rink on a background thread, keeping only the latest pending frame.
+
+    Parameters:
+    - renderer (RinkRenderer): The renderer to draw with. Only the render thread touches it once the worker exists.
+    - onFrame (callable): Called with no arguments on the render thread each time a new frame is ready. Use
+      loop.call_soon_threadsafe to get back to an event loop.
+
+    Note:
+    The renderer keeps its raster between frames and only draws what is new, so it lives on one thread rather than
+    a pool. submit() never blocks: it copies the stores, which is a few hundred numbers, and returns. Read the latest
+    finished image from frame.
+    """
+
+    def __init__(self, renderer, onFrame=None):
+        self.renderer = renderer
+        self.onFrame = onFrame
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='lampRender')
+        self.lock = threading.Lock()
+        self.pending = None  # (shots, goals) waiting to be drawn
+        self.resetPending = False
+        self.running = False
+        self.submitted = None  # (shots, goals) copies of the last submit(), to skip repeats
+        self.frame = None  # the latest encoded image
+
+    def submit(self, shots, goals):
+        """
+        Ask for the rink with these shots and goals. Returns at once; a request still waiting is replaced.
+
+        Parameters:
+        - shots (EventStore): The team's shots.
+        - goals (EventStore): The team's goals.
+        """
+        submitted = self.submitted
+        if (submitted is not None and np.array_equal(submitted[0]['EN'], shots['EN']) and
+                np.array_equal(submitted[1]['EN'], goals['EN'])):
+            return
+        self.submitted = (shots.copy(), goals.copy())
+        with self.lock:
+            if self.pending is not None:
+                metrics.inc('lamp_render_coalesced_total')
+            self.pending = self.submitted
+            self._wake()
+
+    def reset(self):
+        """
+        Start the next frame from the bare rink, for a new game.
+        """
+        self.submitted = None
+        with self.lock:
+            self.pending = None
+            self.resetPending = True
+            self.frame = None
+            self._wake()
+
+    def flush(self):
+        """
+        Block until every frame asked for so far is drawn. Call it from a worker thread, not the event loop.
+        """
+        self.executor.submit(lambda: None).result()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _wake(self):
+        # Called with the lock held
+        if not self.running:
+            self.running = True
+            self.executor.submit(self._run)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                request, reset = self.pending, self.resetPending
+                self.pending, self.resetPending = None, False
+                if request is None and not reset:
+                    self.running = False
+                    return
+            try:
+                if reset:
+                    self.renderer.reset()
+                if request is not None:
+                    self.renderer.update(*request)
+                    frame = self.renderer.encode()
+                    with self.lock:
+                        # A reset that came in while drawing wins over the frame of the old game
+                        if not self.resetPending:
+                            self.frame = frame
+                    if self.onFrame is not None:
+                        self.onFrame()
+            except Exception as error:
+                print(f'Drawing the rink failed: {error}')
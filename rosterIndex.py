@@ -0,0 +1,87 @@
+def fullName(player):
+    """
+    Returns the first and last name of a roster entry.
+    """
+    return player['firstName']['default'] + ' ' + player['lastName']['default']
+
+
+# Lookup tables for a game's rosterSpots. Goal announcements and the GUI's goal list used to scan the whole roster
+# for every player they needed, and matched on sweater numbers alone, which both teams can share.
+class RosterIndex:
+    """
+    Index of the players dressed for a game.
+
+    Parameters:
+    - rosterSpots (list): The 'rosterSpots' list of a play-by-play response.
+
+    Note:
+    Players are found by playerId, or by team and sweater number, in constant time. update() is cheap to call on
+    every poll: a response that hasn't changed is skipped outright, and otherwise only players not seen before are
+    added. Players who leave the roster are kept, so a goal they scored earlier can still be named.
+    """
+
+    __slots__ = ('byId', 'byNumber', '_source')
+
+    def __init__(self, rosterSpots=()):
+        self.byId = {}
+        self.byNumber = {}
+        self._source = None
+        self.update(rosterSpots)
+
+    def __len__(self):
+        return len(self.byId)
+
+    def __contains__(self, playerId):
+        return playerId in self.byId
+
+    def update(self, rosterSpots):
+        """
+        Add any players that are new in rosterSpots, e.g. after a call-up or a goalie change mid-game.
+
+        Parameters:
+        - rosterSpots (list): The 'rosterSpots' list of the latest response. None is ignored.
+        """
+        # A 304 hands back the very same response, so there's nothing new to look at
+        if rosterSpots is None or rosterSpots is self._source:
+            return
+        self._source = rosterSpots
+        for player in rosterSpots:
+            known = self.byId.get(player['playerId'])
+            if known is not None and known == player:
+                continue
+            if known is not None:
+                # The player's entry changed, e.g. a new sweater number, so drop the old number first
+                self.byNumber.pop((known.get('teamId'), known.get('sweaterNumber')), None)
+            self.byId[player['playerId']] = player
+            self.byNumber[(player.get('teamId'), player.get('sweaterNumber'))] = player
+
+    def player(self, playerId):
+        """
+        Returns the roster entry for a playerId, or None if the player isn't on the roster.
+        """
+        return self.byId.get(playerId)
+
+    def playerByNumber(self, teamId, sweaterNumber):
+        """
+        Returns the roster entry for a team's sweater number, or None if nobody on that team wears it.
+        """
+        return self.byNumber.get((teamId, sweaterNumber))
+
+    def name(self, playerId, default='Unknown'):
+        """
+        Returns a player's first and last name.
+        """
+        player = self.byId.get(playerId)
+        if player is None:
+            return default
+        return fullName(player)
+
+    def number(self, playerId, default=-1):
+        """
+        Returns a player's sweater number.
+        """
+        player = self.byId.get(playerId)
+        if player is None:
+            return default
+        return player['sweaterNumber']
+
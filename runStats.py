@@ -0,0 +1,28 @@
+import resource
+import sys
+
+
+# The simulator and the benchmarks report latencies and memory the same way, so their numbers can be compared
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of numbers, or None if the list is empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+# ru_maxrss is in different units on Linux and macOS, so it is only ever converted here
+def peakRSSMB(maxRSS=None):
+    """
+    Returns the peak resident set size in megabytes.
+
+    Parameters:
+    - maxRSS (int): A ru_maxrss value, e.g. reported by another process. Defaults to this process's.
+    """
+    if maxRSS is None:
+        maxRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return maxRSS / (1024 * 1024) if sys.platform == 'darwin' else maxRSS / 1024
@@ -1,297 +1,796 @@
-import requests
+import argparse
+import asyncio
+import concurrent.futures
 import datetime
-import time
 import json
-import playsound
-import pandas as pd
-import numpy as np
-from hockey_rink import NHLRink, RinkImage
-import matplotlib
-import matplotlib.pyplot as plt
-import flet as ft
 import sys
+import metrics
+import lampConfig
+from fetchClient import FetchClient
+from eventBus import EventBus, EventBusServer
+from eventStore import EventStore, GOAL_COLUMNS, SHOT_COLUMNS
+from gameCheckpoint import GameCheckpoint
+from gameFeed import GameFeed
+from goalTracker import CONFIRMED, OVERTURNED, PENDING
+from audioEngine import HORNS, AudioEngine, ClipCache
+from lampClock import WALL_CLOCK
+from lampRuntime import AudioTask, RefreshTask, sleepUntil
+from pollScheduler import PollScheduler
+from rosterIndex import RosterIndex, fullName
+from scoreboard import Scoreboard, scoreLine
+from shotAnalytics import ShotAnalytics
+from scheduleCache import ScheduleCache, localStartTime
 
-matplotlib.use('agg')
 
 # opens the sabresGoalSong file that points to each player's music file. Not fully up to date with the deadline
-# acquisitions. Also initializes pygame and the pygame mixer which is used to play the goal music
-sabresGoalSong = json.loads(open('./audioFiles/SabresGoalSongs.json', "r").read())
+# acquisitions.
+with open('./audioFiles/SabresGoalSongs.json', 'r') as songFile:
+    sabresGoalSong = json.load(songFile)
 SABRES_TEAM_ID = 7
+BASE_API_URL = 'https://api-web.nhle.com/'
 
+# Points each team ID at its player -> goal song mapping, in the same format as SabresGoalSongs.json. Teams that
+# aren't listed get the default song for every goal.
+TEAM_GOAL_SONGS = './audioFiles/teamGoalSongs.json'
 
-# Function that checks for a game on the present day. NHL api only passes data a week at a time so we need to parse
-# the entire week.
-def checkForGame(url):
-    """Checks for a game on the present day
-        url is the address of the NHL API
-    """
-    CHECKGAME_response = requests.get(url).json()
-
-    # Finds the timezone of the current user. Tested in eastern time on Windows, macOS, and Ubuntu. Only supports US
-    # timezones at present
-    timeZone = time.tzname
-    # timeZoneOffset = {'EST': -4, 'Eastern Standard Time': -4, 'CST': -5, 'Central Standard Time': -5,
-    #                   'MST': -6, 'Mountain Standard Time': -6, 'PST': -7, 'Pacific Standard Time': -7}
-    timeZoneOffset_daylightSavings = {'EST': -5, 'Eastern Standard Time': -5, 'CST': -6,
-                                      'Central Standard Time': -6,
-                                      'MST': -7, 'Mountain Standard Time': -7, 'PST': -8,
-                                      'Pacific Standard Time': -8}
-
-    # Gets all games on today
-    daysOfWeek = CHECKGAME_response["gameWeek"]
-
-    for day in daysOfWeek:
-        if day['date'] == url[-10:]:
-            # Get all the games that are happening today in the NHL and iterate through those games
-            games = day["games"]
-            for game in games:
-                awayTeamID = game['awayTeam']['id']  # Gets the away team ID
-                homeTeamID = game['homeTeam']['id']  # Gets the home team ID
-
-                # Checks if the Sabres are involved with the game and assigns if they are home or away
-                if awayTeamID == SABRES_TEAM_ID or homeTeamID == SABRES_TEAM_ID:
-                    if awayTeamID == SABRES_TEAM_ID:
-                        SabresHomeOrAway = "awayTeam"
-                        OpHomeOrAway = "homeTeam"
-                    else:
-                        SabresHomeOrAway = "homeTeam"
-                        OpHomeOrAway = "awayTeam"
+# Where the lamp gets the time from and waits on. The simulator swaps in a faster one.
+clock = WALL_CLOCK
+
+# Shared HTTP layer so every NHL API call reuses the same pooled connections and conditional request cache
+fetchClient = FetchClient()
+
+# Schedule kept on disk so it is only fetched once a week
+scheduleCache = ScheduleCache(BASE_API_URL, client=fetchClient)
+
+# How long before puck drop the lamp wakes up to fetch the rosters and get ready
+WAKE_LEAD = datetime.timedelta(minutes=30)
+
+# Seconds to wait before following a game again after it failed, e.g. the network was down for its first poll. The
+# wait doubles with every failure in a row up to the maximum, and a game is given up on once it started longer ago
+# than GAME_RETRY_WINDOW, when the schedule takes it to be over anyway.
+GAME_RETRY_DELAY = 15
+GAME_RETRY_MAX_DELAY = 300
+GAME_RETRY_WINDOW = datetime.timedelta(hours=6)
+
+# Seconds between polls of the live game feed during normal play. The scheduler polls faster in the final minutes,
+# on power plays and during reviews, and backs off during intermissions.
+POLL_INTERVAL = 10
+pollScheduler = PollScheduler(baseInterval=POLL_INTERVAL)
+
+# Local fan-out of game events for other lamps and displays, set up from the -b and -s flags. Subscribers listen to
+# this process instead of polling the NHL themselves.
+EVENT_BUS_HOST = '0.0.0.0'
+eventBus = None
+eventBusServer = None
+
+# Every play seen is kept on disk, partitioned by season and game, for analysis later. pyarrow is only loaded once
+# there is a game to archive.
+ARCHIVE_ENABLED = True
+ARCHIVE_PATH = './archive'
+sharedArchive = None
+
+# Rolling timing statistics, rewritten at most once a minute while a game is on. With -b the same numbers are also
+# served in Prometheus format on /metrics.
+STATS_PATH = './cache/stats.json'
+STATS_INTERVAL = 60
+
+# Where the state of a game in progress is kept, so a restart picks up where the lamp left off
+CHECKPOINT_PATH = './cache/checkpoints'
+
+# The web dashboard shared by every connected browser, and the one task running the lamp behind it
+dashboard = None
+dashboardEngine = None
+
+# Least number of seconds between two GUI updates. Anything that happens in between goes out with the next one.
+GUI_REFRESH_INTERVAL = 0.25
+
+# How the rink is drawn and encoded for the GUI, see RinkRenderer
+RENDER_OPTIONS = {'figsize': (10, 4.31), 'dpi': 100, 'imageFormat': 'png', 'pngCompression': 1, 'jpegQuality': 85}
 
-                    # Determine the start time of the game in local time
-                    gameTimeLocal = datetime.datetime.fromisoformat(game["startTimeUTC"][:-1]) \
-                                    + datetime.timedelta(hours=timeZoneOffset_daylightSavings[timeZone[0]])
+# Sound output. A song is faded out after CLIP_LENGTH seconds, and up to AUDIO_CACHE_MB of decoded songs are kept.
+AUDIO_DEVICE = 'default'
+CLIP_LENGTH = 20
+AUDIO_BUFFER_MILLISECONDS = 50
+AUDIO_CACHE_MB = 64
+
+# How many of the latest plays each poll re-checks for edits by the NHL
+REVISION_WINDOW = 20
+
+# Threads used for work taken off the event loop. 0 leaves Python's default pool alone.
+WORKER_THREADS = 0
+
+# Set from the mode in the settings: the GUI, and the GUI served to browsers as the web dashboard
+gui = False
+webUI = False
+
+
+def openArchive():
+    """
+    Returns the shared play archive, creating it the first time it is needed.
+    """
+    global sharedArchive
+    if sharedArchive is None:
+        from playArchive import PlayArchive
+        sharedArchive = PlayArchive(ARCHIVE_PATH)
+    return sharedArchive
+
+
+# Called after every poll of a game, so new outputs of the poller only need to be added in one place
+async def publishPoll(gameId, update):
+    """
+    Hand one poll of a game to everything downstream of the poller: the event bus, if enabled, the play archive and
+    the stats file.
+
+    Parameters:
+    - gameId (int): The game that was polled.
+    - update (FeedUpdate): The result of the poll.
+    """
+    if eventBus is not None:
+        eventBus.publishUpdate(gameId, update)
+    # Nothing is written for a poll that changed nothing, apart from folding the game together once it is over
+    if ARCHIVE_ENABLED and (update.hasChanges() or update.response.get('gameState') in ('FINAL', 'OFF')):
+        await asyncio.to_thread(openArchive().recordUpdate, gameId, update)
+    # Off the event loop like the other writes, since the stats file is fsynced too
+    await asyncio.to_thread(metrics.REGISTRY.writeJSON, STATS_PATH, STATS_INTERVAL)
+
+
+# Keeps a team's shot analytics in step with the feed
+def updateAnalytics(analytics, feed, teamId):
+    """
+    Add the last poll's shots to a team's analytics.
+
+    Parameters:
+    - analytics (ShotAnalytics): The team's analytics so far.
+    - feed (GameFeed): The game's feed, just polled.
+    - teamId (int): The team the analytics are for.
+
+    Returns:
+    ShotAnalytics: The updated analytics. A new object if the poll edited plays already counted.
+
+    Note:
+    New plays are added and removed plays taken back out. An edited play (e.g. a corrected shot location) can't be
+    taken out in its old form, so the game is counted again from the feed, which is only a few dozen shots.
+    """
+    update = feed.lastUpdate
+    homeTeamId = feed.response['homeTeam']['id']
+    if update.changedPlays:
+        analytics = ShotAnalytics(analytics.binSize)
+        analytics.addPlays(feed.allPlays(), teamId, homeTeamId)
+        return analytics
+    analytics.addPlays(update.newPlays, teamId, homeTeamId)
+    analytics.addPlays(update.removedPlays, teamId, homeTeamId, weight=-1.0)
+    return analytics
+
+
+# Rebuilds a team's goal markers from the plays still in the feed, e.g. after a goal was overturned
+def goalStore(feed, rosters, teamId):
+    """
+    Returns an EventStore in GOAL_COLUMNS with every goal of a team that is still in the feed.
+
+    Parameters:
+    - feed (GameFeed): The game's feed.
+    - rosters (RosterIndex): The players dressed for the game, for the scorers' sweater numbers.
+    - teamId (int): The team whose goals are wanted.
+    """
+    goals = EventStore(GOAL_COLUMNS)
+    for play in feed.allPlays():
+        if play['typeDescKey'] == 'goal' and play['details'].get('eventOwnerTeamId') == teamId:
+            details = play['details']
+            goals.append(details['xCoord'], details['yCoord'], rosters.number(details['scoringPlayerId']),
+                         play['sortOrder'])
+    return goals
+
+
+# Builds the goal song player from the sound settings
+def newAudioTask():
+    """
+    Returns an AudioTask on the configured sound output.
+    """
+    cache = ClipCache(maxBytes=AUDIO_CACHE_MB * 1024 * 1024, clipLength=CLIP_LENGTH)
+    engine = AudioEngine(AUDIO_DEVICE, CLIP_LENGTH, bufferMilliseconds=AUDIO_BUFFER_MILLISECONDS, cache=cache)
+    return AudioTask(CLIP_LENGTH, engine)
+
+
+# Lets blocking work handed to asyncio.to_thread (fetches, decoding, checkpoint writes) use the configured pool size
+def useWorkerThreads():
+    """
+    Size the running event loop's thread pool to WORKER_THREADS, if it is set.
+    """
+    if WORKER_THREADS:
+        asyncio.get_running_loop().set_default_executor(
+            concurrent.futures.ThreadPoolExecutor(WORKER_THREADS, thread_name_prefix='lamp'))
+
+
+# Function that finds the next game for any of the given teams. The schedule is kept on disk a week at a time, so this
+# only touches the network when a new week is needed.
+def findGames(teamIds, exclude=()):
+    """
+    Finds the next game day for any of the given teams, including a game that is already in progress.
 
-                    # if the Sabres are involved in a game today then the data for the game is returned
-                    return game["id"], SabresHomeOrAway, OpHomeOrAway, gameTimeLocal
-    # Return default values if Sabres are not involved in the game
+    Parameters:
+    - teamIds (set): The NHL team IDs to look for.
+    - exclude (set): Game IDs that have already been followed to the end.
+
+    Returns:
+    list: One (game, teamId, homeOrAway, opHomeOrAway, gameTimeLocal) tuple per tracked team per game, sorted by
+    start time. A game between two tracked teams appears twice, once for each team.
+    """
+    return scheduleCache.nextGames(teamIds, exclude)
+
+
+# Function that checks for the next Sabres game.
+def checkForGame(exclude=()):
+    """Checks for the next Sabres game
+        exclude is a set of game IDs that are already over
+    """
+    games = findGames({SABRES_TEAM_ID}, exclude)
+    if games:
+        # if the Sabres have a game coming up then the data for the game is returned
+        game, _, SabresHomeOrAway, OpHomeOrAway, gameTimeLocal = games[0]
+        return game["id"], SabresHomeOrAway, OpHomeOrAway, gameTimeLocal
+    # Return default values if the Sabres have no game coming up
     return ['-1', -1, -1, '-1']
 
 
-# Function that pauses the code until the game starts. It also handles plotting the shot and goal data if the game
-# has already started.
-def startGameUpdate(gameTimeLocal, opName, gameURL, gameRosters):
+def nextMorning():
+    """
+    Returns 4 AM tomorrow, local time.
+    """
+    tomorrow = clock.now() + datetime.timedelta(days=1)
+    return tomorrow.replace(hour=4, minute=0, second=0, microsecond=0)
+
+
+# Coroutine that waits until the game starts without blocking the event loop. It also handles plotting the shot and
+# goal data if the game has already started.
+async def startGameUpdate(gameTimeLocal, opName, gameFeed, gameRosters, audio):
     """
     Determine how long until the game starts and print information about the game.
 
     Parameters:
     - gameTimeLocal (datetime): The local start time of the game.
     - opName (str): The name of the opposing team.
-    - gameURL (str): The URL to fetch game events data.
-    - gameRosters (list): List of player rosters with information like playerId, sweaterNumber, etc.
+    - gameFeed (GameFeed): The game's play-by-play feed. It must have been polled at least once.
+    - gameRosters (RosterIndex): The players dressed for the game.
+    - audio (AudioTask): The audio task used to play the Sabre Dance before puck drop.
 
     Returns:
-    Tuple (pd.DataFrame, pd.DataFrame): A tuple containing two Pandas DataFrames:
-        1. sabresShots: DataFrame with columns 'x' and 'y' representing Sabres' shots on goal coordinates.
-        2. sabresGoals: DataFrame with columns 'x', 'y', 'SN' (sweater number), and 'EN' (event order),
+    Tuple (EventStore, EventStore, EventStore, int, str): A tuple containing:
+        1. sabresShots: EventStore with columns 'x', 'y' and 'EN' representing Sabres' shots on goal coordinates.
+        2. sabresGoals: EventStore with columns 'x', 'y', 'SN' (sweater number), and 'EN' (event order),
            representing Sabres' goals coordinates and scorer information.
+        3. opShots: EventStore with the opponent's shots on goal.
+        4. The period of the last play.
+        5. The time remaining in the period of the last play.
 
     Note:
     The function uses the gameTimeLocal to calculate the time remaining until the game starts,
-    fetches game events using the provided URL, and extracts relevant information about Sabres' shots
-    and goals. The information is returned as Pandas DataFrames.
+    reads the plays already ingested by the game feed, and extracts relevant information about Sabres' shots
+    and goals. The information is returned as columnar EventStores.
     """
 
-    # Determine how long until the game starts and then prints some information about the game.
-    tD = (gameTimeLocal - datetime.datetime.now())
+    # Prints some information about the game.
     print('The game today is between the Sabres and the ' + str(opName) + '. It starts at ' +
           str(gameTimeLocal.strftime("%H:%M:%S")) + ' local time')
+    sabresShots = EventStore(SHOT_COLUMNS)
+    sabresGoals = EventStore(GOAL_COLUMNS)
+    opShots = EventStore(SHOT_COLUMNS)
+
     # If the start time of the game has not passed, wait until 15 seconds before it starts.
-    if datetime.datetime.now() < gameTimeLocal:
-        time.sleep(tD.seconds - 15)
-        playsound.playsound('./audioFiles/SabreDance.mp3')
-        return -1, -1, -1, -1, -1
+    if clock.now() < gameTimeLocal:
+        await sleepUntil(gameTimeLocal - datetime.timedelta(seconds=15), clock)
+        audio.play('./audioFiles/SabreDance.mp3')
+        return sabresShots, sabresGoals, opShots, 'Pre-Game', "20:00"
     else:
-        events = requests.get(gameURL).json()['plays']
-        scorerNumber = -1
-        sabresShots = []
-        sabresGoals = []
-        opShots = []
+        # The feed has already been fetched by main(), so no extra download is needed here
+        events = gameFeed.allPlays()
 
         if events:
             for event in events:
                 if event['typeDescKey'] == 'shot-on-goal':
                     data = event['details']
                     if data['eventOwnerTeamId'] == 7:
-                        sabresShots.append(np.array([data['xCoord'], data['yCoord'], event['sortOrder']]))
+                        sabresShots.append(data['xCoord'], data['yCoord'], event['sortOrder'])
                     else:
-                        opShots.append(np.array([data['xCoord'], data['yCoord'], event['sortOrder']]))
+                        opShots.append(data['xCoord'], data['yCoord'], event['sortOrder'])
                 elif event['typeDescKey'] == 'goal':
                     data = event['details']
                     if data['eventOwnerTeamId'] == 7:
-                        for player in gameRosters:
-                            if data['scoringPlayerId'] == player['playerId']:
-                                scorerNumber = player['sweaterNumber']
-                        sabresGoals.append(np.array([data['xCoord'], data['yCoord'], scorerNumber, event['sortOrder']]))
+                        scorerNumber = gameRosters.number(data['scoringPlayerId'])
+                        sabresGoals.append(data['xCoord'], data['yCoord'], scorerNumber, event['sortOrder'])
 
         period = events[-1]['period']
         timeRemaining = events[-1]['timeRemaining']
 
-        sabresShots = pd.DataFrame(sabresShots, columns=['x', 'y', 'EN'])
-        opShots = pd.DataFrame(opShots, columns=['x', 'y', 'EN'])
-        sabresGoals = pd.DataFrame(sabresGoals, columns=['x', 'y', 'SN', 'EN'])
         return sabresShots, sabresGoals, opShots, period, timeRemaining
 
 
 # Function that does most of the updating throughout the game, checks if the Sabres or their opponent has scored
 # a goal
-def duringGameUpdate(SabresHomeOrAway, OpHomeOrAway, LiveGame_url, Rosters, sleepTime):
+def duringGameUpdate(SabresHomeOrAway, OpHomeOrAway, gameFeed, Rosters):
     """
     Update function for ongoing hockey games, checking if the Sabres or their opponent scored a goal.
 
     Parameters:
     - SabresHomeOrAway (str): Indicates whether the Sabres are playing at home or away ('home' or 'away').
     - OpHomeOrAway (str): Indicates whether the opponent is playing at home or away ('home' or 'away').
-    - LiveGame_url (str): The URL to fetch live game data.
-    - Rosters (list): List of player rosters with information like playerId, sweaterNumber, etc.
-    - sleepTime (int): The amount of time that the app should wait between polling
+    - gameFeed (GameFeed): The incremental play-by-play feed for the live game.
+    - Rosters (RosterIndex): The players dressed for the game. It is updated from the response if the roster
+      changed.
 
     Returns:
-    Tuple (bool, bool, int, int, bool, dict, list): A tuple containing the following information:
-        1. Sabres scored (bool): True if Sabres scored a goal during the update, False otherwise.
-        2. Opponent scored (bool): True if the opponent scored a goal during the update, False otherwise.
+    Tuple (bool, bool, int, int, bool, list, list, list, int, str, str, list): A tuple containing the following
+    information:
+        1. Sabres scored (bool): True if a new Sabres goal was found in the update, False otherwise.
+        2. Opponent scored (bool): True if a new opponent goal was found in the update, False otherwise.
         3. New Sabres score (int): The updated score of the Sabres.
         4. New Opponent score (int): The updated score of the opponent.
         5. Game over (bool): True if the game is over, False otherwise.
-        6. Sabres goal information (dict): Dictionary with information about the latest Sabres goal with keys:
+        6. Sabres goals (list): One dictionary per new Sabres goal, in the order they were scored, with keys:
             - 'x': x-coordinate of the goal.
             - 'y': y-coordinate of the goal.
             - 'SN': Sweater number of the goal scorer.
             - 'EN': Event order of the goal.
-        7. Sabres shots (list): List of arrays representing Sabres' shots on goal with columns 'x', 'y', and 'EN'.
+            - 'eventId': The goal's eventId in the feed.
+        7. Sabres shots (list): List of (x, y, EN) tuples for the Sabres' new shots on goal.
+        8. Opponent shots (list): List of (x, y, EN) tuples for the opponent's new shots on goal.
+        9. Period (int): The period of the last play.
+        10. Time remaining (str): The time remaining in the period of the last play.
+        11. Goal song (str or None): Path of the song to play for the last new Sabres goal, or None.
+        12. Goals overturned (list): eventIds of the Sabres goals overturned on review or challenge in the update.
+            Empty, and so false, if there were none.
 
     Note:
-    The function fetches live game data, compares the scores before and after a brief delay, and checks for goal events.
-    If Sabres or the opponent scores, it prints information about the goal and plays the corresponding goal song.
-    The function returns relevant information about the game status.
+    The function polls the game feed once and hands the update to processGameUpdate. It never sleeps or plays audio
+    itself, so it can be run in a worker thread while the event loop keeps the songs and the GUI going.
     """
+    # Polls once more first if the feed is brand new, so the goals already scored are taken as history
+    if gameFeed.response is None:
+        gameFeed.poll()
+    update = gameFeed.poll()
+    return processGameUpdate(SabresHomeOrAway, OpHomeOrAway, gameFeed, update, Rosters)
+
 
-    def playGoalSong(goalData_priv, URL):
+# Function that works out what happened for one team in a single poll of a game's feed. Several tracked teams can
+# share the same poll when they play each other.
+def processGameUpdate(SabresHomeOrAway, OpHomeOrAway, gameFeed, update, Rosters, teamId=SABRES_TEAM_ID,
+                      goalSongs=None, teamName='Buffalo Sabres', output=print):
+    """
+    Checks a single feed update for goals and shots, from the point of view of one team.
+
+    Parameters:
+    - SabresHomeOrAway (str): 'homeTeam' or 'awayTeam' for the tracked team.
+    - OpHomeOrAway (str): 'homeTeam' or 'awayTeam' for its opponent.
+    - gameFeed (GameFeed): The game's feed, already polled.
+    - update (FeedUpdate): The result of the last poll.
+    - Rosters (RosterIndex): The players dressed for the game. It is updated from the response if the roster
+      changed.
+    - teamId (int): The NHL team ID of the tracked team.
+    - goalSongs (dict): Player name to goal song mapping for the tracked team. Defaults to the Sabres goal songs.
+    - teamName (str): Name used when announcing a goal.
+    - output (callable): Where the goal announcement and play log are written. Defaults to print.
+
+    Returns:
+    The same tuple as duringGameUpdate.
+
+    Note:
+    Goals come from the feed's GoalTracker, which already worked out which goals were found, confirmed or
+    overturned by this poll, so every change of a goal's state gets exactly one reaction here: a new goal is
+    announced with its song (or the horn for the opponent), a confirmation is logged, and an overturned goal is
+    reported. Only the plays that are new since the previous poll are checked for shots.
+    """
+    if goalSongs is None:
+        goalSongs = sabresGoalSong
+
+    def announceGoal(goalPlay):
         """
-        Play the goal song associated with the latest goal-scoring event in a hockey game and print goal information.
+        Find the goal song for a newly found goal and print goal information.
 
         Parameters:
-        - goalData_priv (list): List of goal-scoring events data for the current game.
-        - URL (str): The URL to fetch the latest game events data.
+        - goalPlay (dict): The play-by-play event for the goal.
 
         Returns:
-        dict: Dictionary containing information about the latest goal event with keys:
+        Tuple (dict, str): Dictionary containing information about the goal with keys:
             - 'x': x-coordinate of the goal.
             - 'y': y-coordinate of the goal.
             - 'SN': Sweater number of the goal scorer.
             - 'EN': Event order of the goal.
+            - 'eventId': The goal's eventId in the feed.
+          and the path of the scorer's goal song.
 
         Note:
-        The function uses the provided goal data and URL to fetch the latest goal-scoring event information.
-        It extracts details about the scorer, assists, and plays the corresponding goal song. The goal information
-        is then printed to the screen.
+        The function extracts details about the scorer and assists from the goal event and picks the corresponding
+        goal song. The goal information is then printed to the screen.
         """
-        # Initialize variables and iterate to find the latest goal-scoring event
-        i = -1
-        eventType = goalData_priv[i]['typeDescKey']
-        while not eventType == 'goal':
-            eventType = goalData_priv[i]['typeDescKey']
-            i = i - 1
-            if i <= -5:
-                i = -1
-                goalData_priv = requests.get(URL).json()["plays"]
-
-        if i == -1:
-            i = -2
-
         # Extract information about the scorer and assists
-        scorerID = goalData_priv[i + 1]['details']['scoringPlayerId']
-        assist1ID = goalData_priv[i + 1]['details'].get('assist1PlayerId', -1)
-        assist2ID = goalData_priv[i + 1]['details'].get('assist2PlayerId', -1)
-
-        # Iterate through player rosters to find names and numbers
-        for player in Rosters:
-            if player['playerId'] == scorerID:
-                scorerName = player['firstName']['default'] + ' ' + player['lastName']['default']
-                scorerNumber = player['sweaterNumber']
-            if not assist1ID == -1:
-                if player['playerId'] == assist1ID:
-                    assist1Name = player['firstName']['default'] + ' ' + player['lastName']['default']
-                    assist1Number = player['sweaterNumber']
-            if not assist2ID == -1:
-                if player['playerId'] == assist2ID:
-                    assist2Name = player['firstName']['default'] + ' ' + player['lastName']['default']
-                    assist2Number = player['sweaterNumber']
+        scorerID = goalPlay['details']['scoringPlayerId']
+        assist1ID = goalPlay['details'].get('assist1PlayerId', -1)
+        assist2ID = goalPlay['details'].get('assist2PlayerId', -1)
+
+        # Look the scorer and assists up by playerId
+        scorerName = Rosters.name(scorerID)
+        scorerNumber = Rosters.number(scorerID)
+        assist1Name = Rosters.name(assist1ID)
+        assist1Number = Rosters.number(assist1ID)
+        assist2Name = Rosters.name(assist2ID)
+        assist2Number = Rosters.number(assist2ID)
 
         # Determine the goal song based on the scorer's name
-        goalSong = sabresGoalSong.get(scorerName, sabresGoalSong["default"])
+        goalSong = goalSongs.get(scorerName, goalSongs["default"])
 
         # Print goal information to the screen
-        printStatement = f'Buffalo Sabres Score! Scored by number {scorerNumber}, {scorerName}.'
+        printStatement = f'{teamName} Score! Scored by number {scorerNumber}, {scorerName}.'
 
         if not assist2ID == -1:
             printStatement += f' Assists to number {assist1Number}, {assist1Name}, and number {assist2Number}, {assist2Name}.'
         elif not assist1ID == -1:
             printStatement += f' Assists to number {assist1Number}, {assist1Name}.'
 
-        print(printStatement)
-
-        # Play the goal song for twenty seconds and then stop it
-        playsound.playsound(goalSong)
-        time.sleep(20)
+        output(printStatement)
 
         # Return information about the goal
-        return {'x': goalData_priv[i + 1]['details']['xCoord'],
-                'y': goalData_priv[i + 1]['details']['yCoord'],
+        return {'x': goalPlay['details']['xCoord'],
+                'y': goalPlay['details']['yCoord'],
                 'SN': scorerNumber,
-                'EN': goalData_priv[i + 1]['sortOrder']}
+                'EN': goalPlay['sortOrder'],
+                'eventId': goalPlay['eventId']}, goalSong
+
+    # Picks up call-ups and goalie changes. An unchanged response is skipped right away.
+    Rosters.update(update.response.get('rosterSpots'))
 
-    sabresGoalInfo = {'x': -1, 'y': -1, 'SN': -1, 'EN': -1}
+    sabresGoals = []
+    goalSong = None
+    goalsOverturned = []
     sabresShot = []
     opShot = []
 
-    # Gets the current score of the game and number of plays
-    LIVEGAME_response = requests.get(LiveGame_url).json()
-    sabres_score = LIVEGAME_response[SabresHomeOrAway]['score']
-    opScore = LIVEGAME_response[OpHomeOrAway]['score']
-    numPlays = len(LIVEGAME_response['plays'])
-
-    # Sleeps for 10 seconds to avoid overloading the NHL API
-    time.sleep(sleepTime)
-
-    # Gets the new score after a brief delay
-    LIVEGAME_response = requests.get(LiveGame_url).json()
-    newSabresScore = LIVEGAME_response[SabresHomeOrAway]['score']
-    newOpScore = LIVEGAME_response[OpHomeOrAway]['score']
-    newNumPlays = len(LIVEGAME_response['plays'])
-
-    # Checks if the Sabres had scored, opponent scored, or if the game has ended
-    sabreScoreBool = sabres_score < newSabresScore
-    opScoreBool = opScore < newOpScore
-    playsBool = numPlays < newNumPlays
-    gameOver = LIVEGAME_response['gameState'] == "FINAL"
-
-    if opScoreBool:
-        playsound.playsound('./audioFiles/losing_horn.mp3')
-
-    if sabreScoreBool:
-        LIVEGAME_response = requests.get(LiveGame_url).json()
-        goalData = LIVEGAME_response["plays"]
-        sabresGoalInfo = playGoalSong(goalData, LiveGame_url)
-
-    if playsBool:
-        print(newNumPlays, sabres_score, newSabresScore)
-        i = numPlays
-        while i < newNumPlays:
-            i += 1
-            event = LIVEGAME_response['plays'][i - 1]
-            print(event['typeDescKey'])
+    newSabresScore = gameFeed.score(SabresHomeOrAway)
+    newOpScore = gameFeed.score(OpHomeOrAway)
+    gameOver = update.response['gameState'] in ('FINAL', 'OFF')
+
+    # One reaction per goal state change
+    sabreScoreBool = False
+    opScoreBool = False
+    for transition in update.goalTransitions:
+        ownGoal = transition.teamId == teamId
+        if transition.state == PENDING:
+            if ownGoal:
+                goalInfo, goalSong = announceGoal(transition.play)
+                sabresGoals.append(goalInfo)
+                sabreScoreBool = True
+            else:
+                opScoreBool = True
+        elif transition.state == CONFIRMED:
+            output(f"{teamName if ownGoal else 'Opponent'} goal confirmed.")
+        elif transition.state == OVERTURNED:
+            output(f"{teamName if ownGoal else 'Opponent'} goal overturned.")
+            if ownGoal:
+                goalsOverturned.append(transition.eventId)
+
+    if update.newPlays:
+        output(f'{len(gameFeed)} {newSabresScore} {newOpScore}')
+        for event in update.newPlays:
+            output(event['typeDescKey'])
             if event['typeDescKey'] == 'shot-on-goal':
-                if event['details']['eventOwnerTeamId'] == SABRES_TEAM_ID:
-                    sabresShot.append(
-                        np.array([event['details']['xCoord'], event['details']['yCoord'], event['sortOrder']]))
+                if event['details']['eventOwnerTeamId'] == teamId:
+                    sabresShot.append((event['details']['xCoord'], event['details']['yCoord'], event['sortOrder']))
                 else:
-                    opShot.append(
-                        np.array([event['details']['xCoord'], event['details']['yCoord'], event['sortOrder']]))
+                    opShot.append((event['details']['xCoord'], event['details']['yCoord'], event['sortOrder']))
+
+    lastPlay = gameFeed.lastPlay()
+    if lastPlay is None:
+        period = 'Pre-Game'
+        timeRemaining = "20:00"
+    else:
+        period = lastPlay['period']
+        timeRemaining = lastPlay['timeRemaining']
 
-    period = LIVEGAME_response['plays'][-1]['period']
-    timeRemaining = LIVEGAME_response['plays'][-1]['timeRemaining']
+    return (sabreScoreBool, opScoreBool, newSabresScore, newOpScore, gameOver, sabresGoals, sabresShot, opShot,
+            period, timeRemaining, goalSong, goalsOverturned)
 
-    return sabreScoreBool, opScoreBool, newSabresScore, newOpScore, gameOver, sabresGoalInfo, sabresShot, opShot, period, timeRemaining
+
+def loadGoalSongs(teamId):
+    """
+    Load the player name to goal song mapping for a team.
+
+    Parameters:
+    - teamId (int): The NHL team ID.
+
+    Returns:
+    dict: Player name to song path, always including a 'default' entry.
+    """
+    with open(TEAM_GOAL_SONGS, 'r') as mappingFile:
+        mappingPaths = json.load(mappingFile)
+    if str(teamId) not in mappingPaths:
+        return {'default': './audioFiles/default.mp3'}
+    with open(mappingPaths[str(teamId)], 'r') as songFile:
+        return json.load(songFile)
+
+
+def goalSongsFor(goalSongs, rosters, teamId):
+    """
+    Lists the goal songs of a team's players who are dressed for a game, so they can be decoded before puck drop.
+
+    Parameters:
+    - goalSongs (dict): Player name to goal song mapping for the team.
+    - rosters (RosterIndex): The players dressed for the game.
+    - teamId (int): The NHL team ID.
+
+    Returns:
+    list: Song paths, including the team's default song.
+    """
+    songs = [goalSongs[fullName(player)] for player in rosters.byId.values()
+             if player.get('teamId') == teamId and fullName(player) in goalSongs]
+    songs.append(goalSongs['default'])
+    return songs
+
+
+def teamDisplayName(teamData):
+    """
+    Returns a readable team name from a play-by-play or schedule team entry.
+    """
+    if 'name' in teamData:
+        return teamData['name']['default']
+    if 'placeName' in teamData and 'commonName' in teamData:
+        return teamData['placeName']['default'] + ' ' + teamData['commonName']['default']
+    return teamData.get('abbrev', str(teamData.get('id')))
+
+
+# Output for one tracked team when several are followed from the same process. Text goes to the console prefixed with
+# the team's abbreviation so interleaved games can be told apart, and audio goes to the shared audio task.
+class ConsoleSink:
+    """
+    Console and audio output for one tracked team.
+
+    Parameters:
+    - label (str): Prefix for every line, usually the team abbreviation.
+    - audio (AudioTask): Where goal songs and horns are queued.
+    """
+
+    def __init__(self, label, audio):
+        self.label = label
+        self.audio = audio
+
+    def __call__(self, text):
+        print(f'[{self.label}] {text}')
+
+    def play(self, path, goalId=None):
+        self.audio.play(path, goalId)
+
+    def cancel(self, goalId):
+        self.audio.cancel(goalId)
+
+
+async def followGame(game, trackedTeams, gameTimeLocal):
+    """
+    Follow one game until it is over, for every tracked team playing in it.
+
+    Parameters:
+    - game (dict): The game entry from the schedule.
+    - trackedTeams (list): One dict per tracked team in this game with keys 'teamId', 'homeOrAway',
+      'opHomeOrAway', 'goalSongs' and 'sink'.
+    - gameTimeLocal (datetime): The local start time of the game.
+
+    Note:
+    The game's feed is polled once per interval no matter how many of its teams are tracked, and every tracked team
+    gets its own goal songs and output sink.
+    Like main(), it checkpoints the game after every poll that changed something and resumes from the checkpoint
+    after a restart.
+    """
+    feed = GameFeed(BASE_API_URL + f'v1/gamecenter/{game["id"]}/play-by-play', fetchClient, REVISION_WINDOW)
+    response = (await asyncio.to_thread(feed.poll)).response
+    checkpoint = GameCheckpoint(game['id'], CHECKPOINT_PATH)
+    resumed = await asyncio.to_thread(checkpoint.load)
+    if resumed:
+        feed.resume(checkpoint.lastSortOrder, checkpoint.scores, checkpoint.goals)
+    await publishPoll(game['id'], feed.lastUpdate)
+    rosters = RosterIndex(response['rosterSpots'])
+
+    for team in trackedTeams:
+        # Decode the songs that could be needed tonight, so a goal never waits on an MP3 decode
+        await team['sink'].audio.preload(goalSongsFor(team['goalSongs'], rosters, team['teamId']) + list(HORNS))
+        team['name'] = teamDisplayName(response[team['homeOrAway']])
+        team['opName'] = teamDisplayName(response[team['opHomeOrAway']])
+        team['sink'](f"The game today is between the {team['name']} and the {team['opName']}. It starts at "
+                     f"{gameTimeLocal.strftime('%H:%M:%S')} local time")
+
+    # If the start time of the game has not passed, wait until 15 seconds before it starts.
+    await sleepUntil(gameTimeLocal - datetime.timedelta(seconds=15), clock)
+
+    # After a restart the first pass handles whatever happened while the lamp was down
+    isOver = response['gameState'] in ('FINAL', 'OFF') and not resumed
+    update = feed.lastUpdate if resumed else None
+    while not isOver:
+        if update is None:
+            interval = pollScheduler.nextInterval(feed.response)
+            metrics.setGauge('lamp_poll_interval_seconds', interval, gameId=game['id'])
+            await clock.sleep(interval)
+            update = await asyncio.to_thread(feed.poll)
+            await publishPoll(game['id'], update)
+
+        results = [processGameUpdate(team['homeOrAway'], team['opHomeOrAway'], feed, update, rosters, team['teamId'],
+                                     team['goalSongs'], team['name'], team['sink']) for team in trackedTeams]
+        # The checkpoint is on disk before any song starts, so a restart never celebrates a goal twice. A poll that
+        # changed nothing leaves it as it is, which spares the SD card a write every few seconds.
+        if update.hasChanges() or update.goalTransitions:
+            checkpoint.record(feed)
+            await asyncio.to_thread(checkpoint.save)
+        update = None
+
+        for team, result in zip(trackedTeams, results):
+            sink = team['sink']
+            [_, didOppScore, score, opScore, isOver, goals, _, _, _, _, goalSong, goalsOverturned] = result
+
+            for goalId in goalsOverturned:
+                sink.cancel(goalId)
+                sink(f"A {team['name']} goal was overturned. The score of the game is now {team['name']}: {score} "
+                     f"{team['opName']}: {opScore}")
+            if goalSong is not None:
+                sink.play(goalSong, goals[-1]['eventId'])
+            if didOppScore:
+                sink.play('./audioFiles/losing_horn.mp3')
+                sink(f"{team['opName']} scored. The score of the game is now {team['name']}: {score} "
+                     f"{team['opName']}: {opScore}")
+            if isOver:
+                sink(f"The game is over. The final score was {team['name']}: {score} {team['opName']}: {opScore}")
+    await asyncio.to_thread(checkpoint.remove)
+
+
+# A network blip on a game's first poll, before anything is cached, raises out of followGame. Without a retry that
+# game would be dropped for the rest of the night.
+async def followGameRetrying(game, trackedTeams, gameTimeLocal):
+    """
+    Follow one game like followGame(), starting it again after a backoff if it fails.
+
+    Parameters:
+    - game (dict): The game entry from the schedule.
+    - trackedTeams (list): As for followGame().
+    - gameTimeLocal (datetime): The local start time of the game.
+
+    Note:
+    The game picks up from its checkpoint each time, so nothing already reacted to is reacted to again. The last
+    error is raised once the game started more than GAME_RETRY_WINDOW ago.
+    """
+    failures = 0
+    while True:
+        try:
+            return await followGame(game, trackedTeams, gameTimeLocal)
+        except Exception as error:
+            if clock.now() - gameTimeLocal > GAME_RETRY_WINDOW:
+                raise
+            delay = min(GAME_RETRY_MAX_DELAY, GAME_RETRY_DELAY * 2 ** failures)
+            failures += 1
+            print(f'Following game {game["id"]} failed ({error!r}), trying again in {delay} seconds.')
+            await clock.sleep(delay)
+
+
+async def trackTeams(teamIds):
+    """
+    Follow every game involving any of the given teams, from a single process.
+
+    Parameters:
+    - teamIds (list): The NHL team IDs to track.
+
+    Note:
+    The cached schedule finds every game for every tracked team, and all the games on a day are followed
+    concurrently over the shared fetch client. This replaces running one copy of the script per team.
+    """
+    useWorkerThreads()
+    audio = newAudioTask()
+    audio.start()
+    if eventBusServer is not None:
+        await eventBusServer.start()
+    goalSongs = {teamId: loadGoalSongs(teamId) for teamId in teamIds}
+    finishedGames = set()
+
+    while True:
+        found = await asyncio.to_thread(findGames, set(teamIds), finishedGames)
+
+        if not found:
+            # Nothing coming up, look again tomorrow
+            print("None of the tracked teams have a game coming up. I'm waiting till tomorrow.")
+            await sleepUntil(nextMorning(), clock)
+            continue
+
+        # Sleep until shortly before the first puck drop without touching the network
+        await sleepUntil(found[0][4] - WAKE_LEAD, clock)
+
+        # Group the tracked teams by game so a game between two tracked teams is only polled once
+        games = {}
+        for game, teamId, homeOrAway, opHomeOrAway, gameTimeLocal in found:
+            label = game[homeOrAway].get('abbrev', str(teamId))
+            games.setdefault(game['id'], (game, gameTimeLocal, []))[2].append({
+                'teamId': teamId,
+                'homeOrAway': homeOrAway,
+                'opHomeOrAway': opHomeOrAway,
+                'goalSongs': goalSongs[teamId],
+                'sink': ConsoleSink(label, audio),
+            })
+
+        results = await asyncio.gather(*(followGameRetrying(game, teams, gameTimeLocal)
+                                         for game, gameTimeLocal, teams in games.values()), return_exceptions=True)
+        for gameId, result in zip(games, results):
+            if isinstance(result, Exception):
+                print(f'Stopped following game {gameId}: {result!r}')
+            else:
+                finishedGames.add(gameId)
+
+
+# Follows a night of the league for the scoreboard. On each poll only the games whose score, period or state changed
+# get their play-by-play fetched, all at once over the shared connection pool.
+async def followScoreboard(date, board=None):
+    """
+    Follow every game on a date from the league-wide scoreboard until they are all over.
+
+    Parameters:
+    - date (str): The NHL's date for the games, 'YYYY-MM-DD'.
+    - board (Scoreboard): The scoreboard to poll. A new one is made if None.
+
+    Returns:
+    set: The IDs of the games that were followed.
+
+    Note:
+    Each poll is one request for every game in the league. A changed game is printed, and its play-by-play is fetched
+    and handed to the event bus, the archive and the stats file exactly like a poll of a single game, so displays
+    subscribed to the bus still get every goal, shot and period. Games that haven't started yet are only printed.
+    """
+    board = board if board is not None else Scoreboard(BASE_API_URL, fetchClient)
+    feeds = {}
+
+    async def refresh(game):
+        print(scoreLine(game))
+        if game.get('gameState') in ('FUT', 'PRE'):
+            return
+        feed = feeds.get(game['id'])
+        if feed is None:
+            feed = feeds[game['id']] = GameFeed(BASE_API_URL + f'v1/gamecenter/{game["id"]}/play-by-play',
+                                                fetchClient, REVISION_WINDOW)
+        update = await asyncio.to_thread(feed.poll)
+        await publishPoll(game['id'], update)
+        for transition in update.goalTransitions:
+            if transition.state == OVERTURNED:
+                print(f'A goal was taken back: {scoreLine(game)}')
+
+    while True:
+        changed = await asyncio.to_thread(board.poll, date)
+        results = await asyncio.gather(*(refresh(game) for game in changed), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f'Could not update a game: {result!r}')
+        if board.isOver() or not board.games:
+            return set(board.games)
+        await clock.sleep(board.nextInterval(pollScheduler))
+
+
+async def followLeague():
+    """
+    Scoreboard mode: follow every game in the NHL, day after day, for displays that show the whole league.
+
+    Note:
+    The schedule finds the next day with games and the lamp sleeps until shortly before the first puck drop. From
+    then on the league is polled through followScoreboard(), which costs one request per poll however many games are
+    on, plus one play-by-play request for each game that changed. No songs are played; the event bus is how lights
+    and screens hear about goals.
+    """
+    useWorkerThreads()
+    if eventBusServer is not None:
+        await eventBusServer.start()
+    finishedGames = set()
+
+    while True:
+        date, games = await asyncio.to_thread(scheduleCache.nextGameDay, finishedGames)
+        if not games:
+            print("There are no NHL games coming up. I'm waiting till tomorrow.")
+            await sleepUntil(nextMorning(), clock)
+            continue
+
+        firstPuckDrop = localStartTime(games[0]['startTimeUTC'])
+        if clock.now() < firstPuckDrop - WAKE_LEAD:
+            print(f'{len(games)} games on {date}, the first starts at {firstPuckDrop.strftime("%H:%M")} local time.')
+            await sleepUntil(firstPuckDrop - WAKE_LEAD, clock)
+
+        followed = await followScoreboard(date)
+        # Games the scoreboard didn't list (postponed, or a stale schedule) aren't looked for again today
+        finishedGames.update(followed | {game['id'] for game in games})
 
 
 def printScoreUpdate(opTeamAbbreviation, opTeamName, opTeamScore, sabresScoreTotal, bufScore, isFinal):
@@ -319,32 +818,145 @@ def printScoreUpdate(opTeamAbbreviation, opTeamName, opTeamScore, sabresScoreTot
             f"{opTeamName} scored. The score of the game is now BUF: {sabresScoreTotal} {opTeamAbbreviation}: {opTeamScore}")
 
 
-def argumentHandling(arg, args):
+def parseBool(text):
     """
-    Handle command-line arguments by finding the value associated with a specific argument.
+    Reads True/False style command-line values, as used by -g and -w.
+    """
+    if text.lower() in ('true', '1', 'yes', 'on'):
+        return True
+    if text.lower() in ('false', '0', 'no', 'off'):
+        return False
+    raise argparse.ArgumentTypeError(f'expected True or False, not {text!r}')
+
+
+def parseArguments(args):
+    """
+    Build the lamp's settings from the command line.
 
     Parameters:
-    - arg (str): The argument to search for.
-    - args (list): List of command-line arguments.
+    - args (list): Command-line arguments, without the script name.
 
     Returns:
-    str or None: The value associated with the given argument, or None if the argument is not found or has no value.
+    dict: The settings from lampConfig.loadConfig(), with any flags given on the command line applied last.
     """
+    parser = argparse.ArgumentParser(description='Plays goal songs for NHL games, with an optional GUI.')
+    parser.add_argument('-c', '--config', help='A .toml or .json settings file.')
+    parser.add_argument('-p', '--profile', choices=sorted(lampConfig.PROFILES), help='Start from a preset.')
+    parser.add_argument('-m', '--mode', choices=lampConfig.MODES, help='headless, gui, web or scoreboard.')
+    parser.add_argument('-g', '--gui', type=parseBool, help='True opens the GUI. Same as --mode gui.')
+    parser.add_argument('-w', '--web', type=parseBool, help='With -g True, serve the GUI to browsers instead.')
+    parser.add_argument('-t', '--teams', help='Comma separated NHL team IDs to follow, e.g. 7,6.')
+    parser.add_argument('-b', '--bus-port', type=int, help='Publish game events and metrics on this TCP port.')
+    parser.add_argument('-s', '--bus-socket', help='Publish game events on this Unix socket.')
+    parser.add_argument('--base-url', help='The NHL API, or a stand-in for it.')
+    parser.add_argument('--poll-interval', type=float, help='Seconds between polls during normal play.')
+    parser.add_argument('--print-config', action='store_true', help='Print the settings and exit.')
+    options = parser.parse_args(args)
+
+    overrides = {}
+    if options.mode is not None:
+        overrides['mode'] = options.mode
+    elif options.gui is not None:
+        overrides['mode'] = ('web' if options.web else 'gui') if options.gui else 'headless'
+    if options.teams is not None:
+        try:
+            overrides['teams'] = [int(teamId) for teamId in options.teams.split(',')]
+        except ValueError:
+            parser.error(f'-t expects team IDs separated by commas, not {options.teams!r}')
+    if options.bus_port is not None:
+        overrides.setdefault('bus', {})['port'] = options.bus_port
+    if options.bus_socket is not None:
+        overrides.setdefault('bus', {})['socket'] = options.bus_socket
+    if options.base_url is not None:
+        overrides.setdefault('api', {})['baseUrl'] = options.base_url
+    if options.poll_interval is not None:
+        overrides.setdefault('polling', {})['baseInterval'] = options.poll_interval
+
     try:
-        index = args.index(arg)
-        if index + 1 < len(args):
-            return args[index + 1]
-    except ValueError:
-        pass
-    return None
+        config = lampConfig.loadConfig(options.config, options.profile, overrides)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if options.print_config:
+        print(json.dumps(config, indent=2))
+        sys.exit(0)
+    return config
 
 
-def main(page: ft.Page):
+def configure(config, client=None, lampClock=None):
     """
-    Main function to run a continuous loop monitoring Buffalo Sabres hockey game updates.
+    Apply settings from lampConfig.loadConfig() to the lamp. Anything not configured keeps the defaults above.
 
     Parameters:
-    - page (ft.Page): An object representing the flet page to display live updates.
+    - config (dict): The lamp's settings.
+    - client (FetchClient): Used for every request instead of a new FetchClient, e.g. the simulator's feed.
+    - lampClock (WallClock): Used instead of the real clock, e.g. the simulator's faster one.
+    """
+    global clock, BASE_API_URL, fetchClient, scheduleCache, WAKE_LEAD, POLL_INTERVAL, pollScheduler, REVISION_WINDOW
+    global STATS_PATH, STATS_INTERVAL, CHECKPOINT_PATH, ARCHIVE_ENABLED, ARCHIVE_PATH, WORKER_THREADS
+    global GUI_REFRESH_INTERVAL, RENDER_OPTIONS, AUDIO_DEVICE, CLIP_LENGTH, AUDIO_BUFFER_MILLISECONDS, AUDIO_CACHE_MB
+    global sabresGoalSong, TEAM_GOAL_SONGS, EVENT_BUS_HOST, eventBus, eventBusServer, gui, webUI
+
+    gui = config['mode'] in ('gui', 'web')
+    webUI = config['mode'] == 'web'
+
+    api = config['api']
+    BASE_API_URL = api['baseUrl'] if api['baseUrl'].endswith('/') else api['baseUrl'] + '/'
+    timeouts = {
+        'play-by-play': (api['connectTimeout'], api['feedTimeout']),
+        'schedule': (api['connectTimeout'], api['scheduleTimeout']),
+        'default': (api['connectTimeout'], api['timeout']),
+    }
+    fetchClient = client if client is not None else FetchClient(timeouts, api['retries'], api['backoff'],
+                                                                config['concurrency']['connections'])
+    clock = lampClock if lampClock is not None else WALL_CLOCK
+    WORKER_THREADS = config['concurrency']['workerThreads']
+
+    cache = config['cache']
+    scheduleCache = ScheduleCache(BASE_API_URL, cache['schedule'], fetchClient,
+                                  datetime.timedelta(days=cache['scheduleMaxAgeDays']), clock)
+    STATS_PATH = cache['stats']
+    STATS_INTERVAL = cache['statsInterval']
+    CHECKPOINT_PATH = cache['checkpoints']
+    AUDIO_CACHE_MB = cache['audioMB']
+    ARCHIVE_ENABLED = config['archive']['enabled']
+    ARCHIVE_PATH = config['archive']['folder']
+
+    polling = config['polling']
+    POLL_INTERVAL = polling['baseInterval']
+    pollScheduler = PollScheduler(polling['baseInterval'], polling['fastInterval'], polling['slowInterval'],
+                                  polling['finalInterval'], clock)
+    WAKE_LEAD = datetime.timedelta(minutes=polling['wakeLeadMinutes'])
+    REVISION_WINDOW = polling['revisionWindow']
+
+    render = config['render']
+    RENDER_OPTIONS = {'figsize': (render['width'], render['height']), 'dpi': render['dpi'],
+                      'imageFormat': render['format'], 'pngCompression': render['pngCompression'],
+                      'jpegQuality': render['jpegQuality']}
+    GUI_REFRESH_INTERVAL = render['refreshInterval']
+
+    audio = config['audio']
+    AUDIO_DEVICE = audio['device']
+    CLIP_LENGTH = audio['clipLength']
+    AUDIO_BUFFER_MILLISECONDS = audio['bufferMilliseconds']
+    TEAM_GOAL_SONGS = audio['teamGoalSongs']
+    with open(audio['goalSongs'], 'r') as goalSongFile:
+        sabresGoalSong = json.load(goalSongFile)
+
+    bus = config['bus']
+    EVENT_BUS_HOST = bus['host']
+    if bus['port'] or bus['socket']:
+        eventBus = EventBus(bus['historySize'], bus['queueSize'])
+        eventBusServer = EventBusServer(eventBus, EVENT_BUS_HOST if bus['port'] else None, bus['port'],
+                                        bus['socket'] or None)
+
+
+async def main(display=None, maxGames=None):
+    """
+    Main coroutine to run a continuous loop monitoring Buffalo Sabres hockey game updates.
+
+    Parameters:
+    - display (GameView or DashboardHub): Where live updates are shown, or None without the GUI.
+    - maxGames (int): Return after following this many games. None keeps going forever.
 
     Returns:
     None
@@ -353,303 +965,252 @@ def main(page: ft.Page):
     This function continuously checks for Buffalo Sabres hockey game updates using the NHL API.
     It fetches live game data, plots shots and goals on a rink image, and displays live score updates.
     The loop runs until the game is over, and then it waits until the next day to resume checking for games.
+    Polling, audio playback and GUI refreshes run as separate asyncio tasks, and the rink is drawn on its own thread
+    that only ever draws the latest state, so a goal song or a slow redraw never delays the next poll.
+    flet and the plotting stack are only imported when the GUI is used, so the headless lamp starts quickly and stays
+    small. In the web dashboard this runs once for every browser connected to it.
+    The state of the game is checkpointed after every poll that changed something. If the lamp is restarted during a
+    game it resumes from the checkpoint, only looking at the plays since, instead of rebuilding the game from the
+    first play.
     """
+    if gui:
+        from rinkRenderer import RenderWorker, RinkRenderer
 
-    def guiUpdate(plotStatus):
-        def plotter():
-            """
-            Plotting function to visualize shots and goals on a rink image.
-
-            Parameters:
-            - plot_status (int): Status flag for plotting operations:
-                - 0: Initialize the plot.
-                - 1: Update shots on the existing plot.
-                - 2: Update goals on the existing plot.
-
-            Returns:
-            None
-            """
-            if plotStatus == 0:
-                print('init')
-                page.title = "Sabres Goal Lamp - GUI"
-            elif plotStatus == 1:
-                plt.cla()
-                print("tried to update shots")
-            else:
-                plt.cla()
-                print("tried to update goals")
-
-            fig, axs = plt.subplots(1, 1)
-
-            rink = NHLRink(
-                sabresLogo={
-                    'feature_class': RinkImage,
-                    'image_path': 'https://upload.wikimedia.org/wikipedia/en/thumb/9/9e/Buffalo_Sabres_Logo.svg/240px'
-                                  '-Buffalo_Sabres_Logo.svg.png',
-                    "x": 0, "length": 27, "width": 27,
-                    "zorder": 15, "alpha": 0.5,
-                }
-            )
-
-            rink.scatter('x', 'y', data=sabresShots, ax=axs, marker='X', c='#003087')
-            rink.scatter("x", "y", ax=axs, facecolor="#003087", edgecolor="black", s=300, data=sabresGoals)
-            if len(sabresGoals["x"]) > 0:
-                rink.text("x", "y", s="SN", ax=axs, ha="center", va="center", fontsize=14, data=sabresGoals,
-                          c='#FFFFFF')
-            plt.savefig('./rink.jpg', bbox_inches='tight')
-
-        def getGoalData():
+    def refreshView():
+        """
+        Push the latest state of the game to the GUI. The rink is handed to the render thread and the last frame it
+        finished is shown, and the view only sends the fields that changed, so a refresh never waits on matplotlib.
+        """
+        with metrics.span('lamp_gui_update_seconds'):
+            renderWorker.submit(sabresShots, sabresGoals)
             scorers = []
             for number in sabresGoals['SN']:
-                for player in rosters:
-                    if number == player['sweaterNumber']:
-                        statement = ft.Text(f'Number {number}, ' + player['firstName']['default'] + ' ' + \
-                                            player['lastName']['default'])
-                        scorers.append(statement)
-            return scorers
-
-        def valueUpdate():
-            rinkImage.src = './rink.jpg'
-            periodNumData.value = f'Period: {periodNum}'
-            timeRemainingData.value = f'Time: {timeRemainingPeriod}'
-            sabresScoreData.value = f'Sabres: {sabresScore}'
-            opScoreData.value = f'{oppName}: {OpScore}'
-            sabresShotData.value = f'Sabres: {len(sabresShots.index)}'
-            opShotData.value = f'{oppName}: {len(opShots.index)}'
-
-        plotter()
-        getGoalData()
-
-        if plotStatus == 0:
-            rinkImage = ft.Image()
-            periodNumData = ft.Text(size=15, weight=ft.FontWeight.BOLD)
-            timeRemainingData = ft.Text(size=15, weight=ft.FontWeight.BOLD)
-            sabresScoreData = ft.Text(size=15, weight=ft.FontWeight.BOLD)
-            opScoreData = ft.Text(size=15, weight=ft.FontWeight.BOLD)
-            sabresShotData = ft.Text(size=15, weight=ft.FontWeight.BOLD)
-            opShotData = ft.Text(size=15, weight=ft.FontWeight.BOLD)
-            valueUpdate()
-            periodData = ft.Row(
-                controls=[
-                    ft.Column(
-                        controls=[
-                            periodNumData
-                        ],
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        width=257
-                    ),
-                    ft.Column(
-                        controls=[
-                            timeRemainingData
-                        ],
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        width=257
-                    )
-                ],
-                alignment=ft.MainAxisAlignment.START
-            )
-
-            print(timeRemainingPeriod)
-
-            gameScore = ft.Row(
-                controls=[
-                    ft.Column(
-                        controls=[
-                            sabresScoreData
-                        ],
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        width=257
-                    ),
-                    ft.Column(
-                        controls=[
-                            opScoreData
-                        ],
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        width=257
-                    )
-                ],
-                alignment=ft.MainAxisAlignment.START
-            )
-
-            gameShots = ft.Row(
-                controls=[
-                    ft.Column(
-                        controls=[
-                            sabresShotData
-                        ],
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        width=257
-                    ),
-                    ft.Column(
-                        controls=[
-                            opShotData
-                        ],
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        width=257
-                    )
-                ],
-                alignment=ft.MainAxisAlignment.START
-            )
-
-            print(sabresShots.index)
-
-            rinkData = ft.Column(
-                controls=[
-                    ft.Text('Rink Image', size=30, weight=ft.FontWeight.BOLD),
-                    rinkImage,
-                    periodData,
-                    gameScore,
-                    gameShots
-                ],
-                height=page.height,
-                horizontal_alignment=ft.CrossAxisAlignment.CENTER
-            )
-
-            goalScorerData = ft.Column(
-                controls=getGoalData()
-            )
-
-            goalData = ft.Column(
-                controls=[
-                    ft.Text('Goal Data', size=30, weight=ft.FontWeight.BOLD),
-                    goalScorerData
-                ],
-                height=page.height,
-                horizontal_alignment=ft.CrossAxisAlignment.CENTER
-            )
-
-            mainPage = ft.Row(
-                controls=[
-                    rinkData,
-                    goalData
-                ],
-                width=page.width,
-                alignment=ft.MainAxisAlignment.SPACE_EVENLY
-            )
-
-            page.add(mainPage)
-        else:
-            valueUpdate()
-            page.update()
+                player = rosters.playerByNumber(SABRES_TEAM_ID, number)
+                if player is not None:
+                    scorers.append(f'Number {number}, ' + fullName(player))
+            # Image bytes straight from the renderer, so nothing is written to disk and read back by flet. A newer
+            # frame calls this again when it is ready.
+            display.show(rink=renderWorker.frame, scorers=scorers, period=periodNum, timeRemaining=timeRemainingPeriod,
+                         teamScore=sabresScore, opScore=OpScore, teamShots=len(sabresShots), opShots=len(opShots),
+                         shootingPercentage=analytics.shootingPercentage())
 
     # Main code loop
-    baseAPIURL = 'https://api-web.nhle.com/'
+    baseAPIURL = BASE_API_URL
+
+    useWorkerThreads()
+    audio = newAudioTask()
+    audio.start()
+    if eventBusServer is not None:
+        await eventBusServer.start()
+    finishedGames = set()
+    # Drawing the rink is the slow part of plotting, so it is done once here and reused for every game
+    renderWorker = None
+    if gui:
+        loop = asyncio.get_running_loop()
+        # Set to each game's RefreshTask, so a finished frame is put on the page
+        frameReady = None
+
+        def frameDone():
+            # Called on the render thread
+            if frameReady is not None:
+                loop.call_soon_threadsafe(frameReady)
+
+        renderWorker = RenderWorker(RinkRenderer(**RENDER_OPTIONS), frameDone)
 
     while True:
-        FullDateToday = datetime.datetime.now()
-        today_date = FullDateToday.strftime("%Y-%m-%d")
-        next_date = FullDateToday + datetime.timedelta(days=1)
-        next_date = next_date.replace(hour=4, minute=0, second=0, microsecond=0)
-
-        [GID, SHOA, OHOA, GT] = checkForGame(baseAPIURL + f'v1/schedule/{today_date}')
+        [GID, SHOA, OHOA, GT] = await asyncio.to_thread(checkForGame, finishedGames)
 
-        # If there is a Sabres game today do the code
+        # If there is a Sabres game coming up do the code
         if not GID == '-1':
+            # Sleep until shortly before puck drop. The schedule is cached, so nothing touches the network meanwhile.
+            if clock.now() < GT - WAKE_LEAD:
+                print(f'The next Sabres game starts at {GT.strftime("%Y-%m-%d %H:%M")} local time.')
+                await sleepUntil(GT - WAKE_LEAD, clock)
+
             # Get the data for the game opponent abbreviation and name
-            url = f"https://api-web.nhle.com/v1/gamecenter/{GID}/play-by-play"
-            response = requests.get(url).json()
+            url = baseAPIURL + f"v1/gamecenter/{GID}/play-by-play"
+            feed = GameFeed(url, fetchClient, REVISION_WINDOW)
+            response = (await asyncio.to_thread(feed.poll)).response
             oppAbbreviation = response[OHOA]["abbrev"]
             oppName = response[OHOA]["name"]['default']
 
-            rosters = response['rosterSpots']
-
-            sabresGoals = pd.DataFrame(columns=['x', 'y', 'SN', 'EN'])
-            sabresShots = pd.DataFrame(columns=['x', 'y', 'EN'])
-            opShots = pd.DataFrame(columns=['x', 'y', 'EN'])
-
-            if 'periodNum' not in locals():
-                periodNum = 'Pre-Game'
-                timeRemainingPeriod = "20:00"
-                sabresScore = 0
-                OpScore = 0
-
+            # A checkpoint is only there if the lamp was stopped part way through this game
+            checkpoint = GameCheckpoint(GID, CHECKPOINT_PATH)
+            resumed = await asyncio.to_thread(checkpoint.load)
+            if resumed:
+                # Everything up to the checkpoint was already handled, so only what happened since is looked at
+                feed.resume(checkpoint.lastSortOrder, checkpoint.scores, checkpoint.goals)
+            await publishPoll(GID, feed.lastUpdate)
+
+            rosters = RosterIndex(response['rosterSpots'])
+            # Decode tonight's goal songs and the horns now, so they start the moment a goal shows up
+            await audio.preload(goalSongsFor(sabresGoalSong, rosters, SABRES_TEAM_ID) + list(HORNS))
+
+            sabresGoals = EventStore(GOAL_COLUMNS)
+            sabresShots = EventStore(SHOT_COLUMNS)
+            opShots = EventStore(SHOT_COLUMNS)
+            analytics = ShotAnalytics()
             if gui:
-                guiUpdate(0)
+                renderWorker.reset()
 
-            # Call start game function
-            [sabresShots, sabresGoals, opShots, periodNum, timeRemainingPeriod] = startGameUpdate(GT, oppName, url,
-                                                                                                  rosters)
+            periodNum = 'Pre-Game'
+            timeRemainingPeriod = "20:00"
+            sabresScore = 0
+            OpScore = 0
 
-            [_, _, sabresScore, OpScore, isOver, _, _, _, _, _] = duringGameUpdate(SHOA, OHOA, url, rosters, 0)
-            # Calls the plotter function to initialize it if the user wants the GUI
             if gui:
-                guiUpdate(0)
+                display.newGame(oppName)
+                refreshView()
+
+            if resumed:
+                print(f'Picking the game back up from {datetime.datetime.fromtimestamp(checkpoint.savedAt):%H:%M:%S}.')
+                sabresShots = checkpoint.restoreStore('sabresShots', SHOT_COLUMNS)
+                sabresGoals = checkpoint.restoreStore('sabresGoals', GOAL_COLUMNS)
+                opShots = checkpoint.restoreStore('opShots', SHOT_COLUMNS)
+                gameUpdate = processGameUpdate(SHOA, OHOA, feed, feed.lastUpdate, rosters)
+            else:
+                # Call start game function
+                [sabresShots, sabresGoals, opShots, periodNum, timeRemainingPeriod] = await startGameUpdate(
+                    GT, oppName, feed, rosters, audio)
+
+                gameUpdate = await asyncio.to_thread(duringGameUpdate, SHOA, OHOA, feed, rosters)
+                await publishPoll(GID, feed.lastUpdate)
+            analytics.addPlays(feed.allPlays(), SABRES_TEAM_ID, response['homeTeam']['id'])
+            [_, _, sabresScore, OpScore, _, _, _, _, _, _, _, _] = gameUpdate
+            didSabresScore = False
+            # Refreshes are batched, so a burst of plays is a single update of the page
+            if gui:
+                refresher = RefreshTask(refreshView, GUI_REFRESH_INTERVAL)
+                frameReady = refresher.request
+                refresher.start()
+                refresher.request()
 
             # Print the score - if we start the program after the game has started this is a current update
             print("The score of the game is now BUF: " + str(sabresScore) + " " +
                   oppAbbreviation + ": " + str(OpScore))
 
-            # Main loop for when the game is going on
-            while not isOver:
-                # Updates if the game is going on
-
+            # Main loop for when the game is going on. The first pass handles the update from start up.
+            while True:
                 [didSabresScore, didOppScore, sabresScore, OpScore, isOver, sabresGoal, sabresShot, OpShot, periodNum,
-                 timeRemainingPeriod] = duringGameUpdate(SHOA, OHOA, url, rosters, 10)
-                # Plots if there was a sabres shot on goal
-                if sabresShot and gui:
-                    sabresShots = pd.concat([sabresShots, pd.DataFrame(sabresShot, columns=['x', 'y', 'EN'])],
-                                            ignore_index=True)
-                    guiUpdate(1)
-
-                if OpShot and gui:
-                    opShots = pd.concat([opShots, pd.DataFrame(OpShot, columns=['x', 'y', 'EN'])],
-                                        ignore_index=True)
-                    guiUpdate(1)
-
-                # Prints to the screen if the sabres scored. If the GUI is active plot to the screen.
-                if didSabresScore:
-                    printScoreUpdate(oppAbbreviation, oppName, OpScore, sabresScore, didSabresScore, isOver)
-                    if sabresGoal['SN'] != -1:
-                        sabresGoals = pd.concat([sabresGoals, pd.DataFrame([sabresGoal])], ignore_index=True)
-                    if gui:
-                        guiUpdate(2)
-
-                # Print score if the opponent has scored.
+                 timeRemainingPeriod, goalSong, goalsOverturned] = gameUpdate
+
+                if sabresShot:
+                    sabresShots.extend(sabresShot)
+                if OpShot:
+                    opShots.extend(OpShot)
+                for goal in sabresGoal:
+                    sabresGoals.append(goal['x'], goal['y'], goal['SN'], goal['EN'])
+                if goalsOverturned:
+                    # The goal is gone from the feed, so the rink is redrawn from the goals that still stand
+                    sabresGoals = goalStore(feed, rosters, SABRES_TEAM_ID)
+
+                # The checkpoint is on disk before any song starts, so a restart never celebrates a goal twice. A poll
+                # that changed nothing leaves it as it is, which spares the SD card a write every few seconds.
+                if feed.lastUpdate.hasChanges() or feed.lastUpdate.goalTransitions:
+                    checkpoint.record(feed, {'sabresShots': sabresShots, 'sabresGoals': sabresGoals,
+                                             'opShots': opShots})
+                    await asyncio.to_thread(checkpoint.save)
+
+                for goalId in goalsOverturned:
+                    audio.cancel(goalId)
+                if goalSong is not None:
+                    audio.play(goalSong, sabresGoal[-1]['eventId'])
                 if didOppScore:
+                    audio.play('./audioFiles/losing_horn.mp3')
+
+                # The clock moves on every poll, and the view only sends what actually changed
+                if gui:
+                    refresher.request()
+
+                # Prints to the screen if either team scored
+                if goalsOverturned:
+                    print(f"The Sabres goal was overturned. The score of the game is now BUF: {sabresScore} "
+                          f"{oppAbbreviation}: {OpScore}")
+                if didSabresScore or didOppScore:
                     printScoreUpdate(oppAbbreviation, oppName, OpScore, sabresScore, didSabresScore, isOver)
 
+                if isOver:
+                    break
+
+                # Wait between polls to avoid overloading the NHL API. Songs and redraws carry on meanwhile.
+                interval = pollScheduler.nextInterval(feed.response)
+                metrics.setGauge('lamp_poll_interval_seconds', interval, gameId=GID)
+                await clock.sleep(interval)
+
+                # Updates if the game is going on
+                gameUpdate = await asyncio.to_thread(duringGameUpdate, SHOA, OHOA, feed, rosters)
+                await publishPoll(GID, feed.lastUpdate)
+                analytics = updateAnalytics(analytics, feed, SABRES_TEAM_ID)
+
+            if gui:
+                # Show the final frame before the refreshes stop
+                await asyncio.to_thread(renderWorker.flush)
+                refreshView()
+                frameReady = None
+                await refresher.stop()
+
             # Calls print function one last time
             printScoreUpdate(oppAbbreviation, oppName, OpScore, sabresScore, didSabresScore, isOver)
+            await asyncio.to_thread(checkpoint.remove)
+            finishedGames.add(GID)
+            if maxGames is not None and len(finishedGames) >= maxGames:
+                break
+        else:
+            # Wait until tomorrow
+            print("I'm waiting till tomorrow.")
+            await sleepUntil(nextMorning(), clock)
 
-        # Wait until tomorrow
-        print("I'm waiting till tomorrow.")
-        time.sleep((next_date - datetime.datetime.now()).seconds)
+    await audio.stop()
+    if gui:
+        renderWorker.close()
 
 
-# Extract command-line arguments excluding the script name
-args = sys.argv[1:]
+async def desktopSession(page):
+    """
+    flet target for the desktop GUI, which has a single window.
+    """
+    from gameView import GameView
 
-# Check if the '-g' flag is present in the arguments
-if '-g' in args:
-    # Retrieve the value following the '-g' flag using the argumentHandling function
-    value = argumentHandling('-g', args)
+    await main(GameView(page))
 
-    # If the value is evaluated as True, set gui to True; otherwise, set it to False
-    if eval(value):
-        gui = True
-    else:
-        gui = False
-else:
-    # If the '-g' flag is not present, set gui to False by default
-    gui = False
 
-if '-w' in args:
-    value = argumentHandling('-w', args)
+async def webSession(page):
+    """
+    flet target for the web dashboard, called once for every browser that connects.
 
-    if eval(value):
-        webUI = True
-    else:
-        webUI = False
-else:
-    webUI = False
-
-# Check if gui mode is disabled
-if gui:
-    if webUI:
-        # Launch the flet app with the main function as the target for visualization
-        ft.app(target=main, assets_dir='./', view=ft.AppView.WEB_BROWSER)
+    Note:
+    The first browser starts the lamp. Every browser, that one included, only subscribes to the dashboard, so there is
+    a single poller and renderer no matter how many are watching, and the lamp keeps going when they all leave.
+    """
+    global dashboardEngine
+    dashboard.subscribe(page)
+    if dashboardEngine is None:
+        dashboardEngine = asyncio.create_task(main(dashboard))
+
+
+if __name__ == '__main__':
+    # Settings come from the defaults, a profile, a config file and the flags, see lampConfig.py
+    settings = parseArguments(sys.argv[1:])
+    configure(settings)
+    teams = settings['teams']
+
+    if settings['mode'] == 'scoreboard':
+        # Every game in the league, from one scoreboard request per poll
+        asyncio.run(followLeague())
+    elif not gui:
+        # Every tracked team is followed from this one process
+        asyncio.run(trackTeams(teams) if teams != [SABRES_TEAM_ID] else main())
     else:
-        ft.app(target=main, assets_dir='./')
-else:
-    # Run the main function without visualization if gui mode is enabled
-    main(-1)
+        if teams != [SABRES_TEAM_ID]:
+            print('The GUI only follows the Sabres, other teams are ignored.')
+        # Only the GUI needs flet, so it is imported here rather than at the top of the file
+        import flet as ft
+
+        if webUI:
+            # Every browser shares one lamp through the dashboard instead of each running its own
+            from gameView import DashboardHub
+
+            dashboard = DashboardHub()
+            ft.run(webSession, assets_dir='./', view=ft.AppView.WEB_BROWSER)
+        else:
+            ft.run(desktopSession, assets_dir='./')
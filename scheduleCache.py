@@ -0,0 +1,173 @@
+import datetime
+import json
+
+from atomicFile import atomicWrite
+from fetchClient import FetchClient
+from lampClock import WALL_CLOCK
+
+
+def localStartTime(startTimeUTC):
+    """
+    Convert a schedule startTimeUTC string such as '2024-01-13T00:00:00Z' to a naive local datetime.
+
+    The conversion uses the system time zone, including daylight saving time, so it works outside the US too.
+    """
+    startTime = datetime.datetime.fromisoformat(startTimeUTC.replace('Z', '+00:00'))
+    return startTime.astimezone().replace(tzinfo=None)
+
+
+# Keeps the league schedule on disk so the lamp only has to ask the NHL for it once a week. Every schedule response
+# already contains the whole gameWeek, so one fetch covers seven days and non-game days need no network at all.
+class ScheduleCache:
+    """
+    Persistent, date-indexed cache of the v1/schedule endpoint.
+
+    Parameters:
+    - baseURL (str): The NHL API base URL.
+    - path (str): JSON file the cache is kept in. Its folder is created if needed.
+    - client (FetchClient): The shared fetch layer. A new one is created if none is given.
+    - maxAge (timedelta): How old a cached day may get before it is fetched again. Schedules do change
+      (postponements, start time moves), so a day is never trusted forever.
+    - clock (WallClock): Where the current date and time come from. The real clock if none is given.
+    """
+
+    def __init__(self, baseURL, path='./cache/schedule.json', client=None, maxAge=datetime.timedelta(days=7),
+                 clock=WALL_CLOCK):
+        self.baseURL = baseURL
+        self.path = path
+        self.client = client if client is not None else FetchClient()
+        self.maxAge = maxAge
+        self.clock = clock
+        self.days = {}  # 'YYYY-MM-DD' -> {'fetchedAt': iso timestamp, 'games': [...]}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as cacheFile:
+                self.days = json.load(cacheFile).get('days', {})
+        except (OSError, ValueError):
+            self.days = {}
+
+    def _save(self):
+        # Swapped in whole, so a crash mid-write never leaves a corrupt cache behind
+        with atomicWrite(self.path) as cacheFile:
+            json.dump({'days': self.days}, cacheFile)
+
+    def _fresh(self, date):
+        entry = self.days.get(date)
+        if entry is None:
+            return False
+        fetchedAt = datetime.datetime.fromisoformat(entry['fetchedAt'])
+        return self.clock.now() - fetchedAt < self.maxAge
+
+    def fetchWeek(self, date):
+        """
+        Fetch the week starting at a date and store every day in it.
+
+        Parameters:
+        - date (str): 'YYYY-MM-DD'.
+        """
+        response = self.client.getJSON(self.baseURL + f'v1/schedule/{date}')
+        fetchedAt = self.clock.now().isoformat()
+        for day in response.get('gameWeek', []):
+            self.days[day['date']] = {'fetchedAt': fetchedAt, 'games': day.get('games', [])}
+        # Remember an empty day too, so a date outside the returned week isn't fetched again and again
+        self.days.setdefault(date, {'fetchedAt': fetchedAt, 'games': []})
+        self._prune()
+        self._save()
+
+    def _prune(self):
+        # Days more than a week in the past are never looked at again
+        cutoff = (self.clock.now().date() - datetime.timedelta(days=7)).isoformat()
+        for date in [date for date in self.days if date < cutoff]:
+            del self.days[date]
+
+    def games(self, date):
+        """
+        Returns every game on a date, fetching its week only if it isn't cached or has gone stale.
+
+        Parameters:
+        - date (str): 'YYYY-MM-DD'.
+        """
+        if not self._fresh(date):
+            self.fetchWeek(date)
+        return self.days[date]['games']
+
+    def gamesFor(self, date, teamIds):
+        """
+        Finds the games on a date that involve any of the given teams.
+
+        Parameters:
+        - date (str): 'YYYY-MM-DD'.
+        - teamIds (set): The NHL team IDs to look for. None for every game, each seen from the home team.
+
+        Returns:
+        list: One (game, teamId, homeOrAway, opHomeOrAway, gameTimeLocal) tuple per tracked team per game.
+        """
+        found = []
+        for game in self.games(date):
+            gameTimeLocal = localStartTime(game['startTimeUTC'])
+            if teamIds is None:
+                found.append((game, game['homeTeam']['id'], 'homeTeam', 'awayTeam', gameTimeLocal))
+                continue
+            if game['awayTeam']['id'] in teamIds:
+                found.append((game, game['awayTeam']['id'], 'awayTeam', 'homeTeam', gameTimeLocal))
+            if game['homeTeam']['id'] in teamIds:
+                found.append((game, game['homeTeam']['id'], 'homeTeam', 'awayTeam', gameTimeLocal))
+        return found
+
+    def nextGames(self, teamIds, exclude=(), lookaheadDays=14, maxGameLength=datetime.timedelta(hours=6)):
+        """
+        Finds the next game day for any of the given teams, including games that are already in progress.
+
+        Parameters:
+        - teamIds (set): The NHL team IDs to look for. None for every game in the league.
+        - exclude (set): Game IDs to skip, e.g. games that have already been followed to the end.
+        - lookaheadDays (int): How many days ahead to look.
+        - maxGameLength (timedelta): Games that started longer ago than this are assumed to be over. Games the
+          schedule already lists as 'OFF' are skipped whenever they started.
+
+        Returns:
+        list: The (game, teamId, homeOrAway, opHomeOrAway, gameTimeLocal) tuples for the earliest upcoming game
+        and every other tracked game on the same local date, sorted by start time. Empty if there are none.
+        """
+        now = self.clock.now()
+        today = self.clock.now().date()
+        upcoming = []
+        # Start from yesterday so a game that started before midnight is still picked up
+        for offset in range(-1, lookaheadDays + 1):
+            date = (today + datetime.timedelta(days=offset)).isoformat()
+            for entry in self.gamesFor(date, teamIds):
+                game, gameTimeLocal = entry[0], entry[4]
+                if game['id'] in exclude or game.get('gameState') == 'OFF' or gameTimeLocal < now - maxGameLength:
+                    continue
+                upcoming.append(entry)
+            if upcoming:
+                break
+
+        upcoming.sort(key=lambda entry: entry[4])
+        if not upcoming:
+            return []
+        firstDate = upcoming[0][4].date()
+        return [entry for entry in upcoming if entry[4].date() == firstDate]
+
+    def nextGameDay(self, exclude=(), lookaheadDays=14, maxGameLength=datetime.timedelta(hours=6)):
+        """
+        Finds the next date with games anywhere in the league, including a date whose games are still going.
+
+        Parameters:
+        - exclude (set): Game IDs to skip, e.g. games that have already been followed to the end.
+        - lookaheadDays (int): How many days ahead to look.
+        - maxGameLength (timedelta): Games that started longer ago than this are assumed to be over.
+
+        Returns:
+        tuple: The NHL's date for the games, 'YYYY-MM-DD', and the schedule entries of the games nextGames() finds on
+        it, sorted by start time. (None, []) if there are none.
+        """
+        upcoming = self.nextGames(None, exclude, lookaheadDays, maxGameLength)
+        if not upcoming:
+            return None, []
+        # nextGames stops at the first schedule date with a game left on it, so every game it found is on that date
+        firstGameId = upcoming[0][0]['id']
+        date = next(date for date, day in self.days.items() if any(game['id'] == firstGameId for game in day['games']))
+        return date, [entry[0] for entry in upcoming]
@@ -0,0 +1,101 @@
+import metrics
+from fetchClient import FetchClient
+
+# Game states after which nothing in a game changes any more
+OVER_STATES = ('FINAL', 'OFF')
+
+
+def scoreKey(game):
+    """
+    Returns what a game's play-by-play is fetched again for: its state, period and score.
+
+    Parameters:
+    - game (dict): A game entry from the v1/score endpoint.
+    """
+    period = (game.get('periodDescriptor') or {}).get('number', game.get('period'))
+    return (game.get('gameState'), period, game['awayTeam'].get('score', 0), game['homeTeam'].get('score', 0))
+
+
+def scoreLine(game):
+    """
+    Returns a one line summary of a game for the console, e.g. 'BOS 2 @ BUF 3 - P3 04:12'.
+    """
+    away, home = game['awayTeam'], game['homeTeam']
+    line = (f"{away.get('abbrev', away['id'])} {away.get('score', 0)} @ {home.get('abbrev', home['id'])} "
+            f"{home.get('score', 0)}")
+    state = game.get('gameState')
+    periodDescriptor = game.get('periodDescriptor') or {}
+    clock = game.get('clock') or {}
+    if state in ('FUT', 'PRE'):
+        return f"{line} - starts {game.get('startTimeUTC', '')}"
+    if state in OVER_STATES:
+        periodType = periodDescriptor.get('periodType', 'REG')
+        return f'{line} - Final' + ('' if periodType == 'REG' else f'/{periodType}')
+    period = periodDescriptor.get('number', game.get('period', '?'))
+    if clock.get('inIntermission'):
+        return f'{line} - P{period} intermission'
+    return f"{line} - P{period} {clock.get('timeRemaining', '')}"
+
+
+# Watches every game in the league with one request. The v1/score endpoint has the state, period, clock and score of
+# every game on a date, so ten to sixteen games cost one small response per poll, and a game's full play-by-play is
+# only fetched when something that matters on a scoreboard has changed in it.
+class Scoreboard:
+    """
+    Poller of the v1/score/{date} endpoint that reports which games changed.
+
+    Parameters:
+    - baseURL (str): The NHL API base URL.
+    - client (FetchClient): The shared fetch layer. A new one is created if none is given.
+
+    Note:
+    A game counts as changed when its state, period or either score differs from the last poll (see scoreKey), so a
+    goal, a goal taken back, the start of a period and the final horn all show up, while the clock ticking and shots
+    don't. Every game is new, and so changed, on the first poll.
+    """
+
+    def __init__(self, baseURL, client=None):
+        self.baseURL = baseURL
+        self.client = client if client is not None else FetchClient()
+        self.games = {}  # gameId -> latest score entry
+        self.keys = {}  # gameId -> scoreKey of the latest entry
+
+    def poll(self, date):
+        """
+        Fetch the scores for a date once.
+
+        Parameters:
+        - date (str): 'YYYY-MM-DD', the NHL's date for the games.
+
+        Returns:
+        list: The score entries of the games that changed since the last poll, in the order the NHL lists them.
+        """
+        result = self.client.get(self.baseURL + f'v1/score/{date}')
+        if result.notModified and self.games:
+            return []
+        changed = []
+        for game in (result.data or {}).get('games', []):
+            key = scoreKey(game)
+            if self.keys.get(game['id']) != key:
+                self.keys[game['id']] = key
+                changed.append(game)
+            self.games[game['id']] = game
+        metrics.inc('lamp_scoreboard_changes_total', len(changed))
+        return changed
+
+    def isOver(self):
+        """
+        Returns True once every game seen is over. False before the first poll.
+        """
+        return bool(self.games) and all(game.get('gameState') in OVER_STATES for game in self.games.values())
+
+    def nextInterval(self, scheduler):
+        """
+        Returns the seconds to wait before the next poll: the shortest wait any game still going asks for.
+
+        Parameters:
+        - scheduler (PollScheduler): Picks the wait for each game from its score entry.
+        """
+        intervals = [scheduler.nextInterval(game) for game in self.games.values()
+                     if game.get('gameState') not in OVER_STATES]
+        return min(intervals) if intervals else scheduler.finalInterval
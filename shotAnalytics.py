@@ -0,0 +1,296 @@
+import numpy as np
+
+# NHL rink coordinates are in feet with centre ice at (0, 0). x runs from -100 to 100 along the length of the ice and
+# y from -42.5 to 42.5 across it. The nets sit on the goal lines at x = +-89.
+RINK_HALF_LENGTH = 100.0
+RINK_HALF_WIDTH = 42.5
+GOAL_LINE = 89.0
+BLUE_LINE = 25.0
+TOP_OF_CIRCLES = 54.0
+FACEOFF_DOTS = 69.0
+SLOT_HALF_WIDTH = 9.0
+CIRCLES_HALF_WIDTH = 22.0
+
+# Zones a shot is binned into, as seen by the shooting team attacking towards positive x. Left and right are from the
+# shooter's point of view.
+ZONES = ('defensive', 'neutral', 'point', 'left-circle', 'high-slot', 'inner-slot', 'right-circle', 'perimeter',
+         'behind-net')
+
+MAX_PERIODS = 8
+
+
+def attackingRight(isHomeTeam, homeTeamDefendingSide):
+    """
+    Works out which way each shooting team was attacking from the NHL's homeTeamDefendingSide field.
+
+    Parameters:
+    - isHomeTeam (array of bool): Whether each shot was taken by the home team.
+    - homeTeamDefendingSide (array of str): 'left' or 'right' for each shot, as given on every play.
+
+    Returns:
+    numpy.ndarray: True where the shooter was attacking towards positive x.
+    """
+    homeAttacksRight = np.asarray(homeTeamDefendingSide) == 'left'
+    return np.asarray(isHomeTeam, dtype=bool) == homeAttacksRight
+
+
+def attackingRightFromShots(x, groups):
+    """
+    Guesses which way each team was attacking when the feed doesn't say, from where its shots were taken.
+
+    Parameters:
+    - x (array): Shot x coordinates.
+    - groups (array of int): Group of each shot, e.g. team and period combined into one number. Teams switch ends
+      every period, so each team and period needs its own group.
+
+    Returns:
+    numpy.ndarray: True where the shooter was attacking towards positive x.
+
+    Note:
+    Nearly all shots on goal are taken in the attacking half, so the side where most of a group's shots were taken
+    is the side it was attacking.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    groups = np.asarray(groups)
+    _, inverse = np.unique(groups, return_inverse=True)
+    rightVotes = np.bincount(inverse, weights=np.sign(x))
+    return rightVotes[inverse] >= 0
+
+
+def normalizeSides(x, y, attackingRightMask):
+    """
+    Flip coordinates so that every shot is shown attacking towards positive x.
+
+    Parameters:
+    - x (array): Shot x coordinates.
+    - y (array): Shot y coordinates.
+    - attackingRightMask (array of bool): True where the shooter was already attacking towards positive x.
+
+    Returns:
+    Tuple (numpy.ndarray, numpy.ndarray): The normalized x and y. Both are flipped, which is a 180 degree turn, so
+    the shooter's left stays on the left.
+    """
+    sign = np.where(attackingRightMask, 1.0, -1.0)
+    return np.asarray(x, dtype=np.float64) * sign, np.asarray(y, dtype=np.float64) * sign
+
+
+def zoneOf(x, y):
+    """
+    Bin normalized shot coordinates into ZONES.
+
+    Parameters:
+    - x (array): Normalized x coordinates, attacking towards positive x.
+    - y (array): Normalized y coordinates.
+
+    Returns:
+    numpy.ndarray: Index into ZONES for every shot.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Shooting towards +x, the shooter's left is +y
+    absY = np.abs(y)
+    deep = (x >= TOP_OF_CIRCLES) & (x <= GOAL_LINE)
+    conditions = [
+        x < -BLUE_LINE,
+        x <= BLUE_LINE,
+        x > GOAL_LINE,
+        x < TOP_OF_CIRCLES,
+        deep & (absY <= SLOT_HALF_WIDTH) & (x >= FACEOFF_DOTS),
+        deep & (absY <= SLOT_HALF_WIDTH),
+        deep & (absY <= CIRCLES_HALF_WIDTH) & (y > 0),
+        deep & (absY <= CIRCLES_HALF_WIDTH),
+    ]
+    choices = [ZONES.index(name) for name in ('defensive', 'neutral', 'behind-net', 'point', 'inner-slot',
+                                               'high-slot', 'left-circle', 'right-circle')]
+    return np.select(conditions, choices, default=ZONES.index('perimeter'))
+
+
+def _gaussianMatrix(centres, bandwidth):
+    # Row i spreads a unit of weight in cell i over its neighbours, keeping the total the same
+    distances = centres[:, None] - centres[None, :]
+    kernel = np.exp(-0.5 * (distances / bandwidth) ** 2)
+    return kernel / kernel.sum(axis=0, keepdims=True)
+
+
+# Shot statistics that are kept up to date as shots come in. Everything is stored as counts (a grid over the rink, a
+# count per zone, a count per period), so adding a shot costs the same whether it is the first of the night or the
+# ten thousandth of the season, and the heatmap is computed from the grid rather than from the shots themselves.
+class ShotAnalytics:
+    """
+    Incremental shot maps and rates for one team, or any set of shots.
+
+    Parameters:
+    - binSize (float): Size in feet of the heatmap grid cells.
+
+    Note:
+    Shots are normalized so the shooting team always attacks towards positive x, whichever end it was really at.
+    Goals count as shots too, which is how shooting percentage is defined. Adding shots with a weight of -1 takes
+    them back out again, e.g. for a goal that was overturned.
+    """
+
+    def __init__(self, binSize=2.0):
+        self.binSize = binSize
+        self.xEdges = np.arange(-RINK_HALF_LENGTH, RINK_HALF_LENGTH + binSize, binSize)
+        self.yEdges = np.arange(-RINK_HALF_WIDTH, RINK_HALF_WIDTH + binSize, binSize)
+        shape = (len(self.xEdges) - 1, len(self.yEdges) - 1)
+        self.shotGrid = np.zeros(shape)
+        self.goalGrid = np.zeros(shape)
+        self.shotZones = np.zeros(len(ZONES))
+        self.goalZones = np.zeros(len(ZONES))
+        self.shotPeriods = np.zeros(MAX_PERIODS + 1)
+        self.goalPeriods = np.zeros(MAX_PERIODS + 1)
+
+    @property
+    def shots(self):
+        return float(self.shotZones.sum())
+
+    @property
+    def goals(self):
+        return float(self.goalZones.sum())
+
+    def add(self, x, y, period, isGoal, attackingRightMask=None, weight=1.0):
+        """
+        Add a batch of shots.
+
+        Parameters:
+        - x (array): Shot x coordinates as given by the NHL.
+        - y (array): Shot y coordinates as given by the NHL.
+        - period (array of int): Period of each shot.
+        - isGoal (array of bool): Whether each shot was a goal.
+        - attackingRightMask (array of bool): Which way each shooter was attacking, see attackingRight(). If None the
+          coordinates are taken as already normalized.
+        - weight (float): Weight of every shot, -1 to remove shots added before.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if x.size == 0:
+            return
+        y = np.asarray(y, dtype=np.float64)
+        if attackingRightMask is not None:
+            x, y = normalizeSides(x, y, attackingRightMask)
+        isGoal = np.asarray(isGoal, dtype=bool)
+        period = np.clip(np.asarray(period, dtype=np.int64), 0, MAX_PERIODS)
+        weights = np.full(x.shape, float(weight))
+        goalWeights = weights * isGoal
+
+        # Flattened cell index of every shot, so each grid is updated with a single bincount
+        shape = self.shotGrid.shape
+        column = np.clip(((x + RINK_HALF_LENGTH) // self.binSize).astype(np.int64), 0, shape[0] - 1)
+        row = np.clip(((y + RINK_HALF_WIDTH) // self.binSize).astype(np.int64), 0, shape[1] - 1)
+        cells = column * shape[1] + row
+        self.shotGrid += np.bincount(cells, weights, minlength=self.shotGrid.size).reshape(shape)
+        self.goalGrid += np.bincount(cells, goalWeights, minlength=self.goalGrid.size).reshape(shape)
+
+        zones = zoneOf(x, y)
+        self.shotZones += np.bincount(zones, weights, minlength=len(ZONES))
+        self.goalZones += np.bincount(zones, goalWeights, minlength=len(ZONES))
+        self.shotPeriods += np.bincount(period, weights, minlength=MAX_PERIODS + 1)
+        self.goalPeriods += np.bincount(period, goalWeights, minlength=MAX_PERIODS + 1)
+
+    def addPlays(self, plays, teamId, homeTeamId, weight=1.0):
+        """
+        Add the shots and goals of one team from a list of play-by-play plays, e.g. the new plays of a poll.
+
+        Parameters:
+        - plays (list): Plays from the play-by-play feed. Plays that aren't the team's shots or goals are skipped.
+        - teamId (int): The team whose shots are counted.
+        - homeTeamId (int): The home team, used with homeTeamDefendingSide to work out the attacking direction.
+        - weight (float): -1 to take plays back out, e.g. removed plays.
+        """
+        shots = [play for play in plays if play['typeDescKey'] in ('shot-on-goal', 'goal')
+                 and play.get('details', {}).get('eventOwnerTeamId') == teamId
+                 and play['details'].get('xCoord') is not None]
+        if not shots:
+            return
+        x = [play['details']['xCoord'] for play in shots]
+        y = [play['details'].get('yCoord', 0) for play in shots]
+        period = [play.get('periodDescriptor', {}).get('number', play.get('period', 0)) for play in shots]
+        isGoal = [play['typeDescKey'] == 'goal' for play in shots]
+        sides = [play.get('homeTeamDefendingSide') for play in shots]
+        if all(side in ('left', 'right') for side in sides):
+            mask = attackingRight(np.full(len(shots), teamId == homeTeamId), sides)
+        else:
+            mask = attackingRightFromShots(x, period)
+        self.add(x, y, period, isGoal, mask, weight)
+
+    def addTable(self, table, teamId=None):
+        """
+        Add every shot and goal in a pyarrow Table from PlayArchive, e.g. a whole season.
+
+        Parameters:
+        - table (pyarrow.Table): Plays in playArchive.PLAY_SCHEMA.
+        - teamId (int): Only count this team's shots. None counts every row, normalized per shooting team.
+        """
+        types = table['typeDescKey'].to_numpy(zero_copy_only=False)
+        teams = table['teamId'].to_numpy(zero_copy_only=False)
+        keep = np.isin(types, ('shot-on-goal', 'goal'))
+        if teamId is not None:
+            keep &= teams == teamId
+        x = table['x'].to_numpy(zero_copy_only=False)[keep]
+        y = table['y'].to_numpy(zero_copy_only=False)[keep]
+        period = table['period'].to_numpy(zero_copy_only=False)[keep]
+        teams = teams[keep]
+        games = table['gameId'].to_numpy(zero_copy_only=False)[keep]
+        sides = table['homeTeamDefendingSide'].to_numpy(zero_copy_only=False)[keep]
+        isHome = teams == table['homeTeamId'].to_numpy(zero_copy_only=False)[keep]
+
+        known = np.isin(sides, ('left', 'right'))
+        # Fall back to the shot locations for games archived without the defending side
+        groups = (games * 100 + period) * 2 + isHome
+        mask = np.where(known, attackingRight(isHome, sides), attackingRightFromShots(x, groups))
+        valid = ~(np.isnan(x) | np.isnan(y))
+        self.add(x[valid], y[valid], period[valid], types[keep][valid] == 'goal', mask[valid])
+
+    def shootingPercentage(self):
+        """
+        Returns goals per shot on goal as a percentage, or None before the first shot.
+        """
+        return 100.0 * self.goals / self.shots if self.shots else None
+
+    def zoneTable(self):
+        """
+        Returns a dict of zone name to (shots, goals, shooting percentage).
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            percentages = np.where(self.shotZones > 0, 100.0 * self.goalZones / self.shotZones, np.nan)
+        return {name: (self.shotZones[index], self.goalZones[index], percentages[index])
+                for index, name in enumerate(ZONES)}
+
+    def ratePerPeriod(self, secondsPlayed=None):
+        """
+        Shots per 60 minutes in each period.
+
+        Parameters:
+        - secondsPlayed (array): Seconds played in each period, indexed by period number. Full 20 minute periods are
+          assumed for every period with a shot if not given.
+
+        Returns:
+        numpy.ndarray: Shots per 60 minutes, indexed by period number. Periods that weren't played are NaN.
+        """
+        if secondsPlayed is None:
+            secondsPlayed = np.where(self.shotPeriods > 0, 1200.0, 0.0)
+        secondsPlayed = np.asarray(secondsPlayed, dtype=np.float64)
+        played = np.zeros(MAX_PERIODS + 1)
+        played[:len(secondsPlayed)] = secondsPlayed[:MAX_PERIODS + 1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(played > 0, self.shotPeriods * 3600.0 / played, np.nan)
+
+    def heatmap(self, bandwidth=6.0, goals=False):
+        """
+        Kernel density estimate of where shots (or goals) were taken.
+
+        Parameters:
+        - bandwidth (float): Standard deviation of the Gaussian kernel in feet.
+        - goals (bool): Map goals instead of shots.
+
+        Returns:
+        numpy.ndarray: Smoothed shot counts on the grid, shape (x cells, y cells). The total equals the number of
+        shots. The cell edges are xEdges and yEdges.
+
+        Note:
+        The smoothing is done on the grid of counts with two small matrix products, so it costs the same for one game
+        or a whole season.
+        """
+        grid = self.goalGrid if goals else self.shotGrid
+        xCentres = (self.xEdges[:-1] + self.xEdges[1:]) / 2
+        yCentres = (self.yEdges[:-1] + self.yEdges[1:]) / 2
+        return _gaussianMatrix(xCentres, bandwidth) @ grid @ _gaussianMatrix(yCentres, bandwidth).T
@@ -0,0 +1,172 @@
+import datetime
+import random
+
+SABRES_TEAM_ID = 7
+OPPONENT_TEAM_ID = 6
+
+TEAMS = {
+    SABRES_TEAM_ID: {'id': SABRES_TEAM_ID, 'abbrev': 'BUF', 'name': {'default': 'Sabres'}},
+    OPPONENT_TEAM_ID: {'id': OPPONENT_TEAM_ID, 'abbrev': 'BOS', 'name': {'default': 'Bruins'}},
+}
+
+SABRES_SKATERS = [('Tage', 'Thompson', 72), ('Rasmus', 'Dahlin', 26), ('Alex', 'Tuch', 89), ('JJ', 'Peterka', 77),
+                  ('Dylan', 'Cozens', 24), ('Owen', 'Power', 25), ('Jeff', 'Skinner', 53), ('Zach', 'Benson', 9)]
+OPPONENT_SKATERS = [('David', 'Pastrnak', 88), ('Charlie', 'McAvoy', 73), ('Brad', 'Marchand', 63),
+                    ('Charlie', 'Coyle', 13), ('Hampus', 'Lindholm', 27), ('Pavel', 'Zacha', 18)]
+
+PERIOD_SECONDS = 20 * 60
+INTERMISSION_SECONDS = 18 * 60
+
+
+def _clock(seconds):
+    return f'{seconds // 60:02d}:{seconds % 60:02d}'
+
+
+def _rosterSpots():
+    spots = []
+    playerId = 8470000
+    for teamId, skaters in ((SABRES_TEAM_ID, SABRES_SKATERS), (OPPONENT_TEAM_ID, OPPONENT_SKATERS)):
+        for firstName, lastName, number in skaters:
+            playerId += 1
+            spots.append({'teamId': teamId, 'playerId': playerId, 'sweaterNumber': number,
+                          'firstName': {'default': firstName}, 'lastName': {'default': lastName},
+                          'positionCode': 'C'})
+    return spots
+
+
+# Builds a deterministic, made up game in the same shape as the NHL play-by-play and schedule endpoints. It is
+# used by the benchmarks so they can run offline without a recorded game.
+def generateGame(seed=0, gameId=2023020999, startTimeUTC='2024-01-13T00:00:00Z', playsPerPeriod=90,
+                 goalsPerTeam=3):
+    """
+    Generate a synthetic recording of a full game.
+
+    Parameters:
+    - seed (int): Seed for the random number generator, so the same seed always gives the same game.
+    - gameId (int): The id to give the game.
+    - startTimeUTC (str): Puck drop, in the same format as the schedule endpoint.
+    - playsPerPeriod (int): Roughly how many plays happen in each period.
+    - goalsPerTeam (int): Roughly how many goals each team scores.
+
+    Returns:
+    dict: A recording with keys:
+        - 'gameId': The game id.
+        - 'schedule': A v1/schedule/{date} response containing the game.
+        - 'snapshots': List of {'t': seconds since puck drop, 'playByPlay': response} in time order. A new snapshot
+          is taken every time the feed changes.
+    """
+    rng = random.Random(seed)
+    rosterSpots = _rosterSpots()
+    playersByTeam = {SABRES_TEAM_ID: [p for p in rosterSpots if p['teamId'] == SABRES_TEAM_ID],
+                     OPPONENT_TEAM_ID: [p for p in rosterSpots if p['teamId'] == OPPONENT_TEAM_ID]}
+    # Chance that any one play is a goal, so that each team ends up with about goalsPerTeam goals
+    goalRate = 2 * goalsPerTeam / (playsPerPeriod * 3)
+
+    def header(score, gameState, period, secondsRemaining=PERIOD_SECONDS, inIntermission=False):
+        return {
+            'id': gameId,
+            'gameState': gameState,
+            'startTimeUTC': startTimeUTC,
+            'periodDescriptor': {'number': period, 'periodType': 'REG'},
+            'clock': {'timeRemaining': _clock(secondsRemaining), 'secondsRemaining': secondsRemaining,
+                      'running': gameState == 'LIVE' and not inIntermission, 'inIntermission': inIntermission},
+            'homeTeam': dict(TEAMS[SABRES_TEAM_ID], score=score[SABRES_TEAM_ID]),
+            'awayTeam': dict(TEAMS[OPPONENT_TEAM_ID], score=score[OPPONENT_TEAM_ID]),
+            'rosterSpots': rosterSpots,
+        }
+
+    plays = []
+    snapshots = []
+    score = {SABRES_TEAM_ID: 0, OPPONENT_TEAM_ID: 0}
+    snapshots.append({'t': -300, 'playByPlay': dict(header(score, 'PRE', 1), plays=[])})
+
+    eventId = 0
+    powerPlayUntil = -1
+    powerPlayTeam = None
+    for period in (1, 2, 3):
+        periodStart = (period - 1) * (PERIOD_SECONDS + INTERMISSION_SECONDS)
+        times = sorted(rng.sample(range(1, PERIOD_SECONDS), playsPerPeriod))
+        for elapsed in [0] + times + [PERIOD_SECONDS]:
+            eventId += 1
+            teamId = rng.choice((SABRES_TEAM_ID, OPPONENT_TEAM_ID))
+            # Sabres shoot at positive x in this made up game, and the sides swap every period
+            direction = 1 if (teamId == SABRES_TEAM_ID) == (period % 2 == 1) else -1
+            details = {'eventOwnerTeamId': teamId,
+                       'xCoord': direction * rng.randint(25, 89), 'yCoord': rng.randint(-40, 40)}
+
+            # situationCode is away goalie, away skaters, home skaters, home goalie
+            gameSeconds = periodStart + elapsed
+            homeSkaters = awaySkaters = 5
+            homeGoalie = awayGoalie = 1
+            if gameSeconds < powerPlayUntil:
+                if powerPlayTeam == SABRES_TEAM_ID:
+                    awaySkaters = 4
+                else:
+                    homeSkaters = 4
+            if period == 3 and PERIOD_SECONDS - elapsed <= 90 and score[SABRES_TEAM_ID] != score[OPPONENT_TEAM_ID]:
+                # The trailing team pulls its goalie for an extra attacker
+                if score[SABRES_TEAM_ID] < score[OPPONENT_TEAM_ID]:
+                    homeGoalie, homeSkaters = 0, homeSkaters + 1
+                else:
+                    awayGoalie, awaySkaters = 0, awaySkaters + 1
+            situationCode = f'{awayGoalie}{awaySkaters}{homeSkaters}{homeGoalie}'
+
+            if elapsed == 0:
+                typeDescKey = 'faceoff'
+            elif elapsed == PERIOD_SECONDS:
+                typeDescKey = 'period-end'
+                details = {}
+            else:
+                roll = rng.random()
+                if roll < goalRate:
+                    typeDescKey = 'goal'
+                    shooters = rng.sample(playersByTeam[teamId], 3)
+                    score[teamId] += 1
+                    details.update(scoringPlayerId=shooters[0]['playerId'], assist1PlayerId=shooters[1]['playerId'],
+                                   assist2PlayerId=shooters[2]['playerId'],
+                                   homeScore=score[SABRES_TEAM_ID], awayScore=score[OPPONENT_TEAM_ID])
+                elif roll < 0.3:
+                    typeDescKey = 'shot-on-goal'
+                    details['shootingPlayerId'] = rng.choice(playersByTeam[teamId])['playerId']
+                elif roll < 0.45:
+                    typeDescKey = 'missed-shot'
+                elif roll < 0.6:
+                    typeDescKey = 'blocked-shot'
+                elif roll < 0.63 and gameSeconds >= powerPlayUntil:
+                    typeDescKey = 'penalty'
+                    powerPlayUntil = gameSeconds + 120
+                    powerPlayTeam = SABRES_TEAM_ID if teamId == OPPONENT_TEAM_ID else OPPONENT_TEAM_ID
+                elif roll < 0.8:
+                    typeDescKey = 'hit'
+                else:
+                    typeDescKey = 'faceoff'
+
+            plays.append({
+                'eventId': eventId,
+                'sortOrder': eventId * 10,
+                'typeDescKey': typeDescKey,
+                'period': period,
+                'periodDescriptor': {'number': period, 'periodType': 'REG'},
+                'timeInPeriod': _clock(elapsed),
+                'timeRemaining': _clock(PERIOD_SECONDS - elapsed),
+                'situationCode': situationCode,
+                'details': details,
+            })
+            gameState = 'FINAL' if period == 3 and elapsed == PERIOD_SECONDS else 'LIVE'
+            snapshots.append({'t': gameSeconds,
+                              'playByPlay': dict(header(score, gameState, period, PERIOD_SECONDS - elapsed),
+                                                 plays=list(plays))})
+
+        if period < 3:
+            # The feed switches to the intermission clock a few seconds after the period ends
+            snapshots.append({'t': periodStart + PERIOD_SECONDS + 5,
+                              'playByPlay': dict(header(score, 'LIVE', period, INTERMISSION_SECONDS - 5, True),
+                                                 plays=list(plays))})
+
+    gameDate = startTimeUTC[:10]
+    schedule = {'gameWeek': [{'date': (datetime.date.fromisoformat(gameDate) + datetime.timedelta(days=i)).isoformat(),
+                              'games': []} for i in range(7)]}
+    schedule['gameWeek'][0]['games'].append({'id': gameId, 'startTimeUTC': startTimeUTC,
+                                             'homeTeam': TEAMS[SABRES_TEAM_ID], 'awayTeam': TEAMS[OPPONENT_TEAM_ID]})
+
+    return {'gameId': gameId, 'schedule': schedule, 'snapshots': snapshots}
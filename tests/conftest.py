@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# The lamp is a flat folder of modules rather than a package, so the tests import them from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+SABRES = 7
+BRUINS = 6
+
+
+def play(eventId, sortOrder, typeDescKey='shot-on-goal', teamId=SABRES, **details):
+    """
+    Returns a play-by-play entry with just the fields the lamp looks at.
+    """
+    return {'eventId': eventId, 'sortOrder': sortOrder, 'typeDescKey': typeDescKey,
+            'periodDescriptor': {'number': 1}, 'timeRemaining': '10:00',
+            'details': dict({'eventOwnerTeamId': teamId, 'xCoord': 50, 'yCoord': 10}, **details)}
+
+
+def response(plays, homeScore=0, awayScore=0, gameState='LIVE'):
+    """
+    Returns a play-by-play response with the Sabres at home.
+    """
+    return {'id': 2023020999, 'gameState': gameState, 'homeTeam': {'id': SABRES, 'score': homeScore},
+            'awayTeam': {'id': BRUINS, 'score': awayScore}, 'plays': list(plays)}
+
+
+@pytest.fixture
+def repoRoot(monkeypatch):
+    # sabresGoalCheck reads its goal song lists relative to the working directory
+    monkeypatch.chdir(REPO_ROOT)
+    return REPO_ROOT
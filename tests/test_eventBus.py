@@ -0,0 +1,48 @@
+import asyncio
+
+from eventBus import EventBus
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def publishShots(bus, count):
+    for number in range(count):
+        bus.publish({'type': 'shot', 'gameId': 1, 'homeScore': number, 'awayScore': 0})
+
+
+def test_reconnect_gets_what_it_missed():
+    async def run():
+        bus = EventBus(historySize=10, queueSize=8)
+        publishShots(bus, 5)
+        return drain(bus.subscribe(3))
+
+    assert [(event['type'], event['id']) for event in asyncio.run(run())] == [('shot', 4), ('shot', 5)]
+
+
+def test_too_far_behind_gets_a_reset_before_the_newest_events():
+    async def run():
+        bus = EventBus(historySize=10, queueSize=4)
+        publishShots(bus, 8)
+        return drain(bus.subscribe(1))
+
+    events = asyncio.run(run())
+    assert [(event['type'], event['id']) for event in events] == [('reset', 6), ('shot', 7), ('shot', 8)]
+    assert events[0]['games'] == [{'gameId': 1, 'homeScore': 7, 'awayScore': 0, 'final': False}]
+
+
+def test_events_gone_from_the_history_or_a_restarted_lamp_get_a_reset():
+    async def run():
+        bus = EventBus(historySize=3, queueSize=10)
+        publishShots(bus, 6)
+        return drain(bus.subscribe(1)), drain(bus.subscribe(40)), drain(bus.subscribe(6))
+
+    fellOut, restarted, upToDate = asyncio.run(run())
+    assert [(event['type'], event['id']) for event in fellOut] == [('reset', 3), ('shot', 4), ('shot', 5),
+                                                                    ('shot', 6)]
+    assert [(event['type'], event['id']) for event in restarted] == [('reset', 6)]
+    assert upToDate == []
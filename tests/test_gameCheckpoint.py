@@ -0,0 +1,65 @@
+from conftest import BRUINS, play, response
+from eventStore import GOAL_COLUMNS, SHOT_COLUMNS, EventStore
+from gameCheckpoint import GameCheckpoint
+from gameFeed import GameFeed
+from goalTracker import CONFIRMED, OVERTURNED, PENDING
+
+
+def newFeed():
+    return GameFeed('http://localhost/play-by-play', client=object())
+
+
+def test_restore_reports_only_what_happened_after_the_checkpoint(tmp_path):
+    beforeRestart = [play(1, 1), play(2, 2, 'goal'), play(3, 3, 'faceoff'), play(4, 4, 'goal', BRUINS)]
+    feed = newFeed()
+    feed.ingest(response(beforeRestart[:1]))
+    feed.ingest(response(beforeRestart, homeScore=1, awayScore=1))
+    shots = EventStore(SHOT_COLUMNS)
+    shots.append(50.0, 10.0, 1)
+    goals = EventStore(GOAL_COLUMNS)
+    goals.append(60.0, 5.0, 72, 2)
+
+    checkpoint = GameCheckpoint(2023020999, str(tmp_path))
+    checkpoint.record(feed, {'sabresShots': shots, 'sabresGoals': goals})
+    checkpoint.save()
+
+    # The lamp comes back up: the Bruins' pending goal was taken back and the Sabres scored while it was down
+    afterRestart = [play(1, 1), play(2, 2, 'goal'), play(3, 3, 'faceoff'), play(5, 5, 'faceoff'),
+                    play(6, 6, 'goal')]
+    restored = GameCheckpoint(2023020999, str(tmp_path))
+    assert restored.load()
+    feed = newFeed()
+    feed.ingest(response(afterRestart, homeScore=2, awayScore=0))
+    update = feed.resume(restored.lastSortOrder, restored.scores, restored.goals)
+
+    assert [p['eventId'] for p in update.newPlays] == [5, 6]
+    assert [(t.eventId, t.state) for t in update.goalTransitions] == [(4, OVERTURNED), (6, PENDING)]
+    assert feed.previousScore('homeTeam') == 1 and feed.score('homeTeam') == 2
+    assert feed.goals.state(2) == CONFIRMED
+
+    assert restored.restoreStore('sabresShots', SHOT_COLUMNS)['EN'].tolist() == [1]
+    restoredGoals = restored.restoreStore('sabresGoals', GOAL_COLUMNS)
+    assert restoredGoals['SN'].tolist() == [72] and restoredGoals['x'].tolist() == [60.0]
+
+
+def test_checkpoint_of_another_game_is_ignored(tmp_path):
+    checkpoint = GameCheckpoint(2023020999, str(tmp_path))
+    checkpoint.save()
+    other = GameCheckpoint(2023020999, str(tmp_path))
+    other.gameId = 2023021000
+
+    assert not other.load()
+    assert other.lastSortOrder == -1
+
+
+def test_save_replaces_the_file_without_leaving_a_temporary_one(tmp_path):
+    checkpoint = GameCheckpoint(2023020999, str(tmp_path / 'checkpoints'))
+    checkpoint.save()
+    checkpoint.lastSortOrder = 42
+    checkpoint.save()
+
+    assert sorted(path.name for path in (tmp_path / 'checkpoints').iterdir()) == ['2023020999.json']
+    restored = GameCheckpoint(2023020999, str(tmp_path / 'checkpoints'))
+    assert restored.load() and restored.lastSortOrder == 42
+    checkpoint.remove()
+    assert not restored.load()
@@ -0,0 +1,96 @@
+from conftest import BRUINS, play, response
+from fetchClient import FetchResult
+from gameFeed import GameFeed
+from goalTracker import PENDING
+
+
+def newFeed():
+    # ingest() is the diff on its own, so no client is ever asked for anything
+    return GameFeed('http://localhost/play-by-play', client=object())
+
+
+def test_first_response_is_all_new_and_reports_no_goals():
+    feed = newFeed()
+    plays = [play(1, 1), play(2, 2, 'goal'), play(3, 3, 'faceoff')]
+    update = feed.ingest(response(plays, homeScore=1))
+
+    assert update.newPlays == plays
+    assert update.changedPlays == [] and update.removedPlays == []
+    # Goals already in the feed when the lamp starts are history, not news
+    assert update.goalTransitions == []
+    assert feed.lastSortOrder == 3
+    assert len(feed) == 3
+
+
+def test_only_plays_after_the_last_one_seen_are_new():
+    feed = newFeed()
+    feed.ingest(response([play(1, 1), play(2, 2)]))
+    update = feed.ingest(response([play(1, 1), play(2, 2), play(3, 3), play(4, 4)]))
+
+    assert [p['eventId'] for p in update.newPlays] == [3, 4]
+    assert update.changedPlays == [] and update.removedPlays == []
+    assert [p['eventId'] for p in feed.allPlays()] == [1, 2, 3, 4]
+
+
+def test_unchanged_response_has_no_changes():
+    feed = newFeed()
+    plays = [play(1, 1), play(2, 2)]
+    feed.ingest(response(plays))
+    update = feed.ingest(response(plays))
+
+    assert not update.hasChanges()
+
+
+def test_edited_play_in_the_revision_window_is_changed():
+    feed = newFeed()
+    feed.ingest(response([play(1, 1), play(2, 2)]))
+    edited = play(2, 2, xCoord=-60)
+    update = feed.ingest(response([play(1, 1), edited, play(3, 3)]))
+
+    assert update.changedPlays == [edited]
+    assert [p['eventId'] for p in update.newPlays] == [3]
+    assert feed.plays[2] == edited
+
+
+def test_removed_play_is_found_by_reconciling():
+    feed = newFeed()
+    feed.ingest(response([play(1, 1), play(2, 2), play(3, 3)]))
+    update = feed.ingest(response([play(1, 1), play(3, 3), play(4, 4)]))
+
+    assert [p['eventId'] for p in update.removedPlays] == [2]
+    assert [p['eventId'] for p in update.newPlays] == [4]
+    assert [p['eventId'] for p in feed.allPlays()] == [1, 3, 4]
+
+
+def test_new_goal_is_reported_once_as_pending():
+    feed = newFeed()
+    feed.ingest(response([play(1, 1)]))
+    goal = play(2, 2, 'goal', BRUINS)
+    update = feed.ingest(response([play(1, 1), goal], awayScore=1))
+
+    assert [(t.eventId, t.teamId, t.state) for t in update.goalTransitions] == [(2, BRUINS, PENDING)]
+    assert feed.previousScore('awayTeam') == 0 and feed.score('awayTeam') == 1
+    assert feed.ingest(response([play(1, 1), goal], awayScore=1)).goalTransitions == []
+
+
+class ReplayClient:
+    # Answers each get() with the next response, like a FetchClient that always gets a 200
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get(self, url):
+        return FetchResult(self.responses.pop(0))
+
+
+def test_response_that_lost_every_play_is_ignored():
+    plays = [play(1, 1), play(2, 2, 'goal'), play(3, 3, 'faceoff')]
+    feed = GameFeed('http://localhost/play-by-play', client=ReplayClient([
+        response(plays[:1]), response(plays, homeScore=1), response([], homeScore=0), response(plays, homeScore=1)]))
+    feed.poll()
+    feed.poll()
+
+    glitch = feed.poll()
+    assert not glitch.hasChanges() and glitch.goalTransitions == []
+    assert feed.score('homeTeam') == 1
+    assert not feed.poll().hasChanges()
+    assert feed.goals.count() == 1
@@ -0,0 +1,96 @@
+import asyncio
+import contextlib
+import datetime
+import io
+
+import pytest
+
+from conftest import BRUINS, SABRES, play, response
+from gameFeed import GameFeed
+from goalTracker import CONFIRMED
+from scheduleCache import ScheduleCache
+from syntheticGame import generateGame
+
+
+class FixedClock:
+    def __init__(self, now):
+        self.current = now
+
+    def now(self, tz=None):
+        return self.current
+
+
+def scheduleGame(gameId, startTimeUTC, gameState):
+    return {'id': gameId, 'startTimeUTC': startTimeUTC, 'gameState': gameState,
+            'homeTeam': {'id': SABRES}, 'awayTeam': {'id': BRUINS}}
+
+
+@pytest.mark.parametrize('gameState', ['FINAL', 'OFF'])
+def test_pending_goals_stand_once_the_game_is_over(gameState):
+    feed = GameFeed('http://localhost/play-by-play', client=object())
+    feed.ingest(response([play(1, 1)]))
+    feed.ingest(response([play(1, 1), play(2, 2, 'goal')], homeScore=1))
+    update = feed.ingest(response([play(1, 1), play(2, 2, 'goal'), play(3, 3, 'game-end')], homeScore=1,
+                                  gameState=gameState))
+
+    assert [(t.eventId, t.state) for t in update.goalTransitions] == [(2, CONFIRMED)]
+
+
+@pytest.mark.parametrize('gameState, isOver', [('LIVE', False), ('FINAL', True), ('OFF', True)])
+def test_process_game_update_ends_the_game_on_final_and_off(repoRoot, gameState, isOver):
+    import sabresGoalCheck
+    from rosterIndex import RosterIndex
+
+    snapshots = generateGame(0)['snapshots']
+    feed = GameFeed('http://localhost/play-by-play', client=object())
+    feed.ingest(snapshots[0]['playByPlay'])
+    last = dict(snapshots[-1]['playByPlay'], gameState=gameState)
+    update = feed.ingest(last)
+    result = sabresGoalCheck.processGameUpdate('homeTeam', 'awayTeam', feed, update, RosterIndex(last['rosterSpots']),
+                                               output=lambda *_: None)
+
+    assert result[4] is isOver
+
+
+def test_schedule_skips_games_that_are_off(tmp_path):
+    clock = FixedClock(datetime.datetime.now())
+    cache = ScheduleCache('http://localhost/', str(tmp_path / 'schedule.json'), client=object(), clock=clock)
+    today = clock.now().date()
+    startedAnHourAgo = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=1))
+    tomorrow = startedAnHourAgo + datetime.timedelta(days=1)
+    fetchedAt = clock.now().isoformat()
+    # Every date nextGames looks at is cached, so nothing is fetched
+    for offset in range(-1, 16):
+        cache.days[(today + datetime.timedelta(days=offset)).isoformat()] = {'fetchedAt': fetchedAt, 'games': []}
+    cache.days[startedAnHourAgo.astimezone().date().isoformat()]['games'] = [
+        scheduleGame(1, startedAnHourAgo.strftime('%Y-%m-%dT%H:%M:%SZ'), 'OFF')]
+    cache.days[tomorrow.astimezone().date().isoformat()]['games'] = [
+        scheduleGame(2, tomorrow.strftime('%Y-%m-%dT%H:%M:%SZ'), 'FUT')]
+
+    assert [entry[0]['id'] for entry in cache.nextGames({SABRES})] == [2]
+    date, games = cache.nextGameDay()
+    assert date == tomorrow.astimezone().date().isoformat()
+    assert [game['id'] for game in games] == [2]
+
+
+def test_restart_after_the_game_went_off_does_not_hang(repoRoot, tmp_path):
+    import lampConfig
+    import sabresGoalCheck
+    from gameSimulator import SimulatedClock, SimulatedFeed
+
+    game = generateGame(0)
+    last = game['snapshots'][-1]
+    game['snapshots'].append({'t': last['t'] + 600, 'playByPlay': dict(last['playByPlay'], gameState='OFF')})
+    # The lamp comes back up three hours after puck drop, long after the game went OFF
+    clock = SimulatedClock(datetime.datetime(2024, 1, 13, 3, tzinfo=datetime.timezone.utc))
+    feed = SimulatedFeed([game], clock)
+    overrides = {'cache': {'schedule': str(tmp_path / 'schedule.json'), 'checkpoints': str(tmp_path / 'checkpoints'),
+                           'stats': str(tmp_path / 'stats.json')},
+                 'archive': {'enabled': False}, 'audio': {'device': 'null'}}
+    sabresGoalCheck.configure(lampConfig.loadConfig(overrides=overrides), feed, clock)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(asyncio.wait_for(sabresGoalCheck.main(None, maxGames=1), 60))
+
+    # One schedule request and one look at the finished game, without polling it for hours
+    assert feed.stats['requests'] <= 3
+    assert clock.elapsed < 60
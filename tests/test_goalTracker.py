@@ -0,0 +1,93 @@
+from conftest import BRUINS, SABRES, play
+from goalTracker import CONFIRMED, OVERTURNED, PENDING, GoalTracker
+
+
+def changes(transitions):
+    return [(t.eventId, t.previousState, t.state) for t in transitions]
+
+
+def test_goal_is_confirmed_by_the_next_faceoff():
+    tracker = GoalTracker()
+    assert changes(tracker.advance([play(1, 1, 'goal')])) == [(1, None, PENDING)]
+    assert changes(tracker.advance([play(2, 2, 'faceoff')])) == [(1, PENDING, CONFIRMED)]
+    assert tracker.count(SABRES) == 1
+
+
+def test_pending_goal_removed_from_the_feed_is_overturned():
+    tracker = GoalTracker()
+    goal = play(1, 1, 'goal')
+    tracker.advance([goal])
+
+    assert changes(tracker.advance([], removedPlays=[goal])) == [(1, PENDING, OVERTURNED)]
+    assert tracker.count() == 0
+    assert tracker.pending == {}
+
+
+def test_confirmed_goal_changed_to_another_play_is_overturned():
+    tracker = GoalTracker()
+    tracker.advance([play(1, 1, 'goal', BRUINS), play(2, 2, 'faceoff')])
+
+    transitions = tracker.advance([], changedPlays=[play(1, 1, 'shot-on-goal', BRUINS)])
+    assert changes(transitions) == [(1, CONFIRMED, OVERTURNED)]
+    assert transitions[0].teamId == BRUINS
+    assert tracker.count(BRUINS) == 0
+
+
+def test_overturned_goal_is_only_overturned_once():
+    tracker = GoalTracker()
+    goal = play(1, 1, 'goal')
+    tracker.advance([goal])
+    tracker.advance([], removedPlays=[goal])
+
+    assert tracker.advance([], removedPlays=[goal]) == []
+    assert tracker.advance([], changedPlays=[play(1, 1, 'shot-on-goal')]) == []
+    assert tracker.state(1) == OVERTURNED
+
+
+def test_overturned_goal_that_comes_back_is_found_again():
+    tracker = GoalTracker()
+    goal = play(1, 1, 'goal')
+    tracker.advance([goal, play(2, 2, 'faceoff')])
+    # One bad response left the goal out, the next one has it again
+    tracker.advance([], removedPlays=[goal])
+
+    assert changes(tracker.advance([goal])) == [(1, OVERTURNED, PENDING)]
+    assert tracker.count(SABRES) == 1
+
+
+def test_overturned_and_new_goal_in_the_same_poll():
+    tracker = GoalTracker()
+    first = play(1, 1, 'goal')
+    tracker.advance([first])
+
+    transitions = tracker.advance([play(2, 2, 'goal')], removedPlays=[first])
+    assert changes(transitions) == [(1, PENDING, OVERTURNED), (2, None, PENDING)]
+    assert tracker.count(SABRES) == 1
+
+
+def test_game_over_confirms_pending_goals():
+    tracker = GoalTracker()
+    tracker.advance([play(1, 1, 'goal')])
+
+    assert changes(tracker.advance([], gameOver=True)) == [(1, PENDING, CONFIRMED)]
+
+
+def test_states_survive_a_json_round_trip():
+    tracker = GoalTracker()
+    tracker.advance([play(1, 1, 'goal'), play(2, 2, 'faceoff'), play(3, 3, 'goal', BRUINS)])
+    # JSON turns the eventId keys into strings
+    restored = GoalTracker({str(eventId): state for eventId, state in tracker.states().items()})
+
+    assert restored.state(1) == CONFIRMED and restored.state(3) == PENDING
+    assert changes(restored.advance([play(4, 4, 'faceoff')])) == [(3, PENDING, CONFIRMED)]
+
+
+def test_goals_seeded_at_startup_are_not_confirmed_again():
+    tracker = GoalTracker()
+    # The lamp starts during the review of a goal, before the faceoff that confirms it
+    goal = play(2, 2, 'goal')
+    tracker.seed([play(1, 1), goal])
+
+    assert tracker.advance([play(3, 3, 'faceoff')]) == []
+    assert tracker.advance([], gameOver=True) == []
+    assert changes(tracker.advance([], removedPlays=[goal])) == [(2, CONFIRMED, OVERTURNED)]